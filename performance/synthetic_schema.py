@@ -0,0 +1,92 @@
+"""
+Synthetic schemas and carts for the normalizer benchmarks.
+
+synthetic_schema(size) returns about `size` type definitions shaped like
+the menu sample: each item has a union of name literals, optional fields,
+and a list of options whose types instantiate the generic OPTION<NAME>.
+Item structs refer to their names and options by type name, so spec
+creation has to resolve every reference.
+
+synthetic_cart(type_defs, items) returns a cart in the form an LLM would
+produce: every item and option names a literal from the schema, and about
+half of the optional fields are spelled out with their default values.
+"""
+import os
+import random
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from ts_type_filter import Array, Define, Literal, ParamDef, Struct, Type, Union
+
+
+def synthetic_schema(size):
+    type_defs = [
+        Define(
+            "OPTION",
+            [ParamDef("NAME")],
+            Struct(
+                {
+                    "name": Type("NAME"),
+                    "amount?": Union(Literal("light"), Literal("regular"), Literal("extra")),
+                }
+            ),
+        )
+    ]
+    items = []
+    for i in range((size - 2) // 4):
+        type_defs.extend(
+            [
+                Define(
+                    f"Item{i}Names",
+                    [],
+                    Union(Literal(f"item {i} small"), Literal(f"item {i} large")),
+                ),
+                Define(
+                    f"Option{i}Names",
+                    [],
+                    Union(Literal(f"option {i} a"), Literal(f"option {i} b")),
+                ),
+                Define(f"Option{i}", [], Type("OPTION", [Type(f"Option{i}Names")])),
+                Define(
+                    f"Item{i}",
+                    [],
+                    Struct(
+                        {
+                            "name": Type(f"Item{i}Names"),
+                            "quantity?": Type("number"),
+                            "size?": Union(Literal("small"), Literal("large")),
+                            "options?": Array(Type(f"Option{i}")),
+                        }
+                    ),
+                ),
+            ]
+        )
+        items.append(Type(f"Item{i}"))
+    type_defs.insert(
+        0, Define("Cart", [], Struct({"items": Array(Union(*items))}))
+    )
+    return type_defs
+
+
+def synthetic_cart(type_defs, items, seed=0):
+    rng = random.Random(seed)
+    count = sum(1 for d in type_defs if d.name.startswith("Item") and "Names" not in d.name)
+    cart = []
+    for _ in range(items):
+        i = rng.randrange(count)
+        item = {"name": f"item {i} {rng.choice(['small', 'large'])}"}
+        if rng.random() < 0.5:
+            item["quantity"] = None
+        if rng.random() < 0.5:
+            item["size"] = None
+        options = []
+        for _ in range(rng.randrange(4)):
+            option = {"name": f"option {i} {rng.choice('ab')}"}
+            if rng.random() < 0.5:
+                option["amount"] = None
+            options.append(option)
+        if options:
+            item["options"] = options
+        cart.append(item)
+    return {"items": cart}
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Measure normalize_jsonl() throughput on a JSONL file of synthetic carts,
+normalizing in the calling process and with process pools of increasing
+size, in both add-default and remove-default modes.
+
+Usage: python test_batch_normalize.py [records] [processes ...]
+"""
+import json
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from ts_type_filter import create_normalizer_spec
+from ts_type_filter.batch_normalize import normalize_jsonl
+
+from synthetic_schema import synthetic_cart, synthetic_schema
+
+
+def main():
+    records = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    process_counts = [int(x) for x in sys.argv[2:]] or [0, 1, 2, 4]
+
+    type_defs = synthetic_schema(2_000)
+    spec = create_normalizer_spec(type_defs)
+    carts = [synthetic_cart(type_defs, 10, seed) for seed in range(100)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        input = os.path.join(directory, "carts.jsonl")
+        output = os.path.join(directory, "normalized.jsonl")
+        with open(input, "w", encoding="utf-8") as f:
+            for i in range(records):
+                f.write(json.dumps(carts[i % len(carts)]) + "\n")
+        print(f"{records:,} carts of 10 items, {os.cpu_count()} CPUs")
+
+        for remove_defaults in (False, True):
+            mode = "remove defaults" if remove_defaults else "add defaults"
+            for processes in process_counts:
+                statistics = normalize_jsonl(
+                    input, output, spec, remove_defaults, processes=processes
+                )
+                print(
+                    f"  {mode}, {processes} processes: "
+                    f"{statistics['records_per_second']:,.0f} records/second"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Compare the throughput of the whitespace word-breaker with the
+regex word-breaker that also splits on punctuation and folds accents.
+
+The query log is synthesized by repeating the user turns from the menu
+sample's cases.json, with some punctuation and accented spellings mixed in.
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from ts_type_filter.inverted_index import break_and_fold, break_on_whitespace
+
+CASES = os.path.join(
+    os.path.dirname(__file__), "..", "samples", "menu", "data", "cases.json"
+)
+
+
+def load_query_log(size):
+    """Build a query log with `size` lines from the turns in cases.json."""
+    with open(CASES, "r", encoding="utf-8") as f:
+        cases = json.load(f)
+    turns = [turn["user"] for case in cases for turn in case["turns"]]
+    turns.extend(
+        [
+            "Can I get a large coke, no ice?",
+            "JALAPEÑOS on the side, please!",
+            "one cheeseburger; two fries...",
+        ]
+    )
+    return [turns[i % len(turns)] for i in range(size)]
+
+
+def time_breaker(name, breaker, log):
+    """Time one pass of `breaker` over every line in `log`."""
+    start = time.perf_counter()
+    words = 0
+    for line in log:
+        words += len(breaker(line))
+    elapsed = time.perf_counter() - start
+    print(
+        f"{name}: {elapsed:.3f} seconds, "
+        f"{len(log) / elapsed:,.0f} lines/s, {words:,} words"
+    )
+    return elapsed
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    log = load_query_log(size)
+    print(f"Breaking {len(log):,} query log lines...")
+
+    whitespace = time_breaker("break_on_whitespace", break_on_whitespace, log)
+    fold = time_breaker("break_and_fold", break_and_fold, log)
+    print(f"\nbreak_and_fold / break_on_whitespace: {fold / whitespace:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Compare the startup cost of build_type_index(), create_normalizer_spec()
+and create_validator2() called separately with compile_schema(), for the
+menu sample and synthetic schemas of increasing size.
+
+Usage: python test_compile_schema.py [sizes ...]
+"""
+import gc
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from ts_type_filter import (
+    build_type_index,
+    compile_schema,
+    create_normalizer_spec,
+    create_validator2,
+    parse,
+)
+
+from synthetic_schema import synthetic_schema
+
+
+# Both return what they build, so that, as in a service, the index stays
+# alive while the validators are built.
+def separate(type_defs):
+    return (
+        build_type_index(type_defs),
+        create_normalizer_spec(type_defs),
+        create_validator2(type_defs, "Cart"),
+    )
+
+
+def together(type_defs):
+    compiled = compile_schema(type_defs)
+    return compiled, compiled.validator("Cart")
+
+
+def median_time(function, type_defs, repetitions):
+    latencies = []
+    for _ in range(repetitions):
+        # Collect the previous repetition's garbage outside the timing.
+        gc.collect()
+        start = time.perf_counter()
+        result = function(type_defs)
+        latencies.append(time.perf_counter() - start)
+        del result
+    return statistics.median(latencies)
+
+
+def main():
+    sizes = [int(x) for x in sys.argv[1:]] or [1_000, 5_000, 20_000]
+    menu = os.path.join(
+        os.path.dirname(__file__), "..", "samples", "menu", "data", "menu.ts"
+    )
+    with open(menu, "r", encoding="utf-8") as f:
+        schemas = [("menu.ts", parse(f.read()))]
+    schemas += [(f"{size:,} types", synthetic_schema(size)) for size in sizes]
+
+    print(f"{'schema':>14} {'separate':>10} {'compile_schema':>15} {'speedup':>8}")
+    for name, type_defs in schemas:
+        repetitions = 20 if len(type_defs) < 5_000 else 5
+        a = median_time(separate, type_defs, repetitions)
+        b = median_time(together, type_defs, repetitions)
+        print(f"{name:>14} {a * 1e3:>8.1f}ms {b * 1e3:>13.1f}ms {a / b:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Compare the throughput of the closure-based normalizers returned by
+create_normalizer() with the compiled ones returned by
+create_normalizer(..., compiled=True), on synthetic carts.
+
+Also reports the one-time cost of compiling the spec.
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from ts_type_filter import create_normalizer, create_normalizer_spec
+
+from synthetic_schema import synthetic_cart, synthetic_schema
+
+
+def throughput(normalizer, carts, seconds=1.0):
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        for cart in carts:
+            normalizer(cart)
+        count += len(carts)
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    type_defs = synthetic_schema(2_000)
+    spec = create_normalizer_spec(type_defs)
+    carts = [synthetic_cart(type_defs, 20, seed) for seed in range(50)]
+
+    for remove_defaults in (False, True):
+        mode = "remove defaults" if remove_defaults else "add defaults"
+        start = time.perf_counter()
+        compiled = create_normalizer(spec, remove_defaults, compiled=True)
+        compile_time = time.perf_counter() - start
+        closure = create_normalizer(spec, remove_defaults)
+
+        closure_rate = throughput(closure, carts)
+        compiled_rate = throughput(compiled, carts)
+        print(f"{mode} (compiled in {compile_time * 1e3:.1f}ms):")
+        print(f"  closure:  {closure_rate:,.0f} carts/second")
+        print(f"  compiled: {compiled_rate:,.0f} carts/second ({compiled_rate / closure_rate:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
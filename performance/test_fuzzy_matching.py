@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Measure the latency overhead and recall of fuzzy matching in TypeIndex,
+using the user turns from the menu sample's cases.json with typos injected.
+
+Each word of five or more letters gets one random deletion, substitution,
+or transposition. Recall is the fraction of turns whose typo version
+matches every literal that the original turn matched.
+"""
+import json
+import os
+import random
+import statistics
+import string
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from ts_type_filter import build_type_index, parse
+
+DATA = os.path.join(os.path.dirname(__file__), "..", "samples", "menu", "data")
+
+
+def inject_typo(word, rng):
+    if len(word) < 5:
+        return word
+    i = rng.randrange(1, len(word) - 1)
+    kind = rng.choice(["delete", "substitute", "transpose"])
+    if kind == "delete":
+        return word[:i] + word[i + 1 :]
+    elif kind == "substitute":
+        return word[:i] + rng.choice(string.ascii_lowercase) + word[i + 1 :]
+    else:
+        return word[: i - 1] + word[i] + word[i - 1] + word[i + 1 :]
+
+
+def load_turns():
+    with open(os.path.join(DATA, "cases.json"), "r", encoding="utf-8") as f:
+        cases = json.load(f)
+    return [turn["user"] for case in cases for turn in case["turns"]]
+
+
+def time_queries(indexer, queries, repetitions):
+    latencies = []
+    for _ in range(repetitions):
+        for query in queries:
+            start = time.perf_counter()
+            indexer.nodes(query)
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def main():
+    with open(os.path.join(DATA, "menu.ts"), "r", encoding="utf-8") as f:
+        type_defs = parse(f.read())
+
+    rng = random.Random(0)
+    turns = load_turns()
+    typos = [" ".join(inject_typo(w, rng) for w in turn.split()) for turn in turns]
+
+    # The match cache is disabled so that every query pays the full cost.
+    _, exact = build_type_index(type_defs, cache_size=0)
+    _, fuzzy = build_type_index(type_defs, cache_size=0, fuzzy_distance=2)
+
+    repetitions = 200
+    for name, indexer in [("exact", exact), ("fuzzy", fuzzy)]:
+        latencies = time_queries(indexer, typos, repetitions)
+        recalled = sum(
+            set(exact.nodes(turn)) <= set(indexer.nodes(typo))
+            for turn, typo in zip(turns, typos)
+        )
+        print(
+            f"{name}: median {statistics.median(latencies) * 1e6:.1f}us, "
+            f"max {max(latencies) * 1e6:.1f}us, "
+            f"recall {recalled}/{len(turns)}"
+        )
+
+    print("\nTypo-injected turns:")
+    for typo in typos:
+        print(f"  {typo}")
+
+
+if __name__ == "__main__":
+    main()
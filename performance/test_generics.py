@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Compare the cost of creating the normalizer spec, validator2 and validating
+normalizer for a schema, each with its own generic instantiations, with
+the cost when they share one GenericInstances cache. Uses the menu sample,
+synthetic schemas of increasing size, and the same synthetic schemas with
+the option types of all items drawn from ten instantiations of OPTION, so
+that instantiations repeat.
+
+Usage: python test_generics.py [sizes ...]
+"""
+import gc
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from ts_type_filter import (
+    create_normalizer_spec,
+    Define,
+    create_validating_normalizer,
+    create_validator2,
+    GenericInstances,
+    parse,
+    Type,
+)
+
+from synthetic_schema import synthetic_schema
+
+
+def repeated_options(type_defs, distinct=10):
+    """
+    Returns type_defs with OptionN defined as OPTION<OptionMNames>, where
+    M is N modulo distinct.
+    """
+    result = []
+    for type_def in type_defs:
+        if type_def.name.startswith("Option") and not type_def.name.endswith("Names"):
+            n = int(type_def.name[len("Option"):]) % distinct
+            type_def = Define(
+                type_def.name, [], Type("OPTION", [Type(f"Option{n}Names")])
+            )
+        result.append(type_def)
+    return result
+
+
+def separate(type_defs):
+    spec = create_normalizer_spec(type_defs)
+    create_validator2(type_defs, "Cart")
+    create_validating_normalizer(type_defs, "Cart", spec=spec)
+
+
+def shared(type_defs):
+    generics = GenericInstances()
+    spec = create_normalizer_spec(type_defs, generics=generics)
+    create_validator2(type_defs, "Cart", generics)
+    create_validating_normalizer(type_defs, "Cart", spec=spec, generics=generics)
+    return generics
+
+
+def median_time(function, type_defs, repetitions):
+    latencies = []
+    for _ in range(repetitions):
+        # Collect the previous repetition's garbage outside the timing.
+        gc.collect()
+        start = time.perf_counter()
+        function(type_defs)
+        latencies.append(time.perf_counter() - start)
+    return statistics.median(latencies)
+
+
+def main():
+    sizes = [int(x) for x in sys.argv[1:]] or [1_000, 5_000, 20_000]
+    menu = os.path.join(
+        os.path.dirname(__file__), "..", "samples", "menu", "data", "menu.ts"
+    )
+    with open(menu, "r", encoding="utf-8") as f:
+        schemas = [("menu.ts", parse(f.read()))]
+    for size in sizes:
+        type_defs = synthetic_schema(size)
+        schemas.append((f"{size:,} types", type_defs))
+        schemas.append((f"{size:,} repeated", repeated_options(type_defs)))
+
+    print(
+        f"{'schema':>16} {'separate':>10} {'shared':>10} {'speedup':>8}"
+        f" {'instances':>10} {'hits':>8}"
+    )
+    for name, type_defs in schemas:
+        repetitions = 20 if len(type_defs) < 5_000 else 5
+        a = median_time(separate, type_defs, repetitions)
+        b = median_time(shared, type_defs, repetitions)
+        counts = shared(type_defs).statistics()
+        print(
+            f"{name:>16} {a * 1e3:>8.1f}ms {b * 1e3:>8.1f}ms {a / b:>7.2f}x"
+            f" {counts['instances']:>10,} {counts['hits']:>8,}"
+        )
+
+
+if __name__ == "__main__":
+    main()
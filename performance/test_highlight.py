@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Compare highlight() times with and without stored spans, on the sonnets
+that match a handful of queries, as in samples/inverted_index/query.py.
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(
+    os.path.abspath(
+        os.path.join(os.path.dirname(__file__), "..", "samples", "inverted_index")
+    )
+)
+
+from ts_type_filter import Index
+from ts_type_filter.inverted_index import break_and_fold
+
+import sonnets
+
+QUERIES = ["love", "fire heat", "summer's day", "beauty time", "rose"]
+
+
+def time_highlights(index, repetitions=20):
+    results = [(query, index.match(query)) for query in QUERIES]
+    count = sum(len(documents) for _, documents in results) * repetitions
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        for query, documents in results:
+            for document in documents:
+                index.highlight(query, document)
+    return (time.perf_counter() - start) / count
+
+
+def main():
+    for breaker in (None, break_and_fold):
+        name = breaker.__name__ if breaker else "break_on_whitespace"
+        print(f"{name}:")
+        for store_spans in (False, True):
+            index = Index(breaker=breaker, store_spans=store_spans)
+            start = time.perf_counter()
+            index.add_many(sonnets.sonnets)
+            build = time.perf_counter() - start
+            per_highlight = time_highlights(index)
+            print(
+                f"  store_spans={store_spans}: build {build * 1e3:.1f}ms, "
+                f"{per_highlight * 1e6:.1f}us per highlight"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -18,6 +18,38 @@ def time_import(module_name, import_statement):
         print(f"{module_name}: FAILED - {e}")
         return 0
 
+def time_stemmer(name, stemmer, words):
+    """Time how long it takes to stem every word in a list"""
+    start_time = time.time()
+    for word in words:
+        stemmer.stem(word)
+    elapsed = time.time() - start_time
+    print(f"{name}: {elapsed:.3f} seconds, {len(words) / elapsed:,.0f} words/s")
+    return elapsed
+
+def compare_stemmers():
+    """Compare import time and throughput of the built-in and nltk stemmers"""
+    print("\nComparing stemmers...")
+
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+    # The built-in stemmer must be imported first so that the nltk import
+    # isn't already paid for when the built-in import is timed. Note that
+    # this also imports the rest of the ts_type_filter package.
+    time_import('ts_type_filter.stemmer', 'import ts_type_filter.stemmer')
+    time_import('nltk.stem.snowball', 'import nltk.stem.snowball')
+
+    from nltk.stem.snowball import SnowballStemmer
+    from ts_type_filter.stemmer import EnglishStemmer, PluralStemmer
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'samples', 'inverted_index')))
+    import sonnets
+
+    words = [word for sonnet in sonnets.sonnets for word in sonnet.split()] * 10
+    print(f"\nStemming {len(words):,} words from the sonnets...")
+    time_stemmer('nltk SnowballStemmer', SnowballStemmer('english'), words)
+    time_stemmer('EnglishStemmer', EnglishStemmer(), words)
+    time_stemmer('PluralStemmer', PluralStemmer(), words)
+
 def main():
     print("Measuring import times...")
     
@@ -48,4 +80,7 @@ def main():
             print(f"  {module}: {import_time:.3f}s")
 
 if __name__ == "__main__":
-    main()
+    if len(sys.argv) > 1 and sys.argv[1] == "stemmers":
+        compare_stemmers()
+    else:
+        main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Measure normalization of a cart over the turns of a simulated conversation,
+with and without the subtree cache of IncrementalNormalizer.
+
+Each turn parses the cart afresh from JSON, as a service receiving it from
+an LLM would, after changing or adding one item. The parse is not timed.
+
+Usage: python test_incremental_normalize.py [items] [turns]
+"""
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from ts_type_filter import create_normalizer, create_normalizer_spec
+
+from synthetic_schema import synthetic_cart, synthetic_schema
+
+
+def conversation(type_defs, items, turns, seed=0):
+    rng = random.Random(seed)
+    cart = synthetic_cart(type_defs, items, seed)
+    extra = synthetic_cart(type_defs, turns, seed + 1)["items"]
+    for turn in range(turns):
+        if rng.random() < 0.5:
+            cart["items"].append(extra[turn])
+        else:
+            cart["items"][rng.randrange(len(cart["items"]))] = extra[turn]
+        yield json.dumps(cart)
+
+
+def measure(normalizer, texts):
+    latencies = []
+    for text in texts:
+        cart = json.loads(text)
+        start = time.perf_counter()
+        normalizer(cart)
+        latencies.append(time.perf_counter() - start)
+    return statistics.median(latencies)
+
+
+def main():
+    items = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    turns = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    type_defs = synthetic_schema(2_000)
+    spec = create_normalizer_spec(type_defs)
+    texts = list(conversation(type_defs, items, turns))
+    print(f"{items} items, {turns} turns, median time per turn")
+
+    for remove_defaults in (False, True):
+        mode = "remove" if remove_defaults else "add"
+        plain = create_normalizer(spec, remove_defaults)
+        incremental = create_normalizer(spec, remove_defaults, cache_size=4096)
+        for text in texts:
+            assert incremental(json.loads(text)) == plain(json.loads(text))
+        incremental.clear_cache()
+        print(f"{mode:>6} plain:       {measure(plain, texts) * 1e3:.3f}ms")
+        print(f"{mode:>6} incremental: {measure(incremental, texts) * 1e3:.3f}ms")
+        print(f"{'':>6} {incremental.cache_statistics()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Compare Index build times using add() for each document against a single
+call to add_many(), on the sonnets corpus and on a synthetic menu.
+
+The synthetic menu has 100k literals drawn from a small vocabulary of sizes,
+flavors, items and sauces, which is typical of how menu words repeat.
+"""
+import itertools
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(
+    os.path.abspath(
+        os.path.join(os.path.dirname(__file__), "..", "samples", "inverted_index")
+    )
+)
+
+from ts_type_filter import Index
+from ts_type_filter.inverted_index import break_and_fold, get_default_stemmer
+
+import sonnets
+
+SIZES = ["small", "regular", "medium", "large", "extra large", "kids"]
+FLAVORS = ["classic", "spicy", "smoky", "crispy", "grilled", "honey", "garlic"]
+ITEMS = [
+    "chicken sandwich",
+    "cheeseburger",
+    "fries",
+    "onion rings",
+    "jalapeño poppers",
+    "fountain drink",
+    "milkshake",
+    "nuggets",
+    "fish tacos",
+    "veggie wrap",
+]
+SAUCES = ["ranch", "barbecue", "honey mustard", "buffalo", "chipotle", "tartar"]
+
+
+def synthetic_menu(size):
+    """Generate `size` distinct menu literals."""
+    combinations = itertools.product(SIZES, FLAVORS, ITEMS, SAUCES)
+    literals = []
+    for i, (s, f, item, sauce) in enumerate(itertools.cycle(combinations)):
+        if i >= size:
+            break
+        literals.append(f"{s} {f} {item} with {sauce} sauce #{i}")
+    return literals
+
+
+def time_build(name, documents, bulk, **kwargs):
+    index = Index(**kwargs)
+    start = time.perf_counter()
+    if bulk:
+        index.add_many(documents)
+    else:
+        for document in documents:
+            index.add(document)
+    elapsed = time.perf_counter() - start
+    print(f"  {name}: {elapsed:.3f} seconds")
+    return elapsed
+
+
+def compare(title, documents, **kwargs):
+    print(f"{title} ({len(documents):,} documents):")
+    one_at_a_time = time_build("add()", documents, False, **kwargs)
+    bulk = time_build("add_many()", documents, True, **kwargs)
+    print(f"  speedup: {one_at_a_time / bulk:.2f}x")
+    print()
+
+
+def main():
+    # Load the stemmer up front so that it isn't counted in the first build.
+    get_default_stemmer()
+
+    compare("Sonnets", sonnets.sonnets)
+    compare("Synthetic menu", synthetic_menu(100_000), breaker=break_and_fold)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Measure normalize1() and normalize2() times on synthetic carts of 100 to
+1000 items, sharing unchanged subtrees and in place, against the cost of
+the copy.deepcopy() of the cart that the normalizers used to start with.
+
+In-place runs normalize a fresh deep copy of the cart each time. The copy
+is not timed.
+"""
+import copy
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from ts_type_filter import create_normalizer, create_normalizer_spec
+
+from synthetic_schema import synthetic_cart, synthetic_schema
+
+
+def median_time(function, make_input, repetitions=30):
+    latencies = []
+    for _ in range(repetitions):
+        tree = make_input()
+        start = time.perf_counter()
+        function(tree)
+        latencies.append(time.perf_counter() - start)
+    return statistics.median(latencies)
+
+
+def main():
+    type_defs = synthetic_schema(2_000)
+    spec = create_normalizer_spec(type_defs)
+
+    print(f"{'items':>5} {'deepcopy':>9} {'add':>9} {'add inplace':>12} {'remove':>9} {'remove inplace':>15}")
+    for items in [100, 250, 500, 1000]:
+        cart = synthetic_cart(type_defs, items)
+        timings = [median_time(copy.deepcopy, lambda: cart)]
+        for remove_defaults in (False, True):
+            shared = create_normalizer(spec, remove_defaults)
+            in_place = create_normalizer(spec, remove_defaults, in_place=True)
+            timings.append(median_time(shared, lambda: cart))
+            timings.append(median_time(in_place, lambda: copy.deepcopy(cart)))
+        print(
+            f"{items:>5} "
+            + " ".join(
+                f"{t * 1e3:>{w - 2}.2f}ms" for t, w in zip(timings, [9, 9, 12, 9, 15])
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
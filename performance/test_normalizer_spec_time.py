@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Measure create_normalizer_spec() time on synthetic schemas of increasing
+size, up to 10k definitions, with and without the SymbolTable from
+build_type_index().
+
+Spec creation should scale linearly with the number of definitions.
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from ts_type_filter import create_normalizer_spec
+from ts_type_filter.filter import build_symbol_table
+
+from synthetic_schema import synthetic_schema
+
+
+def main():
+    sizes = [int(x) for x in sys.argv[1:]] or [1_000, 2_000, 5_000, 10_000]
+    print(f"{'definitions':>11} {'spec':>9} {'with symbols':>13}")
+    for size in sizes:
+        type_defs = synthetic_schema(size)
+        symbols = build_symbol_table(type_defs)
+
+        start = time.perf_counter()
+        spec = create_normalizer_spec(type_defs)
+        plain = time.perf_counter() - start
+
+        start = time.perf_counter()
+        create_normalizer_spec(type_defs, symbols)
+        reused = time.perf_counter() - start
+
+        print(f"{len(type_defs):>11,} {plain:>8.3f}s {reused:>12.3f}s  ({len(spec['types']):,} names)")
+
+
+if __name__ == "__main__":
+    main()
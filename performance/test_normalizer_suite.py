@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Benchmark create_normalizer_spec(), normalize1(), normalize2() and
+merge_normalizer_specs() on synthetic schemas and carts of increasing
+size, and write the results as JSON.
+
+Each benchmark is timed `--repetitions` times, with the garbage from the
+previous repetition collected outside the timing, and reports the median
+and 95th percentile in milliseconds. Peak memory is measured with
+tracemalloc in one more, untimed, run, since tracing slows the code down.
+It is the peak of the memory allocated during the run, in bytes.
+
+normalize1() and normalize2() are run through create_normalizer() with
+remove_defaults=False and True, on carts for a schema of `--schema-size`
+definitions. The merge renames every tenth item type with defaults and
+changes the defaults of every hundredth.
+
+With --baseline, the results are compared with an earlier output of this
+script, and the script exits with status 1 if the median of any benchmark
+is more than --tolerance slower than in the baseline.
+
+Usage: python test_normalizer_suite.py [--output results.json]
+           [--baseline baseline.json] [--tolerance 0.2] [options]
+"""
+import argparse
+import gc
+import json
+import math
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from ts_type_filter import (
+    create_normalizer,
+    create_normalizer_spec,
+    merge_normalizer_specs,
+)
+
+from synthetic_schema import synthetic_cart, synthetic_schema
+
+
+def measure(function, repetitions):
+    latencies = []
+    for _ in range(repetitions):
+        # Collect the previous repetition's garbage outside the timing.
+        gc.collect()
+        start = time.perf_counter()
+        function()
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    p95 = latencies[min(len(latencies) - 1, math.ceil(0.95 * len(latencies)) - 1)]
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "median_ms": statistics.median(latencies) * 1e3,
+        "p95_ms": p95 * 1e3,
+        "peak_memory_bytes": peak,
+        "repetitions": repetitions,
+    }
+
+
+def renamed_spec(spec):
+    """
+    Returns a copy of spec, as create_normalizer_spec() would return it for
+    a new version of the schema, and the renamedTypes for the merge.
+    """
+    renamed = {}
+    defaults = {}
+    for i, (type_name, template) in enumerate(spec["defaults"].items()):
+        if i % 10 == 0:
+            renamed[type_name] = f"Renamed{type_name}"
+            type_name = renamed[type_name]
+        if i % 100 == 0:
+            template = dict(template, extra=None)
+        defaults[type_name] = template
+    types = {name: renamed.get(t, t) for name, t in spec["types"].items()}
+    new_spec = {"types": types, "defaults": defaults, "duplicates": spec["duplicates"]}
+    return new_spec, renamed
+
+
+def run(schema_sizes, cart_sizes, schema_size, repetitions):
+    results = []
+
+    def record(benchmark, parameters, function):
+        result = {"benchmark": benchmark, **parameters}
+        result.update(measure(function, repetitions))
+        results.append(result)
+        print(
+            f"{benchmark:>24} {json.dumps(parameters):>34}"
+            f" {result['median_ms']:>10.2f}ms {result['p95_ms']:>10.2f}ms"
+            f" {result['peak_memory_bytes'] / 2**20:>8.2f}MB",
+            file=sys.stderr,
+        )
+
+    print(
+        f"{'benchmark':>24} {'parameters':>34} {'median':>12} {'p95':>12} {'peak':>10}",
+        file=sys.stderr,
+    )
+    for size in schema_sizes:
+        type_defs = synthetic_schema(size)
+        spec = create_normalizer_spec(type_defs)
+        parameters = {"definitions": len(type_defs)}
+        record(
+            "create_normalizer_spec",
+            parameters,
+            lambda: create_normalizer_spec(type_defs),
+        )
+        new_spec, renamed = renamed_spec(spec)
+        record(
+            "merge_normalizer_specs",
+            parameters,
+            lambda: merge_normalizer_specs(new_spec, spec, renamed),
+        )
+
+    type_defs = synthetic_schema(schema_size)
+    spec = create_normalizer_spec(type_defs)
+    normalizers = [
+        ("normalize1", create_normalizer(spec, remove_defaults=False)),
+        ("normalize2", create_normalizer(spec, remove_defaults=True)),
+    ]
+    for items in cart_sizes:
+        cart = synthetic_cart(type_defs, items)
+        parameters = {"definitions": len(type_defs), "items": items}
+        for benchmark, normalizer in normalizers:
+            record(benchmark, parameters, lambda: normalizer(cart))
+
+    return results
+
+
+def regressions(results, baseline, tolerance):
+    """
+    Returns a message for each result whose median is more than tolerance
+    (a fraction) slower than the result for the same benchmark and
+    parameters in baseline.
+    """
+
+    def key(result):
+        return json.dumps(
+            {
+                k: v
+                for k, v in result.items()
+                if k not in ("median_ms", "p95_ms", "peak_memory_bytes", "repetitions")
+            },
+            sort_keys=True,
+        )
+
+    before = {key(result): result for result in baseline["results"]}
+    messages = []
+    for result in results:
+        previous = before.get(key(result))
+        if previous is None:
+            continue
+        if result["median_ms"] > previous["median_ms"] * (1 + tolerance):
+            messages.append(
+                f"{key(result)}: median {result['median_ms']:.2f}ms, "
+                f"baseline {previous['median_ms']:.2f}ms"
+            )
+    return messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--schema-sizes", type=int, nargs="+", default=[1_000, 2_000, 5_000, 10_000]
+    )
+    parser.add_argument(
+        "--cart-sizes", type=int, nargs="+", default=[10, 100, 1_000, 10_000]
+    )
+    parser.add_argument(
+        "--schema-size",
+        type=int,
+        default=2_000,
+        help="size of the schema for the normalize benchmarks",
+    )
+    parser.add_argument("--repetitions", type=int, default=20)
+    parser.add_argument("--output", help="JSON file for the results (default stdout)")
+    parser.add_argument("--baseline", help="earlier results to compare with")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="fraction by which a median may exceed the baseline",
+    )
+    args = parser.parse_args()
+
+    results = run(args.schema_sizes, args.cart_sizes, args.schema_size, args.repetitions)
+    output = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(output, f, indent=2)
+    else:
+        json.dump(output, sys.stdout, indent=2)
+        print()
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        messages = regressions(results, baseline, args.tolerance)
+        for message in messages:
+            print(f"Regression: {message}", file=sys.stderr)
+        if messages:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
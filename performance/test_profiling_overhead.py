@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Measure the overhead of match() profiling in TypeIndex, using the user
+turns from the menu sample's cases.json, and print the aggregated profile.
+"""
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from ts_type_filter import build_type_index, parse
+from ts_type_filter.profiling import ProfileHistograms
+
+DATA = os.path.join(os.path.dirname(__file__), "..", "samples", "menu", "data")
+
+
+def load_turns():
+    with open(os.path.join(DATA, "cases.json"), "r", encoding="utf-8") as f:
+        cases = json.load(f)
+    return [turn["user"] for case in cases for turn in case["turns"]]
+
+
+def time_queries(indexer, queries, repetitions=200):
+    latencies = []
+    for _ in range(repetitions):
+        for query in queries:
+            start = time.perf_counter()
+            indexer.nodes(query)
+            latencies.append(time.perf_counter() - start)
+    return statistics.median(latencies)
+
+
+def main():
+    with open(os.path.join(DATA, "menu.ts"), "r", encoding="utf-8") as f:
+        type_defs = parse(f.read())
+    turns = load_turns()
+
+    # The match cache is disabled so that every query pays the full cost.
+    histograms = ProfileHistograms()
+    _, disabled = build_type_index(type_defs, cache_size=0)
+    _, enabled = build_type_index(type_defs, cache_size=0, profiler=histograms)
+
+    print(f"Median match latency without profiler: {time_queries(disabled, turns) * 1e6:.1f}us")
+    print(f"Median match latency with profiler: {time_queries(enabled, turns) * 1e6:.1f}us")
+    print()
+    print(json.dumps(histograms.summary(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Compare build time and match latency of Index and ShardedIndex on a
+synthetic corpus scaled up from the sonnets that tools/prepare-sonnets.py
+produces.
+
+Each synthetic document is 14 lines drawn at random from all of the
+sonnets' lines, so the vocabulary and line length match the real corpus.
+
+Usage: python test_sharded_index.py [documents] [shards ...]
+"""
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(
+    os.path.abspath(
+        os.path.join(os.path.dirname(__file__), "..", "samples", "inverted_index")
+    )
+)
+
+from ts_type_filter import Index, ShardedIndex
+from ts_type_filter.inverted_index import break_and_fold
+
+import sonnets
+
+QUERIES = [
+    "love",
+    "fire heat",
+    "summer's day",
+    "beauty AND time NOT death",
+    "(rose OR flower) AND sweet",
+]
+
+
+def synthetic_sonnets(size, seed=0):
+    rng = random.Random(seed)
+    lines = [
+        line
+        for sonnet in sonnets.sonnets
+        for line in sonnet.split("\n")[2:]
+        if line.strip()
+    ]
+    return [
+        f"Sonnet {i}\n\n" + "\n".join(rng.choices(lines, k=14)) for i in range(size)
+    ]
+
+
+def measure(name, index, documents, repetitions=20):
+    start = time.perf_counter()
+    index.add_many(documents)
+    build = time.perf_counter() - start
+
+    latencies = []
+    for _ in range(repetitions):
+        for query in QUERIES:
+            start = time.perf_counter()
+            if any(operator in query for operator in ("AND", "OR", "NOT")):
+                index.match_boolean(query)
+            else:
+                index.match(query)
+            latencies.append(time.perf_counter() - start)
+    print(
+        f"{name:>12}: build {build:.2f}s, "
+        f"median match {statistics.median(latencies) * 1e3:.2f}ms, "
+        f"max match {max(latencies) * 1e3:.2f}ms"
+    )
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    shard_counts = [int(x) for x in sys.argv[2:]] or [1, 2, 4]
+    documents = synthetic_sonnets(size)
+    print(f"{size:,} documents, {os.cpu_count()} CPUs")
+
+    # The match cache is disabled so that every query pays the full cost.
+    measure("Index", Index(breaker=break_and_fold, cache_size=0), documents)
+    for shards in shard_counts:
+        with ShardedIndex(breaker=break_and_fold, shards=shards, cache_size=0) as index:
+            measure(f"{shards} shards", index, documents)
+
+
+if __name__ == "__main__":
+    main()
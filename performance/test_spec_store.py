@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Compare the startup cost of creating a normalizer spec with loading it from
+a spec artifact, and the cost of merging specs, on a synthetic schema.
+
+Usage: python test_spec_store.py [items]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from ts_type_filter import create_normalizer_spec, merge_normalizer_specs
+from ts_type_filter.spec_store import SpecStore, schema_hash
+
+from synthetic_schema import synthetic_schema
+
+
+def timed(f):
+    start = time.perf_counter()
+    result = f()
+    return result, time.perf_counter() - start
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000
+    type_defs = synthetic_schema(size)
+    print(f"{len(type_defs):,} type definitions")
+
+    spec, seconds = timed(lambda: create_normalizer_spec(type_defs))
+    print(f"create_normalizer_spec: {seconds:.3f}s")
+
+    with tempfile.TemporaryDirectory() as directory:
+        SpecStore(directory).spec(type_defs)
+        key, seconds = timed(lambda: schema_hash(type_defs))
+        print(f"           schema_hash: {seconds:.3f}s")
+        # A new store stands in for a new process.
+        _, seconds = timed(lambda: SpecStore(directory).load(key))
+        print(f"     load spec artifact: {seconds:.3f}s")
+
+    # Change the defaults of one type in a copy of the spec.
+    changed = dict(spec, defaults=dict(spec["defaults"]))
+    name = next(iter(changed["defaults"]))
+    changed["defaults"][name] = dict(changed["defaults"][name], extra=None)
+    _, seconds = timed(lambda: merge_normalizer_specs(changed, spec, {}))
+    print(f" merge_normalizer_specs: {seconds:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Report how stopword filtering in TypeIndex changes the size of the pruned
+menu and the match latency, for each user turn in the menu sample's
+cases.json.
+
+Each turn is pruned as the menu pipeline does, using the text of all of the
+user turns so far, once with english_stopwords and once with no stopwords.
+"""
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from gotaglio.tokenizer import tokenizer
+
+from ts_type_filter import build_filtered_types, build_type_index, parse
+
+DATA = os.path.join(os.path.dirname(__file__), "..", "samples", "menu", "data")
+
+
+def load_queries():
+    with open(os.path.join(DATA, "cases.json"), "r", encoding="utf-8") as f:
+        cases = json.load(f)
+    queries = []
+    for case in cases:
+        for i in range(len(case["turns"])):
+            queries.append([turn["user"] for turn in case["turns"][: i + 1]])
+    return queries
+
+
+def pruned_tokens(type_defs, symbols, indexer, query):
+    reachable = build_filtered_types(type_defs, symbols, indexer, query)
+    return len(tokenizer.encode("\n".join(x.format() for x in reachable)))
+
+
+def match_latency(indexer, queries, repetitions=200):
+    latencies = []
+    for _ in range(repetitions):
+        for query in queries:
+            start = time.perf_counter()
+            indexer.nodes(query)
+            latencies.append(time.perf_counter() - start)
+    return statistics.median(latencies)
+
+
+def main():
+    with open(os.path.join(DATA, "menu.ts"), "r", encoding="utf-8") as f:
+        type_defs = parse(f.read())
+    queries = load_queries()
+
+    # The match cache is disabled so that every query pays the full cost.
+    symbols, without = build_type_index(type_defs, stopwords=(), cache_size=0)
+    _, with_stopwords = build_type_index(type_defs, cache_size=0)
+
+    print(f"{'tokens without':>14} {'tokens with':>11}  query")
+    totals = [0, 0]
+    for query in queries:
+        before = pruned_tokens(type_defs, symbols, without, query)
+        after = pruned_tokens(type_defs, symbols, with_stopwords, query)
+        totals[0] += before
+        totals[1] += after
+        print(f"{before:>14} {after:>11}  {query[-1]}")
+    print(f"{totals[0]:>14} {totals[1]:>11}  TOTAL")
+
+    print()
+    print(f"Median match latency without stopwords: {match_latency(without, queries) * 1e6:.1f}us")
+    print(f"Median match latency with stopwords: {match_latency(with_stopwords, queries) * 1e6:.1f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Compare create_validator2() followed by the normalizer with the single
+traversal of create_validating_normalizer(), on valid synthetic carts of
+100 to 1000 items.
+
+Usage: python test_validating_normalizer.py [schema size]
+"""
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from ts_type_filter import (
+    create_normalizer,
+    create_normalizer_spec,
+    create_validating_normalizer,
+    create_validator2,
+)
+
+from synthetic_schema import synthetic_cart, synthetic_schema
+
+
+def without_none(tree):
+    # The synthetic carts spell out defaults as None, which the schema
+    # doesn't allow.
+    if isinstance(tree, dict):
+        return {k: without_none(v) for k, v in tree.items() if v is not None}
+    elif isinstance(tree, list):
+        return [without_none(v) for v in tree]
+    return tree
+
+
+def median_time(function, tree, repetitions=30):
+    latencies = []
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        function(tree)
+        latencies.append(time.perf_counter() - start)
+    return statistics.median(latencies)
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000
+    type_defs = synthetic_schema(size)
+    spec = create_normalizer_spec(type_defs)
+    validator = create_validator2(type_defs, "Cart")
+
+    print(f"{'items':>5} {'mode':>7} {'two passes':>11} {'fused':>9} {'speedup':>8}")
+    for items in [100, 250, 500, 1000]:
+        cart = without_none(synthetic_cart(type_defs, items))
+        for remove_defaults in (False, True):
+            normalizer = create_normalizer(spec, remove_defaults)
+            fused = create_validating_normalizer(type_defs, "Cart", remove_defaults, spec)
+
+            def two_passes(tree):
+                return validator(tree) and normalizer(tree)
+
+            assert fused(cart) == (True, two_passes(cart))
+            separate = median_time(two_passes, cart)
+            single = median_time(fused, cart)
+            print(
+                f"{items:>5} {'remove' if remove_defaults else 'add':>7} "
+                f"{separate * 1e3:>9.2f}ms {single * 1e3:>7.2f}ms "
+                f"{separate / single:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -5,18 +5,28 @@ import sys
 # Add the parent directory to the sys.path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
 from ts_type_filter import Index
+from ts_type_filter.boolean_query import parse_boolean_query, positive_terms
 import sonnets
 
-def go(query):
-  # Create an index
-  index = Index()
+def go(query, boolean=False):
+  # Create an index that keeps word spans for fast highlighting
+  index = Index(store_spans=True)
 
   # Add sonnets to the index
   for sonnet in sonnets.sonnets:
     index.add(sonnet)
 
   # Perform a search
-  results = index.match(query)
+  if boolean:
+    try:
+      results = index.match_boolean(query)
+    except ValueError as e:
+      print(f"[bold red]{e}[/bold red]")
+      sys.exit(1)
+    highlighted = " ".join(positive_terms(parse_boolean_query(query)))
+  else:
+    results = index.match(query)
+    highlighted = query
 
   # Display the results
   print(f"Search results for [bold green]'{query}'[/bold green]:")
@@ -24,15 +34,18 @@ def go(query):
   print()
 
   for result in results:
-    print(index.highlight(query, result))
+    print(index.highlight(highlighted, result))
     print()
 
   print(f"Total of {len(results)} results found.")
 
 
 if __name__ == "__main__":
-  if len(sys.argv) < 2:
-    print("Usage: python demo.py <query>")
+  args = sys.argv[1:]
+  boolean = "--boolean" in args
+  args = [arg for arg in args if arg != "--boolean"]
+  if len(args) < 1:
+    print("Usage: python query.py [--boolean] <query>")
     sys.exit(1)
-  query = sys.argv[1]
-  go(query)
\ No newline at end of file
+  query = args[0]
+  go(query, boolean)
@@ -16,7 +16,7 @@ def go():
   for sonnet in sonnets.sonnets:
     index.add(sonnet)
 
-  index.statistics()
+  index.print_statistics()
 
 if __name__ == "__main__":
   go()
@@ -0,0 +1,75 @@
+import io
+import json
+
+import pytest
+
+from ts_type_filter import batch_normalize
+from ts_type_filter.batch_normalize import normalize_jsonl
+from ts_type_filter.normalize import create_normalizer
+
+
+spec = {
+    "types": {"burger": "Burger", "ketchup": "Sauce"},
+    "defaults": {"Burger": {"size": None}, "Sauce": {"amount": None}},
+    "duplicates": {},
+}
+
+
+def make_records(count):
+    return [
+        {
+            "items": [
+                {"name": "burger", "size": None if i % 2 else "large"},
+                {"name": "ketchup", "id": i},
+            ]
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.mark.parametrize("processes", [0, 2])
+@pytest.mark.parametrize("remove_defaults", [False, True])
+def test_normalize_jsonl(processes, remove_defaults):
+    records = make_records(50)
+    input = io.StringIO("\n".join(json.dumps(r) for r in records) + "\n\n")
+    output = io.StringIO()
+
+    statistics = normalize_jsonl(
+        input, output, spec, remove_defaults, processes=processes, chunk_size=7
+    )
+
+    normalizer = create_normalizer(spec, remove_defaults)
+    expected = [normalizer(r) for r in records]
+    observed = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert observed == expected
+    assert statistics["records"] == 50
+
+
+def test_normalize_jsonl_files(tmp_path):
+    input = tmp_path / "carts.jsonl"
+    output = tmp_path / "normalized.jsonl"
+    input.write_text(json.dumps({"name": "burger", "size": None}) + "\n", encoding="utf-8")
+    progress = []
+
+    normalize_jsonl(str(input), str(output), spec, processes=0, progress=progress.append)
+
+    assert output.read_text(encoding="utf-8") == '{"name": "burger"}\n'
+    assert progress[-1]["records"] == 1
+
+
+def test_normalize_jsonl_invalid_line():
+    input = io.StringIO('{"name": "burger"}\n{not json}\n')
+    with pytest.raises(ValueError, match="Line 2"):
+        normalize_jsonl(input, io.StringIO(), spec, processes=0)
+
+
+def test_normalize_jsonl_in_process_keeps_worker_normalizer(monkeypatch):
+    # A worker's normalizer isn't replaced by a batch run in the same process.
+    worker_normalizer = create_normalizer(spec, remove_defaults=False)
+    monkeypatch.setattr(batch_normalize, "_worker_normalizer", worker_normalizer)
+    output = io.StringIO()
+    normalize_jsonl(
+        io.StringIO('{"name": "burger", "size": null}\n'), output, spec, processes=0
+    )
+    assert output.getvalue() == '{"name": "burger"}\n'
+    assert batch_normalize._worker_normalizer is worker_normalizer
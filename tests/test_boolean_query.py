@@ -0,0 +1,48 @@
+import pytest
+
+from ts_type_filter.boolean_query import parse_boolean_query, positive_terms
+
+
+test_cases = [
+    ("chicken", ("term", "chicken"), "single word"),
+    (
+        "chicken sandwich",
+        ("and", (("term", "chicken"), ("term", "sandwich"))),
+        "implicit and",
+    ),
+    (
+        "chicken AND sandwich NOT spicy",
+        ("and", (("term", "chicken"), ("term", "sandwich"), ("not", ("term", "spicy")))),
+        "and not",
+    ),
+    (
+        "fries OR chips AND large",
+        ("or", (("term", "fries"), ("and", (("term", "chips"), ("term", "large"))))),
+        "and binds tighter than or",
+    ),
+    (
+        "(fries OR chips) AND large",
+        ("and", (("or", (("term", "fries"), ("term", "chips"))), ("term", "large"))),
+        "parentheses",
+    ),
+    ("NOT NOT spicy", ("not", ("not", ("term", "spicy"))), "double negation"),
+    ("fish and chips", ("and", (("term", "fish"), ("term", "and"), ("term", "chips"))), "lower case operator"),
+]
+
+
+@pytest.mark.parametrize(
+    "text, expected, test_name", test_cases, ids=[x[2] for x in test_cases]
+)
+def test_parse(text, expected, test_name):
+    assert parse_boolean_query(text) == expected
+
+
+@pytest.mark.parametrize("text", ["", "   ", "chicken AND", "(chicken", "chicken)", "OR fries", "NOT"])
+def test_parse_errors(text):
+    with pytest.raises(ValueError):
+        parse_boolean_query(text)
+
+
+def test_positive_terms():
+    tree = parse_boolean_query("(fries OR chips) AND large NOT (spicy OR hot)")
+    assert positive_terms(tree) == ["fries", "chips", "large"]
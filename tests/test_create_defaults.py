@@ -9,7 +9,7 @@ import pytest
 # # Add the current directory to sys.path so we can import create_defaults
 # sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from ts_type_filter import create_normalizer_spec
+from ts_type_filter import build_type_index, create_normalizer_spec
 from ts_type_filter import Define, Struct, Union, Literal, Type
 
 
@@ -191,4 +191,37 @@ def test_duplicate_names():
     duplicates = result["duplicates"]
     assert duplicates == {"duplicate": ["FirstStruct", "SecondStruct"]}
     # with pytest.raises(ValueError, match="Duplicate name string literals found: 'duplicate'"):
-    #     create_defaults(type_defs)
\ No newline at end of file
+    #     create_defaults(type_defs)
+
+def test_symbol_table_reuse():
+    """Test that a SymbolTable from build_type_index gives the same spec."""
+
+    type_defs = [
+        Define("Item", [], Struct({
+            "name": Type("ItemNames"),
+            "size?": Literal("small")
+        })),
+        Define("ItemNames", [], Union(Type("Drinks"), Literal("fries"))),
+        Define("Drinks", [], Union(Literal("soda"), Literal("water"))),
+        Define("Option", [], Struct({
+            "name": Type("Drinks"),
+            "ice?": Literal("light")
+        })),
+    ]
+
+    symbols, _ = build_type_index(type_defs)
+    assert create_normalizer_spec(type_defs, symbols) == create_normalizer_spec(type_defs)
+
+
+def test_cyclic_type_references():
+    """Test that cycles in name types terminate and keep every literal."""
+
+    type_defs = [
+        Define("A", [], Union(Literal("a"), Type("B"))),
+        Define("B", [], Union(Literal("b"), Type("A"))),
+        Define("First", [], Struct({"name": Type("B"), "x?": Literal(1)})),
+        Define("Second", [], Struct({"name": Type("A"), "y?": Literal(1)})),
+    ]
+
+    result = create_normalizer_spec(type_defs)
+    assert result["duplicates"] == {"a": ["First", "Second"], "b": ["First", "Second"]}
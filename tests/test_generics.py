@@ -0,0 +1,142 @@
+import json
+
+from ts_type_filter import (
+    compile_schema,
+    create_normalizer_spec,
+    create_validating_normalizer,
+    create_validator2,
+    GenericInstances,
+    Literal,
+    parse,
+    Struct,
+    Type,
+)
+from ts_type_filter.generics import references_names, type_key
+
+
+def read_menu():
+    with open("samples/menu/data/menu.ts", encoding="utf-8") as f:
+        return parse(f.read())
+
+
+schema = """
+type OPTION<NAME> = { name: NAME; amount?: "light" | "regular" | "extra" };
+type Sauce = OPTION<"ketchup" | "mustard">;
+type Syrup = OPTION<"ketchup" | "mustard">;
+type Burger = {
+  name: "burger";
+  sauces?: OPTION<"ketchup" | "mustard">[];
+};
+type Cart = { items: (Burger | Sauce | Syrup)[] };
+"""
+
+
+def test_type_key():
+    assert type_key(Literal("a")) == type_key(Literal("a", ["alias"]))
+    assert type_key(Literal("1")) != type_key(Literal(1))
+    assert type_key(Type("OPTION", [Literal("a")])) == type_key(
+        Type("OPTION", [Literal("a")])
+    )
+    assert type_key(Type("OPTION", [Literal("a")])) != type_key(
+        Type("OPTION", [Literal("b")])
+    )
+
+
+def test_references_names():
+    type_defs = parse("type A<T> = { x: T[] | B<T>; y: string };")
+    body = type_defs[0].type
+    assert references_names(body, {"T"})
+    assert not references_names(body, {"U"})
+    assert references_names(body.obj["x"], {"B"})
+
+
+def test_instantiate_is_hash_consed():
+    type_defs = parse(schema)
+    option = type_defs[0]
+    generics = GenericInstances()
+
+    a = generics.instantiate(option, [Literal("ketchup")])
+    b = generics.instantiate(option, [Literal("ketchup")])
+    c = generics.instantiate(option, [Literal("mustard")])
+
+    assert isinstance(a, Struct)
+    assert a is b
+    assert a is not c
+    assert a.obj["name"].text == "ketchup"
+    assert generics.statistics() == {
+        "instances": 2,
+        "products": 0,
+        "hits": 1,
+        "misses": 2,
+    }
+
+
+def test_product():
+    type_defs = parse(schema)
+    option = type_defs[0]
+    generics = GenericInstances()
+    built = []
+
+    def build():
+        # A recursive request for the same product gets a forwarder.
+        forward = generics.product("test", option, [Literal("a")], build)
+        built.append(forward)
+        return lambda value: value == "a"
+
+    product = generics.product("test", option, [Literal("a")], build)
+    assert len(built) == 1
+    assert built[0] is not product
+    assert built[0]("a") and not built[0]("b")
+    assert generics.product("test", option, [Literal("a")], build) is product
+    assert generics.product("other", option, [Literal("a")], build) is not product
+
+
+def test_shared_instances():
+    type_defs = parse(schema)
+    generics = GenericInstances()
+    spec = create_normalizer_spec(type_defs, generics=generics)
+    validator = create_validator2(type_defs, "Cart", generics)
+
+    assert spec == create_normalizer_spec(type_defs)
+    # Sauce, Syrup and Burger.sauces instantiate OPTION with equal arguments.
+    statistics = generics.statistics()
+    assert statistics["instances"] == 1
+    assert statistics["hits"] >= 2
+
+    assert validator({"items": [{"name": "ketchup"}, {"name": "burger"}]})
+    assert validator(
+        {"items": [{"name": "burger", "sauces": [{"name": "mustard"}]}]}
+    )
+    assert not validator({"items": [{"name": "relish"}]})
+    assert not validator(
+        {"items": [{"name": "burger", "sauces": [{"name": "burger"}]}]}
+    )
+
+
+def test_menu():
+    type_defs = read_menu()
+    generics = GenericInstances()
+    assert create_normalizer_spec(
+        type_defs, generics=generics
+    ) == create_normalizer_spec(type_defs)
+
+    validator = create_validator2(type_defs, "Cart")
+    cached = create_validator2(type_defs, "Cart", generics)
+    fused = create_validating_normalizer(type_defs, "Cart", generics=generics)
+    assert generics.statistics()["hits"] > 0
+
+    with open("samples/menu/data/cases.json", encoding="utf-8") as f:
+        cases = json.load(f)
+    for case in cases:
+        for turn in case["turns"]:
+            cart = turn["expected"]
+            assert cached(cart) == validator(cart)
+            assert fused(cart)[0] == validator(cart)
+
+
+def test_compile_schema_generics():
+    compiled = compile_schema(parse(schema))
+    assert compiled.generics.statistics()["instances"] == 1
+    validator = compiled.validator("Cart")
+    assert validator({"items": [{"name": "mustard", "amount": "extra"}]})
+    assert not validator({"items": [{"name": "mustard", "amount": "some"}]})
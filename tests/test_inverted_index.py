@@ -0,0 +1,431 @@
+import json
+
+import pytest
+
+from ts_type_filter import Index
+from ts_type_filter.inverted_index import break_and_fold
+from ts_type_filter.profiling import ProfileHistograms
+
+
+breaker_cases = [
+    ("large coke", ["large", "coke"], "whitespace"),
+    ("  fries,  coke?", ["fries", "coke"], "punctuation"),
+    ("Jalapeños", ["jalapenos"], "accents"),
+    ("JALAPEÑO POPPERS!", ["jalapeno", "poppers"], "uppercase accents"),
+    ("don't", ["don't"], "apostrophe"),
+    ("beauty’s rose", ["beauty’s", "rose"], "curly apostrophe"),
+    ("7up/sprite", ["7up", "sprite"], "slash and digits"),
+    ("", [], "empty"),
+]
+
+
+@pytest.mark.parametrize(
+    "text, expected, test_name", breaker_cases, ids=[x[2] for x in breaker_cases]
+)
+def test_break_and_fold(text, expected, test_name):
+    assert break_and_fold(text) == expected
+
+
+def test_match_with_punctuation_and_accents():
+    index = Index(breaker=break_and_fold)
+    documents = ["Jalapeño Poppers", "French Fries", "Coca-Cola"]
+    for document in documents:
+        index.add(document)
+
+    assert index.match("jalapenos, please") == ["Jalapeño Poppers"]
+    assert index.match("fries?") == ["French Fries"]
+    assert index.match("cola") == ["Coca-Cola"]
+    assert index.match("cola and fries") == ["French Fries", "Coca-Cola"]
+
+
+def build_index(documents, **kwargs):
+    index = Index(**kwargs)
+    for document in documents:
+        index.add(document)
+    return index
+
+
+def test_remove():
+    index = build_index(["red apple", "green apple", "red pepper"])
+    index.remove("green apple")
+
+    assert index.match("apple") == ["red apple"]
+    assert index.match("green") == []
+    assert index.match("red") == ["red apple", "red pepper"]
+
+    with pytest.raises(ValueError):
+        index.remove("green apple")
+
+
+def test_update():
+    class Document:
+        def __init__(self, text):
+            self.text = text
+
+    apple = Document("red apple")
+    pepper = Document("red pepper")
+    index = build_index([apple, pepper], extractor=lambda d: [d.text])
+    index.pin(apple)
+
+    apple.text = "green apple"
+    index.update(apple)
+
+    # Updated documents move to the end and keep their pinned status.
+    assert index.match("red") == [pepper, apple]
+    assert index.match("green") == [apple]
+    assert index.match("pepper") == [pepper, apple]
+
+    with pytest.raises(ValueError):
+        index.update(Document("unknown"))
+
+
+def test_add_after_remove():
+    index = build_index(["one", "two", "three"])
+    index.remove("one")
+    index.add("one")
+    assert index.match("one two three") == ["two", "three", "one"]
+
+
+def test_compaction():
+    documents = [f"word{i} common" for i in range(10)]
+    index = build_index(documents, compaction_ratio=0.5, compaction_minimum=4)
+
+    for document in documents[:4]:
+        index.remove(document)
+    assert len(index._tombstones) == 4
+    assert index.match("common") == documents[4:]
+
+    index.remove(documents[4])
+    assert len(index._tombstones) == 0
+    assert "word0" not in index._postings
+    assert index._postings["common"] == [0, 1, 2, 3, 4]
+    assert index.match("common") == documents[5:]
+    assert index.match("word7") == ["word7 common"]
+
+
+def test_compressed_postings():
+    documents = [f"doc{i} {'even' if i % 2 == 0 else 'odd'} common" for i in range(500)]
+    plain = build_index(documents)
+    compressed = build_index(documents, compress_postings=True)
+
+    assert isinstance(compressed._postings["common"], bytearray)
+    for query in ["even", "odd", "doc3 doc499", "common", "missing"]:
+        assert compressed.match(query) == plain.match(query)
+
+    compressed.compact()
+    assert isinstance(compressed._postings["common"], bytes)
+    assert compressed.match("common") == documents
+
+    # Appending reopens frozen postings lists.
+    compressed.add("late common")
+    plain.add("late common")
+    assert compressed.match("common") == plain.match("common")
+
+    for document in documents[:200]:
+        plain.remove(document)
+        compressed.remove(document)
+    assert compressed.match("common") == plain.match("common")
+    assert compressed.match("common") == documents[200:] + ["late common"]
+
+
+def test_match_cache():
+    index = build_index(["large coke", "small sprite", "large fries"])
+
+    assert index.match("large coke") == ["large coke", "large fries"]
+    assert index.match("a large coke please") == ["large coke", "large fries"]
+    assert index.match("coke large") == ["large coke", "large fries"]
+    stats = index.cache_statistics()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (2, 1, 1)
+
+    # Callers may modify the results without affecting the cache.
+    index.match("sprite").append("junk")
+    assert index.match("sprite") == ["small sprite"]
+
+    # Mutations invalidate the cache.
+    index.add("coke zero")
+    assert index.cache_statistics()["size"] == 0
+    assert index.match("large coke") == ["large coke", "large fries", "coke zero"]
+    index.remove("large fries")
+    assert index.match("large coke") == ["large coke", "coke zero"]
+    index.pin("small sprite")
+    assert index.match("large coke") == ["large coke", "small sprite", "coke zero"]
+
+
+def test_match_cache_eviction():
+    index = build_index(["one", "two", "three"], cache_size=2)
+    index.match("one")
+    index.match("two")
+    index.match("one")
+    index.match("three")
+    assert list(index._cache.keys()) == [("one",), ("three",)]
+
+    disabled = build_index(["one"], cache_size=0)
+    assert disabled.match("one") == ["one"]
+    assert disabled.cache_statistics()["size"] == 0
+
+
+def test_add_many():
+    documents = ["large coke", "regular fries", "large fries", "regular coke"]
+    one_at_a_time = build_index(
+        ["diet sprite"] + documents + ["large sprite"], compress_postings=True
+    )
+    bulk = Index(compress_postings=True)
+    bulk.add("diet sprite")
+    bulk.add_many(documents)
+    bulk.add("large sprite")
+
+    assert bulk.match("large") == ["large coke", "large fries", "large sprite"]
+    for query in ["large", "regular coke", "fries", "coke sprite"]:
+        assert bulk.match(query) == one_at_a_time.match(query)
+
+    with pytest.raises(ValueError):
+        bulk.add_many(["new", "large coke"])
+    with pytest.raises(ValueError):
+        bulk.add_many(["new", "new"])
+    assert bulk.match("new") == []
+
+
+def test_prefix_queries():
+    documents = ["cheeseburger", "chicken sandwich", "jalapeño poppers", "cheese fries"]
+    index = build_index(documents, breaker=break_and_fold)
+    assert index.match("jalap") == []
+
+    expanding = build_index(documents, breaker=break_and_fold, expand_prefixes=True)
+    assert expanding.match("jalap") == ["jalapeño poppers"]
+    assert expanding.match("cheeseburg") == ["cheeseburger"]
+    assert expanding.match("chees") == ["cheeseburger", "cheese fries"]
+    assert expanding.match("chicke sandw") == ["chicken sandwich"]
+    # Words shorter than minimum_prefix_length are not expanded.
+    assert expanding.match("a chi") == []
+
+    # The cache key holds the expanded terms, not the prefix.
+    assert expanding.match("jalapeno") == ["jalapeño poppers"]
+    assert expanding.cache_statistics()["hits"] == 1
+
+    # New terms are visible to prefix queries.
+    expanding.add("jalapeño burger")
+    assert expanding.match("jalap") == ["jalapeño poppers", "jalapeño burger"]
+
+
+def test_wildcard_queries():
+    index = build_index(["beauty", "beautiful rose", "beast", "rose"], prefix_limit=2)
+    assert index.expand_prefix("bea") == ["beast", "beauti"]
+    assert index.match("beaut*") == ["beauty", "beautiful rose"]
+    assert index.match("be*") == ["beauty", "beautiful rose", "beast"]
+    assert index.match("b*") == ["beauty", "beautiful rose", "beast"]
+    assert index.match("z*") == []
+
+
+def test_fuzzy_queries():
+    documents = ["chicken sandwich", "french fries", "coca-cola", "sprite"]
+    index = build_index(documents, breaker=break_and_fold)
+    assert index.match("chiken sandwhich") == []
+
+    fuzzy = build_index(documents, breaker=break_and_fold, fuzzy_distance=2)
+    assert fuzzy.match("chiken") == ["chicken sandwich"]
+    assert fuzzy.match("sandwhich") == ["chicken sandwich"]
+    assert fuzzy.match("sprit coca") == ["coca-cola", "sprite"]
+    assert fuzzy.match("pizza") == []
+    # Words shorter than minimum_fuzzy_length are not corrected.
+    assert fuzzy.match("cok") == []
+
+    fuzzy.add("chickpea salad")
+    assert fuzzy.match("chickpee") == ["chickpea salad"]
+
+
+def test_synonyms():
+    synonyms = {"soda": ["fountain drink", "pop"], "fries": ["chips"]}
+    documents = ["large soda", "small soda", "french fries", "pop tart"]
+    index = build_index(documents, breaker=break_and_fold, synonyms=synonyms)
+
+    assert index._synonyms["pop"] == ("soda",)
+    assert index._synonyms["chip"] == ("fri",)
+    assert index.match("pop") == ["large soda", "small soda", "pop tart"]
+    assert index.match("a fountain drink") == ["large soda", "small soda"]
+    assert index.match("chips") == ["french fries"]
+    assert index.match("soda") == ["large soda", "small soda"]
+    assert index.match("cola") == []
+
+
+def test_phrase_synonyms():
+    synonyms = {"soda": ["soft drink", "pop"]}
+    documents = ["large soda", "milk drink", "soft pretzel"]
+    index = build_index(documents, breaker=break_and_fold, synonyms=synonyms)
+
+    assert "drink" not in index._synonyms
+    assert index.match("a soft drink") == documents
+    # One word of a phrase doesn't stand for the whole phrase.
+    assert index.match("drink") == ["milk drink"]
+    assert index.match("soft") == ["soft pretzel"]
+    assert index.match("drink soft") == documents
+
+
+def test_stopwords():
+    documents = ["With Bacon", "Bacon Cheeseburger", "No Ice", "The Wiseguy"]
+    stopwords = ["with", "the", "a", "get", "please"]
+    index = build_index(
+        documents, breaker=break_and_fold, stopwords=stopwords, fuzzy_distance=1
+    )
+
+    assert "with" not in index._postings
+    assert "the" not in index._postings
+    assert index.match("can I get a wiseguy with no ice please") == [
+        "No Ice",
+        "The Wiseguy",
+    ]
+    assert index.match("with") == []
+    assert index.match("the") == []
+    assert index.match("bacon") == ["With Bacon", "Bacon Cheeseburger"]
+
+
+def test_statistics():
+    index = build_index(["red apple", "green apple", "red pepper", "hot pepper"])
+    index.pin("hot pepper")
+    index.remove("green apple")
+
+    stats = index.statistics(top=2)
+    assert json.loads(json.dumps(stats)) == stats
+    assert stats["documents"] == 3
+    assert stats["tombstones"] == 1
+    assert stats["pinned"] == 1
+    assert stats["vocabulary"] == 5
+    assert stats["postings"] == 8
+    assert stats["postings_histogram"] == {"1": 2, "2-3": 3}
+    assert stats["top_terms"] == [["appl", 2], ["pepper", 2]]
+    assert all(size > 0 for size in stats["bytes"].values())
+
+    index.compact()
+    stats = index.statistics()
+    assert stats["postings"] == 6
+    assert len(stats["top_terms"]) == stats["vocabulary"] == 4
+
+
+def test_match_boolean():
+    documents = [
+        "spicy chicken sandwich",
+        "grilled chicken sandwich",
+        "chicken nuggets",
+        "fish sandwich",
+        "spicy fries",
+    ]
+    index = build_index(documents)
+
+    assert index.match_boolean("chicken AND sandwich NOT spicy") == [
+        "grilled chicken sandwich"
+    ]
+    assert index.match_boolean("chicken sandwich") == [
+        "spicy chicken sandwich",
+        "grilled chicken sandwich",
+    ]
+    assert index.match_boolean("(fish OR nuggets) AND NOT spicy") == [
+        "chicken nuggets",
+        "fish sandwich",
+    ]
+    assert index.match_boolean("NOT sandwich") == ["chicken nuggets", "spicy fries"]
+    assert index.match_boolean("chicken AND burger") == []
+    assert index.match_boolean("sandwich* NOT chicken") == ["fish sandwich"]
+
+    index.pin("spicy fries")
+    index.remove("fish sandwich")
+    assert index.match_boolean("sandwich NOT spicy") == [
+        "grilled chicken sandwich",
+        "spicy fries",
+    ]
+
+    with pytest.raises(ValueError):
+        index.match_boolean("chicken AND")
+
+
+def test_match_boolean_stopwords():
+    index = build_index(
+        ["fish and chips", "fish tacos", "chips"], stopwords=["and", "with"]
+    )
+    # Stopwords don't narrow an AND, and a query of only stopwords matches
+    # every document.
+    assert index.match_boolean("fish AND with") == ["fish and chips", "fish tacos"]
+    assert index.match_boolean("with") == ["fish and chips", "fish tacos", "chips"]
+    assert index.match_boolean("NOT with") == []
+
+
+@pytest.mark.parametrize("store_spans", [False, True])
+def test_highlight(store_spans):
+    documents = ["Spicy Jalapeño Poppers, 6 pieces", "spicy fries"]
+    index = build_index(documents, breaker=break_and_fold, store_spans=store_spans)
+
+    assert (
+        index.highlight("jalapenos", documents[0])
+        == "Spicy [bold green]Jalapeño[/bold green] Poppers, 6 pieces"
+    )
+    assert (
+        index.highlight("spicy popper", documents[0], markup="ansi")
+        == "\x1b[1;32mSpicy\x1b[0m Jalapeño \x1b[1;32mPoppers\x1b[0m, 6 pieces"
+    )
+    assert (
+        index.highlight("fries & more", "Fries & <b>more</b>", markup="html")
+        == "<mark>Fries</mark> &amp; &lt;b&gt;<mark>more</mark>&lt;/b&gt;"
+    )
+    assert index.highlight("fries", documents[1], markup=("*", "*")) == "spicy *fries*"
+
+
+@pytest.mark.parametrize("store_spans", [False, True])
+def test_highlight_stopwords(store_spans):
+    index = build_index(
+        ["the burger"], stopwords=["the", "and"], store_spans=store_spans
+    )
+    assert index.match("the and") == []
+    assert index.highlight("the and", "the burger") == "the burger"
+    assert (
+        index.highlight("the burger", "the burger")
+        == "the [bold green]burger[/bold green]"
+    )
+
+
+def test_highlight_spans_survive_compaction():
+    documents = [f"item {i}" for i in range(4)] + ["onion rings"]
+    index = build_index(documents, store_spans=True)
+    for document in documents[:4]:
+        index.remove(document)
+    index.compact()
+    assert index.highlight("rings", "onion rings") == "onion [bold green]rings[/bold green]"
+
+
+def test_profiler():
+    profiles = []
+    index = build_index(
+        ["red apple", "green apple", "red pepper"], profiler=profiles.append
+    )
+
+    assert index.match("red apples") == ["red apple", "green apple", "red pepper"]
+    assert index.match("apples red") == ["red apple", "green apple", "red pepper"]
+    first, second = profiles
+    assert set(first["phases"]) == {"break", "stem", "lookup", "order"}
+    assert first["total"] >= sum(first["phases"].values())
+    assert (first["words"], first["stems"], first["postings"], first["matches"]) == (2, 2, 4, 3)
+    assert not first["cached"]
+    assert second["cached"]
+    assert second["postings"] == 0
+    assert second["phases"]["lookup"] == 0.0
+
+    index.profiler = None
+    index.match("pepper")
+    assert len(profiles) == 2
+
+
+def test_profile_histograms():
+    histograms = ProfileHistograms()
+    index = build_index(
+        ["red apple", "green apple", "red pepper"], profiler=histograms
+    )
+    for query in ["red", "apple", "red", "banana"]:
+        index.match(query)
+
+    summary = histograms.summary()
+    assert summary["queries"] == 4
+    assert summary["cached"] == 1
+    assert summary["histograms"]["matches"] == {"0": 1, "2-3": 3}
+    assert summary["histograms"]["stems"] == {"0": 1, "1": 3}
+    assert sum(summary["histograms"]["total"].values()) == 4
+    assert json.loads(json.dumps(summary)) == summary
+
+    histograms.clear()
+    assert histograms.summary()["queries"] == 0
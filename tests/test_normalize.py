@@ -0,0 +1,233 @@
+from collections import OrderedDict
+import copy
+
+import pytest
+
+from ts_type_filter import normalizer_compiler
+from ts_type_filter.normalize import (
+    IncrementalNormalizer,
+    create_normalizer,
+    normalize1,
+    normalize2,
+)
+from ts_type_filter.normalizer_compiler import compile_normalizer
+
+
+defaults = {
+    "burger": {"size": None, "extras": None},
+    "ketchup": {"amount": None},
+}
+
+
+def make_cart():
+    return {
+        "items": [
+            {"name": "burger", "extras": [{"name": "ketchup"}]},
+            {"name": "soda", "size": "large"},
+            {"name": "burger", "size": None, "extras": None},
+        ],
+        "notes": {"text": "no onions"},
+    }
+
+
+def test_normalize1():
+    cart = make_cart()
+    original = copy.deepcopy(cart)
+    result = normalize1(cart, defaults)
+
+    assert result == {
+        "items": [
+            {"size": None, "extras": [{"amount": None, "name": "ketchup"}], "name": "burger"},
+            {"name": "soda", "size": "large"},
+            {"size": None, "extras": None, "name": "burger"},
+        ],
+        "notes": {"text": "no onions"},
+    }
+    # Template keys come first, as if the template had been updated with
+    # the node.
+    assert list(result["items"][0]) == ["size", "extras", "name"]
+    assert cart == original
+    # Unchanged subtrees are shared.
+    assert result["items"][1] is cart["items"][1]
+    assert result["notes"] is cart["notes"]
+
+
+def test_normalize2():
+    cart = make_cart()
+    original = copy.deepcopy(cart)
+    result = normalize2(cart, defaults)
+
+    assert result == {
+        "items": [
+            {"name": "burger", "extras": [{"name": "ketchup"}]},
+            {"name": "soda", "size": "large"},
+            {"name": "burger"},
+        ],
+        "notes": {"text": "no onions"},
+    }
+    assert cart == original
+    assert result["items"][0] is cart["items"][0]
+    assert result["notes"] is cart["notes"]
+
+
+def test_unchanged_tree_is_shared():
+    cart = {"items": [{"name": "soda", "size": "large"}]}
+    assert normalize1(cart, defaults) is cart
+    assert normalize2(cart, defaults) is cart
+
+
+@pytest.mark.parametrize("normalize", [normalize1, normalize2])
+def test_in_place(normalize):
+    cart = make_cart()
+    expected = normalize(make_cart(), defaults)
+    items = cart["items"]
+    first = items[0]
+
+    result = normalize(cart, defaults, in_place=True)
+    assert result is cart
+    assert result == expected
+    assert list(result["items"][0]) == list(expected["items"][0])
+    assert result["items"] is items
+    assert result["items"][0] is first
+
+
+def test_mutable_defaults_are_copied():
+    mutable = {"burger": {"extras": []}}
+    first = normalize1({"name": "burger"}, mutable)
+    first["extras"].append("pickles")
+    assert normalize1({"name": "burger"}, mutable) == {"extras": [], "name": "burger"}
+
+
+spec = {
+    "types": {"burger": "Burger", "cheeseburger": "Burger", "ketchup": "Sauce"},
+    "defaults": {"Burger": {"size": None, "extras": None}, "Sauce": {"amount": None}},
+    "duplicates": {},
+}
+
+
+@pytest.mark.parametrize("remove_defaults", [False, True])
+@pytest.mark.parametrize("in_place", [False, True])
+def test_compiled_normalizer(remove_defaults, in_place):
+    interpreted = create_normalizer(spec, remove_defaults, in_place)
+    compiled = create_normalizer(spec, remove_defaults, in_place, compiled=True)
+
+    cart = make_cart()
+    cart["items"].append({"name": "cheeseburger", "size": "large"})
+    expected = interpreted(copy.deepcopy(cart))
+    observed = compiled(copy.deepcopy(cart))
+    assert observed == expected
+    assert [list(item) for item in observed["items"]] == [
+        list(item) for item in expected["items"]
+    ]
+    if not in_place:
+        assert compiled(cart)["notes"] is cart["notes"]
+
+
+def test_compiled_normalizer_cache():
+    first = compile_normalizer(spec)
+    assert compile_normalizer(copy.deepcopy(spec)) is first
+    assert compile_normalizer(spec, remove_defaults=False) is not first
+    assert "def normalize(node):" in first.source
+
+
+def test_compiled_normalizer_cache_key_order():
+    ab = {"types": {"t": "T"}, "defaults": {"T": {"a": None, "b": None}}}
+    ba = {"types": {"t": "T"}, "defaults": {"T": {"b": None, "a": None}}}
+    add_ab = compile_normalizer(ab, remove_defaults=False)
+    add_ba = compile_normalizer(ba, remove_defaults=False)
+    assert add_ab is not add_ba
+    assert list(add_ab({"name": "t"})) == ["a", "b", "name"]
+    assert list(add_ba({"name": "t"})) == ["b", "a", "name"]
+
+    # Equal values of different types are different specs.
+    one = {"types": {"t": "T"}, "defaults": {"T": {"a": 1}}}
+    true = {"types": {"t": "T"}, "defaults": {"T": {"a": True}}}
+    assert compile_normalizer(one) is not compile_normalizer(true)
+
+
+def test_compiled_normalizer_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(normalizer_compiler, "_cache", OrderedDict())
+    monkeypatch.setattr(normalizer_compiler, "_cache_size", 2)
+    specs = [{"types": {"t": "T"}, "defaults": {"T": {"a": i}}} for i in range(3)]
+    first = compile_normalizer(specs[0])
+    compile_normalizer(specs[1])
+    # Using the first spec again makes the second the least recently used.
+    assert compile_normalizer(specs[0]) is first
+    compile_normalizer(specs[2])
+    assert len(normalizer_compiler._cache) == 2
+    assert compile_normalizer(specs[0]) is first
+
+
+def test_compiled_normalizer_unmarshallable_defaults_are_not_cached():
+    class Marker:
+        def __eq__(self, other):
+            return isinstance(other, Marker)
+
+        # Identifies the object only by its address.
+        __repr__ = object.__repr__
+
+    unusual = {"types": {"a": "A"}, "defaults": {"A": {"marker": Marker()}}}
+    normalizer = compile_normalizer(unusual)
+    assert compile_normalizer(unusual) is not normalizer
+    assert normalizer({"name": "a", "marker": Marker()}) == {"name": "a"}
+
+
+def test_compiled_normalizer_constants():
+    unusual = {
+        "types": {"a": "A"},
+        "defaults": {"A": {"nan": float("nan"), "list": [], "quote": "it's"}},
+    }
+    add = compile_normalizer(unusual, remove_defaults=False)
+    first = add({"name": "a"})
+    first["list"].append(1)
+    assert add({"name": "a"})["list"] == []
+    remove = compile_normalizer(unusual)
+    assert remove({"name": "a", "quote": "it's", "list": []}) == {"name": "a"}
+
+
+@pytest.mark.parametrize("remove_defaults", [False, True])
+def test_incremental_normalizer(remove_defaults):
+    plain = create_normalizer(spec, remove_defaults)
+    incremental = create_normalizer(spec, remove_defaults, cache_size=4)
+    assert isinstance(incremental, IncrementalNormalizer)
+
+    cart = make_cart()
+    expected = plain(copy.deepcopy(cart))
+    assert incremental(copy.deepcopy(cart)) == expected
+    statistics = incremental.cache_statistics()
+    assert statistics["hits"] == 0
+    assert statistics["size"] == 4
+
+    # The next turn changes one item, and the others come from the cache.
+    cart["items"][1]["size"] = "small"
+    observed = incremental(copy.deepcopy(cart))
+    assert observed == plain(copy.deepcopy(cart))
+    assert [list(item) for item in observed["items"]] == [
+        list(item) for item in plain(copy.deepcopy(cart))["items"]
+    ]
+    statistics = incremental.cache_statistics()
+    assert statistics["hits"] == 2
+    assert statistics["size"] == statistics["capacity"] == 4
+
+    incremental.clear_cache()
+    assert incremental.cache_statistics()["size"] == 0
+
+
+def test_incremental_normalizer_cache_is_private():
+    incremental = create_normalizer(spec, False, cache_size=16)
+    cart = make_cart()
+    first = incremental(cart)
+    # Modifying the input doesn't affect later calls with an equal cart.
+    cart["items"][0]["extras"].append({"name": "ketchup", "amount": "extra"})
+    assert incremental(make_cart()) == first
+
+    # Values marshal can't encode are normalized without the cache.
+    tree = {"name": "burger", "when": object()}
+    assert incremental(tree) == create_normalizer(spec, False)(tree)
+    # 1 and True are equal, but they are different subtrees.
+    result = incremental(
+        [{"name": "ketchup", "amount": 1}, {"name": "ketchup", "amount": True}]
+    )
+    assert result[1]["amount"] is True
+    with pytest.raises(ValueError):
+        create_normalizer(spec, cache_size=16, in_place=True)
@@ -0,0 +1,59 @@
+import random
+
+import pytest
+
+from ts_type_filter.postings import (
+    decode_postings,
+    encode_postings,
+    gallop,
+    intersect_postings,
+    subtract_postings,
+    union_postings,
+)
+
+
+test_cases = [
+    ([], b"", "empty"),
+    ([0], b"\x00", "zero"),
+    ([1, 2, 3, 10], b"\x01\x01\x01\x07", "single byte gaps"),
+    ([127, 128], b"\x7f\x01", "largest single byte gap"),
+    ([128], b"\x80\x01", "smallest two byte gap"),
+    ([5, 300, 301], b"\x05\xa7\x02\x01", "mixed gaps"),
+    ([2**20, 2**21], b"\x80\x80\x40\x80\x80\x40", "three byte gaps"),
+]
+
+
+@pytest.mark.parametrize(
+    "ids, encoded, test_name", test_cases, ids=[x[2] for x in test_cases]
+)
+def test_round_trip(ids, encoded, test_name):
+    assert encode_postings(ids) == encoded
+    assert decode_postings(encode_postings(ids)) == ids
+
+
+def test_round_trip_large():
+    ids = list(range(0, 1_000_000, 997)) + list(range(1_000_000, 1_000_100))
+    assert decode_postings(encode_postings(ids)) == ids
+
+
+def test_gallop():
+    ids = [1, 3, 5, 7, 9, 11, 13]
+    for start in range(len(ids)):
+        for target in range(15):
+            expected = next(
+                (i for i in range(start, len(ids)) if ids[i] >= target), len(ids)
+            )
+            assert gallop(ids, target, start) == expected
+
+
+def test_set_operations():
+    rng = random.Random(0)
+    for _ in range(200):
+        lists = [
+            sorted(rng.sample(range(500), rng.randrange(0, 200)))
+            for _ in range(rng.randrange(1, 4))
+        ]
+        sets = [set(ids) for ids in lists]
+        assert intersect_postings(lists) == sorted(set.intersection(*sets))
+        assert union_postings(lists) == sorted(set.union(*sets))
+        assert subtract_postings(lists[0], lists[-1]) == sorted(sets[0] - sets[-1])
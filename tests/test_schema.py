@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+from ts_type_filter import (
+    build_filtered_types,
+    build_type_index,
+    compile_schema,
+    create_normalizer,
+    create_normalizer_spec,
+    create_validator2,
+    parse,
+)
+
+
+def read_menu():
+    with open("samples/menu/data/menu.ts", encoding="utf-8") as f:
+        return parse(f.read())
+
+
+schema = """
+type OPTION<NAME> = { name: NAME; amount?: "light" | "regular" | "extra" };
+type Sauce = OPTION<"ketchup" | "mustard">;
+type Burger = {
+  name: "burger" | "cheeseburger";
+  size?: "small" | "large";
+  options?: Sauce[];
+};
+type Cart = { items: (Burger | Sauce)[] };
+"""
+
+
+def test_compile_schema():
+    type_defs = parse(schema)
+    compiled = compile_schema(type_defs)
+    symbols, index = build_type_index(type_defs)
+
+    assert compiled.type_defs is type_defs
+    assert list(compiled.symbols.nodes) == list(symbols.nodes)
+    assert compiled.spec == create_normalizer_spec(type_defs)
+    assert set(compiled.templates) == {"OPTION", "Sauce", "Burger", "Cart"}
+    assert compiled.index.statistics() == index.statistics()
+
+    validator = create_validator2(type_defs, "Cart")
+    compiled_validator = compiled.validator("Cart")
+    carts = [
+        {"items": [{"name": "burger", "options": [{"name": "ketchup"}]}]},
+        {"items": [{"name": "burger", "size": "medium"}]},
+        {"items": [{"name": "mustard", "amount": "extra"}]},
+    ]
+    for cart in carts:
+        assert compiled_validator(cart) == validator(cart)
+
+    cart = {"items": [{"name": "burger", "size": "small"}]}
+    normalizer = create_normalizer(compiled.spec, False)
+    assert compiled.normalizer(False)(cart) == normalizer(cart)
+    assert compiled.validating_normalizer("Cart", False)(cart) == (
+        True,
+        normalizer(cart),
+    )
+
+    with pytest.raises(ValueError):
+        compiled.validator("Pizza")
+    with pytest.raises(ValueError):
+        compiled.validator("OPTION")
+
+
+@pytest.mark.parametrize("query", ["ketchup", "large cheeseburger", "pizza"])
+def test_compile_schema_filtered_types(query):
+    type_defs = read_menu()
+    compiled = compile_schema(type_defs)
+    symbols, index = build_type_index(type_defs)
+    expected = build_filtered_types(type_defs, symbols, index, query)
+    assert [x.format() for x in compiled.filtered_types(query)] == [
+        x.format() for x in expected
+    ]
+    assert json.dumps(compiled.spec) == json.dumps(create_normalizer_spec(type_defs))
@@ -0,0 +1,119 @@
+import pytest
+
+from ts_type_filter import Index, ShardedIndex
+from ts_type_filter.inverted_index import break_and_fold
+
+
+documents = [
+    "spicy chicken sandwich",
+    "grilled chicken sandwich",
+    "chicken nuggets",
+    "fish sandwich",
+    "spicy fries",
+    "large fries",
+    "small soda",
+    "large soda",
+]
+
+
+class Item:
+    def __init__(self, name):
+        self.name = name
+
+
+def item_extractor(item):
+    return [item.name]
+
+
+def failing_breaker(text):
+    if "poison" in text:
+        raise RuntimeError("Can't break " + text)
+    return break_and_fold(text)
+
+
+@pytest.fixture
+def sharded():
+    with ShardedIndex(breaker=break_and_fold, shards=3) as index:
+        yield index
+
+
+def test_matches_index(sharded):
+    index = Index(breaker=break_and_fold)
+    index.add_many(documents)
+    sharded.add_many(documents)
+
+    for query in ["chicken", "fries soda", "large", "burger", "sandwich*"]:
+        assert sharded.match(query) == index.match(query)
+    for query in ["chicken AND sandwich NOT spicy", "NOT large", "fries OR soda"]:
+        assert sharded.match_boolean(query) == index.match_boolean(query)
+
+    for index_ in (index, sharded):
+        index_.remove("chicken nuggets")
+        index_.pin("small soda")
+        index_.update("spicy fries")
+        index_.compact()
+    assert sharded.match("chicken fries") == index.match("chicken fries")
+    assert sharded.documents() == index.documents()
+    assert sharded.statistics()["pinned"] == 1
+    assert sharded.expand_prefix("sand") == index.expand_prefix("sand")
+
+
+def test_documents_need_not_be_picklable():
+    items = [Item("Chicken Sandwich"), Item("Onion Rings")]
+    with ShardedIndex(item_extractor, shards=2) as sharded:
+        sharded.add_many(items)
+        assert sharded.match("onion") == [items[1]]
+        assert sharded.highlight("onion", items[1]) == "[bold green]Onion[/bold green] Rings"
+        assert (
+            sharded.highlight("onion", items[1], markup="html")
+            == "<mark>Onion</mark> Rings"
+        )
+
+
+def test_errors(sharded):
+    sharded.add("fish sandwich")
+    with pytest.raises(ValueError):
+        sharded.add("fish sandwich")
+    with pytest.raises(ValueError):
+        sharded.remove("chicken nuggets")
+    with pytest.raises(ValueError):
+        sharded.pin("chicken nuggets")
+    with pytest.raises(ValueError):
+        sharded.match_boolean("fish AND")
+    assert sharded.match("fish") == ["fish sandwich"]
+
+
+def test_expansion_uses_all_shards():
+    # Prefix and fuzzy expansion pick terms from the vocabulary of all the
+    # shards, not from each shard's own.
+    cheeses = [f"cheese{letter}" for letter in "abcdefghijklmnopqrstuvwxyz"]
+    options = dict(expand_prefixes=True, prefix_limit=4, fuzzy_distance=2)
+    index = Index(**options)
+    index.add_many(cheeses + documents)
+    with ShardedIndex(shards=4, **options) as sharded:
+        sharded.add_many(cheeses + documents)
+
+        assert len(index.match("chees")) == 5
+        for query in ["chees", "chees*", "sandwhich", "large chees", "chick"]:
+            assert sharded.match(query) == index.match(query)
+        for query in ["chees OR fries", "sandw* AND NOT chick"]:
+            assert sharded.match_boolean(query) == index.match_boolean(query)
+        assert sharded.expand_prefix("chees") == index.expand_prefix("chees")
+        assert sharded.closest_terms("cheesz") == index.closest_terms("cheesz")
+        assert sharded.highlight("chees*", "cheesea cheesez") == index.highlight(
+            "chees*", "cheesea cheesez"
+        )
+
+
+def test_failed_add_many_adds_nothing():
+    with ShardedIndex(breaker=failing_breaker, shards=3) as sharded:
+        sharded.add_many(documents[:2])
+        with pytest.raises(RuntimeError):
+            sharded.add_many(documents[2:] + ["poison soda"])
+        assert sharded.documents() == documents[:2]
+        assert sharded.match("soda") == []
+        assert sharded.match("chicken") == documents[:2]
+
+        sharded.add_many(documents[2:])
+        assert sharded.documents() == documents
+        assert sharded.match("soda") == ["small soda", "large soda"]
@@ -0,0 +1,187 @@
+import copy
+import json
+import sys
+import threading
+
+import pytest
+
+from ts_type_filter import parse
+from ts_type_filter.batch_normalize import read_spec_file
+from ts_type_filter.normalize import create_normalizer_spec, merge_normalizer_specs
+from ts_type_filter.spec_store import (
+    SPEC_ARTIFACT_VERSION,
+    SpecStore,
+    load_spec,
+    save_spec,
+    schema_hash,
+)
+
+
+schema = """
+// A burger
+type Burger = { name: "burger"; size?: "small" | "large"; cheese?: boolean };
+type Sauce = { name: "ketchup" | "mustard"; amount?: "light" | "heavy" };
+type Cart = { items: (Burger | Sauce)[] };
+"""
+
+
+def test_schema_hash():
+    type_defs = parse(schema)
+    assert schema_hash(type_defs) == schema_hash(parse(schema))
+
+    # Layout and comments don't change the hash.
+    reformatted = parse(schema.replace("// A burger\n", "").replace("; ", ";\n  "))
+    assert schema_hash(reformatted) == schema_hash(type_defs)
+
+    changed = parse(schema.replace('"heavy"', '"extra"'))
+    assert schema_hash(changed) != schema_hash(type_defs)
+
+
+def test_save_and_load(tmp_path):
+    type_defs = parse(schema)
+    spec = create_normalizer_spec(type_defs)
+    path = str(tmp_path / "spec.json")
+    save_spec(path, spec, schema_hash(type_defs))
+
+    # Compare serialized specs, since defaults are added in their key order.
+    assert json.dumps(load_spec(path)) == json.dumps(spec)
+    assert json.dumps(load_spec(path, schema_hash(type_defs))) == json.dumps(spec)
+    assert json.dumps(read_spec_file(path)) == json.dumps(spec)
+    with pytest.raises(ValueError):
+        load_spec(path, "0" * 64)
+
+    with open(path) as f:
+        artifact = json.load(f)
+    artifact["version"] = SPEC_ARTIFACT_VERSION + 1
+    with open(path, "w") as f:
+        json.dump(artifact, f)
+    with pytest.raises(ValueError):
+        load_spec(path)
+
+
+def test_store(tmp_path):
+    type_defs = parse(schema)
+    key = schema_hash(type_defs)
+    store = SpecStore(str(tmp_path / "specs"))
+    assert store.load(key) is None
+
+    spec = store.spec(type_defs)
+    assert json.dumps(spec) == json.dumps(create_normalizer_spec(type_defs))
+    assert (tmp_path / "specs" / f"{key}.json").exists()
+    assert store.spec(type_defs) is spec
+
+    # A new process (store) reads the artifact instead of creating the spec.
+    other = SpecStore(str(tmp_path / "specs"))
+    assert json.dumps(other.load(key)) == json.dumps(spec)
+    assert other.load(key) is other.load(key)
+
+
+def test_concurrent_saves(tmp_path):
+    type_defs = parse(schema)
+    spec = create_normalizer_spec(type_defs)
+    key = schema_hash(type_defs)
+    directory = str(tmp_path / "specs")
+    errors = []
+    specs = []
+    # Switch threads often, so that saves overlap.
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+
+    def save_and_load():
+        try:
+            for _ in range(20):
+                # A new store misses its cache, so it may save the artifact.
+                store = SpecStore(directory)
+                specs.append(json.dumps(store.spec(type_defs)))
+                save_spec(store.path(key), spec, key)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=save_and_load) for _ in range(8)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+
+    assert errors == []
+    assert specs == [json.dumps(spec)] * 160
+    assert [p.name for p in (tmp_path / "specs").iterdir()] == [f"{key}.json"]
+
+
+def test_lazy_normalizer(tmp_path):
+    type_defs = parse(schema)
+    key = schema_hash(type_defs)
+    store = SpecStore(str(tmp_path))
+
+    # Creating the normalizer doesn't read the artifact.
+    normalizer = store.normalizer(key)
+    assert store.normalizer(key) is normalizer
+    with pytest.raises(ValueError):
+        normalizer({})
+
+    store.spec(type_defs)
+    cart = {"items": [{"name": "burger", "size": None}, {"name": "ketchup"}]}
+    assert normalizer(cart) == {"items": [{"name": "burger"}, {"name": "ketchup"}]}
+
+    add_defaults = SpecStore(str(tmp_path)).normalizer(key, remove_defaults=False)
+    assert add_defaults(cart) == {
+        "items": [
+            {"size": None, "cheese": None, "name": "burger"},
+            {"amount": None, "name": "ketchup"},
+        ]
+    }
+    assert list(add_defaults(cart)["items"][0]) == ["size", "cheese", "name"]
+
+
+def test_merge_shares_unchanged_entries():
+    original = {
+        "types": {"burger": "Burger"},
+        "defaults": {
+            "Burger": {"size": None},
+            "Sauce": {"amount": None},
+            "Drink": {},
+        },
+        "duplicates": {},
+    }
+    new = {
+        "types": {"burger": "Burger", "ketchup": "Condiment"},
+        "defaults": {
+            "Burger": {"size": None},
+            "Condiment": {"amount": None, "packets": 1},
+            "Side": {"salt": None},
+        },
+        "duplicates": {"x": ["A", "B"]},
+    }
+    before = copy.deepcopy((new, original))
+
+    merged, warnings = merge_normalizer_specs(new, original, {"Sauce": "Condiment"})
+
+    assert merged == {
+        "types": {"burger": "Burger", "ketchup": "Condiment"},
+        "duplicates": {"x": ["A", "B"]},
+        "defaults": {
+            "Burger": {"size": None},
+            "Condiment": {"amount": None, "packets": 1},
+            "Side": {"salt": None},
+        },
+    }
+    assert warnings == ["Type 'Drink' from original spec not found in new spec"]
+    assert (new, original) == before
+
+    # Unchanged entries are shared, and changed ones are new dicts.
+    assert merged["defaults"]["Burger"] is original["defaults"]["Burger"]
+    assert merged["defaults"]["Side"] is new["defaults"]["Side"]
+    assert merged["defaults"]["Condiment"] is not original["defaults"]["Sauce"]
+    assert merged["types"] is not new["types"]
+    assert merged["duplicates"]["x"] is not new["duplicates"]["x"]
+
+    # Values of a different type are changes, even if they compare equal.
+    merged, _ = merge_normalizer_specs(
+        {"defaults": {"Burger": {"size": True}}},
+        {"defaults": {"Burger": {"size": 1}}},
+        {},
+    )
+    assert merged["defaults"]["Burger"]["size"] is True
@@ -0,0 +1,73 @@
+import os
+import re
+import sys
+
+import pytest
+from nltk.stem.snowball import SnowballStemmer
+
+from ts_type_filter.stemmer import stem_english, stem_plural
+
+sys.path.append(
+    os.path.join(os.path.dirname(__file__), "..", "samples", "inverted_index")
+)
+import sonnets
+
+
+def vocabulary():
+    words = set()
+    for sonnet in sonnets.sonnets:
+        words.update(sonnet.split())
+    menu = os.path.join(
+        os.path.dirname(__file__), "..", "samples", "menu", "data", "menu.ts"
+    )
+    with open(menu, "r", encoding="utf-8") as f:
+        words.update(re.findall(r"\w+", f.read()))
+    return sorted(words)
+
+
+def test_matches_nltk_snowball():
+    nltk_stemmer = SnowballStemmer("english")
+    mismatches = [
+        (word, nltk_stemmer.stem(word), stem_english(word))
+        for word in vocabulary()
+        if nltk_stemmer.stem(word) != stem_english(word)
+    ]
+    assert mismatches == []
+
+
+english_cases = [
+    ("generously", "generous"),
+    ("communication", "communic"),
+    ("jalapeños", "jalapeño"),
+    ("fries", "fri"),
+    ("beauty’s", "beauti"),
+    ("succeeding", "succeed"),
+    ("hopping", "hop"),
+    ("hoping", "hope"),
+    ("relational", "relat"),
+]
+
+
+@pytest.mark.parametrize("word, expected", english_cases)
+def test_stem_english(word, expected):
+    assert stem_english(word) == expected
+
+
+plural_cases = [
+    ("Fries", "fry"),
+    ("Coke", "coke"),
+    ("berries", "berry"),
+    ("sandwiches", "sandwich"),
+    ("boxes", "box"),
+    ("tomatoes", "tomato"),
+    ("glass", "glass"),
+    ("Wiseguy's", "wiseguy"),
+    ("bus", "bus"),
+    ("pickles", "pickle"),
+    ("gas", "gas"),
+]
+
+
+@pytest.mark.parametrize("word, expected", plural_cases)
+def test_stem_plural(word, expected):
+    assert stem_plural(word) == expected
@@ -0,0 +1,36 @@
+import pytest
+
+from ts_type_filter.trigrams import edit_distance, TrigramIndex, trigrams
+
+
+def test_trigrams():
+    assert trigrams("fri") == {"$fr", "fri", "ri$"}
+    assert trigrams("a") == {"$a$"}
+
+
+distance_cases = [
+    ("chicken", "chicken", 2, 0),
+    ("chiken", "chicken", 2, 1),
+    ("chikcen", "chicken", 2, 1),
+    ("chcikne", "chicken", 2, 2),
+    ("cheese", "chicken", 2, 3),
+    ("frys", "fri", 2, 2),
+    ("sprite", "coke", 2, 3),
+    ("", "abc", 3, 3),
+]
+
+
+@pytest.mark.parametrize("a, b, limit, expected", distance_cases)
+def test_edit_distance(a, b, limit, expected):
+    assert edit_distance(a, b, limit) == expected
+    assert edit_distance(b, a, limit) == expected
+
+
+def test_closest():
+    index = TrigramIndex(["chicken", "chick", "cheeseburg", "coke", "cola"])
+    assert index.closest("chiken", 2, 16) == ["chicken"]
+    assert index.closest("chik", 1, 16) == ["chick"]
+    assert index.closest("coka", 1, 16) == ["coke", "cola"]
+    assert index.closest("sprite", 2, 16) == []
+    # Only the best candidate by shared trigrams is compared.
+    assert index.closest("cheeseburger", 2, 1) == ["cheeseburg"]
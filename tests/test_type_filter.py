@@ -172,3 +172,45 @@ def test_one_case(type_defs, query, expected, test_name):
     assert (
         observed == expected
     ), f"❌ Test Failed: {test_name} | Observed \n  {"\n  ".join(o)}\nExpected \n  {"\n  ".join(e)}"
+
+
+def test_synonyms():
+    type_defs = [
+        Define("Cart", [], Struct({"items": Array(Type("Item"))})),
+        Define("Item", [], Union(Type("Drink"), Type("Side"))),
+        Define("Drink", [], Union(Literal("Large Soda"), Literal("Small Soda"))),
+        Define("Side", [], Literal("French Fries")),
+    ]
+    symbols, indexer = build_type_index(type_defs, synonyms={"soda": ["pop"]})
+    reachable = build_filtered_types(type_defs, symbols, indexer, "a large pop")
+    observed = set(x.format() for x in reachable)
+    assert observed == parse(
+        """
+        type Cart={items:Item[]};
+        type Item="Large Soda"|"Small Soda";
+        """
+    )
+
+
+def test_statistics():
+    type_defs = [
+        Define("Drink", [], Union(Literal("Large Soda", ["Big Pop"]), Literal("Water"))),
+        Define("Side", [], Literal("French Fries", ["Chips", "Frites"], pinned=True)),
+    ]
+    _, indexer = build_type_index(type_defs)
+    stats = indexer.statistics()
+    assert stats["literals"] == 3
+    assert stats["aliases"] == 3
+    assert stats["pinned"] == 1
+
+
+def test_profiler():
+    type_defs = [
+        Define("Drink", [], Union(Literal("Large Soda"), Literal("Water"))),
+    ]
+    profiles = []
+    _, indexer = build_type_index(type_defs, profiler=profiles.append)
+    assert [x.text for x in indexer.nodes("a large soda")] == ["Large Soda"]
+    assert profiles[0]["words"] == 3
+    assert profiles[0]["stems"] == 2
+    assert profiles[0]["matches"] == 1
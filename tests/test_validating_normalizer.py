@@ -0,0 +1,159 @@
+import copy
+import json
+
+import pytest
+
+from ts_type_filter import (
+    create_normalizer,
+    create_normalizer_spec,
+    create_validating_normalizer,
+    create_validator2,
+    parse,
+)
+
+
+def read_menu_carts():
+    with open("samples/menu/data/cases.json", encoding="utf-8") as f:
+        cases = json.load(f)
+    return [turn["expected"] for case in cases for turn in case["turns"]]
+
+
+schema = """
+type OPTION<NAME> = { name: NAME; amount?: "light" | "regular" | "extra" };
+type Sauce = OPTION<"ketchup" | "mustard">;
+type Burger = {
+  name: "burger" | "cheeseburger";
+  size?: "small" | "large";
+  options?: Sauce[];
+};
+type Cart = { items: (Burger | Sauce)[]; total?: number };
+"""
+
+spec = {
+    "types": {"burger": "Burger", "cheeseburger": "Burger", "ketchup": "Sauce"},
+    "defaults": {
+        "Burger": {"size": "small", "options": []},
+        "Sauce": {"amount": "regular"},
+    },
+    "duplicates": {},
+}
+
+carts = [
+    {"items": []},
+    {"items": [{"name": "burger"}], "total": 3},
+    {
+        "items": [
+            {"name": "cheeseburger", "size": "small", "options": []},
+            {"name": "ketchup", "amount": "regular"},
+            {"name": "burger", "options": [{"name": "mustard", "amount": "extra"}]},
+        ]
+    },
+    # Invalid carts
+    {"items": [{"name": "burger", "size": None}]},
+    {"items": [{"name": "fries"}]},
+    {"items": [{"name": "ketchup", "amount": "lots"}]},
+    {"items": [{"name": "burger"}], "total": True},
+    {"items": {}},
+    {},
+]
+
+
+@pytest.mark.parametrize("remove_defaults", [False, True])
+@pytest.mark.parametrize("cart", carts)
+def test_validating_normalizer(cart, remove_defaults):
+    type_defs = parse(schema)
+    validator = create_validator2(type_defs, "Cart")
+    normalizer = create_normalizer(spec, remove_defaults)
+    validate_and_normalize = create_validating_normalizer(
+        type_defs, "Cart", remove_defaults, spec
+    )
+
+    original = copy.deepcopy(cart)
+    valid, normalized = validate_and_normalize(cart)
+    assert cart == original
+    assert valid == validator(cart)
+    if valid:
+        expected = normalizer(cart)
+        assert normalized == expected
+        assert json.dumps(normalized) == json.dumps(expected)
+    else:
+        assert normalized is None
+
+
+def test_validating_normalizer_shares_unchanged_subtrees():
+    type_defs = parse(schema)
+    validate_and_normalize = create_validating_normalizer(type_defs, "Cart", True, spec)
+    cart = {"items": [{"name": "mustard"}, {"name": "ketchup", "amount": "regular"}]}
+    valid, normalized = validate_and_normalize(cart)
+    assert valid
+    assert normalized["items"][0] is cart["items"][0]
+    assert normalized["items"][1] == {"name": "ketchup"}
+
+
+@pytest.mark.parametrize("remove_defaults", [False, True])
+def test_validating_normalizer_any(remove_defaults):
+    type_defs = parse(schema.replace("options?: Sauce[];", "options?: Sauce[]; notes?: any;"))
+    validate_and_normalize = create_validating_normalizer(
+        type_defs, "Cart", remove_defaults, spec
+    )
+    cart = {"items": [{"name": "burger", "notes": [{"name": "ketchup"}, 1, None]}]}
+    valid, normalized = validate_and_normalize(cart)
+    assert valid == create_validator2(type_defs, "Cart")(cart) == True
+    assert normalized == create_normalizer(spec, remove_defaults)(cart)
+
+
+def test_validating_normalizer_union_dispatch():
+    type_defs = parse(
+        """
+        type A = { name: "a" | "b"; x?: number };
+        type B = { name: "b"; y?: number };
+        type C = { name: string; z?: number };
+        type Item = A | B | C | "plain";
+        """
+    )
+    validator = create_validator2(type_defs, "Item")
+    validate_and_normalize = create_validating_normalizer(type_defs, "Item")
+    for value in [
+        {"name": "a", "x": 1},
+        {"name": "b", "y": 1},
+        {"name": "b", "x": 1},
+        {"name": "c", "z": 1},
+        {"name": "c", "x": 1},
+        {"name": 1},
+        "plain",
+        "other",
+    ]:
+        assert validate_and_normalize(value)[0] == validator(value)
+
+
+def test_validating_normalizer_recursive_type():
+    type_defs = parse("type Node = { name: 'node'; children?: Node[] };")
+    validate_and_normalize = create_validating_normalizer(type_defs, "Node")
+    assert validate_and_normalize({"name": "node", "children": [{"name": "node"}]})[0]
+    assert not validate_and_normalize({"name": "node", "children": [{}]})[0]
+
+
+@pytest.mark.parametrize("remove_defaults", [False, True])
+def test_menu(remove_defaults):
+    with open("samples/menu/data/menu.ts", encoding="utf-8") as f:
+        type_defs = parse(f.read())
+    spec = create_normalizer_spec(type_defs)
+    validator = create_validator2(type_defs, "Cart")
+    normalizer = create_normalizer(spec, remove_defaults)
+    validate_and_normalize = create_validating_normalizer(
+        type_defs, "Cart", remove_defaults, spec
+    )
+    # Not every expected cart matches the menu, e.g. Wiseguy options aren't
+    # an array in menu.ts.
+    valid_carts = 0
+    for cart in read_menu_carts():
+        valid, normalized = validate_and_normalize(cart)
+        assert valid == validator(cart)
+        if valid:
+            valid_carts += 1
+            assert json.dumps(normalized) == json.dumps(normalizer(cart))
+    assert valid_carts > 0
+    assert validate_and_normalize({"items": [{"name": "Super Cheeseburger"}]}) == (
+        False,
+        None,
+    )
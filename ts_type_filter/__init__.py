@@ -1,5 +1,11 @@
-from .normalize import create_normalizer, create_normalizer_spec, merge_normalizer_specs
+from .normalize import (
+    create_normalizer,
+    create_normalizer_spec,
+    IncrementalNormalizer,
+    merge_normalizer_specs,
+)
 from .inverted_index import Index
+from .sharded_index import ShardedIndex
 from .filter import (
     Any,
     AnyNode,
@@ -17,11 +23,14 @@ from .filter import (
     Type,
     Union,
 )
+from .generics import GenericInstances
 from .parser import (
     parse,
 )
 from .validator import (create_validator)
 from .validator2 import (create_validator2)
+from .validating_normalizer import create_validating_normalizer
+from .schema import CompiledSchema, compile_schema
 
 __all__ = [
     "Any",
@@ -30,13 +39,18 @@ __all__ = [
     "build_filtered_types",
     "build_type_index",
     "collect_string_literals",
+    "compile_schema",
+    "CompiledSchema",
     "create_normalizer",
     "create_normalizer_spec",
     "create_validator",
     "create_validator2",
+    "create_validating_normalizer",
     "merge_normalizer_specs",
     "normalize",
     "Define",
+    "GenericInstances",
+    "IncrementalNormalizer",
     "Index",
     "Literal",
     "Never",
@@ -44,6 +58,7 @@ __all__ = [
     "ParamDef",
     "ParamRef",
     "parse",
+    "ShardedIndex",
     "Struct",
     "Type",
     "Union",
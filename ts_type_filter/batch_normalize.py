@@ -0,0 +1,225 @@
+"""
+Batch normalization of JSONL files, such as logs of historical carts.
+
+normalize_jsonl() reads one JSON record per line from a file or stream,
+normalizes each record with a normalizer created from a spec, and writes
+the results as JSONL in input order. Records are parsed, normalized and
+serialized in a pool of worker processes. The spec is sent to each worker
+once, when the pool starts, and each task carries a chunk of raw lines.
+At most `max_pending` chunks are in flight at a time, so memory use is
+bounded no matter how large the input is.
+
+Usage:
+    python -m ts_type_filter.batch_normalize SPEC INPUT OUTPUT [options]
+
+SPEC is a normalizer spec saved as JSON (bare, or as a spec artifact from
+ts_type_filter.spec_store), or a TypeScript schema (.ts) to
+create one from. INPUT and OUTPUT may be "-" for stdin and stdout.
+"""
+
+import argparse
+from collections import deque
+import json
+import multiprocessing
+import sys
+import time
+
+from ts_type_filter.normalize import create_normalizer
+
+# The normalizer for the records in a worker process, set by _init_worker().
+_worker_normalizer = None
+
+
+def _create_normalizer(spec, remove_defaults, compiled):
+    # The records are parsed for the normalizer, so it can normalize in place.
+    return create_normalizer(spec, remove_defaults, in_place=True, compiled=compiled)
+
+
+def _init_worker(spec, remove_defaults, compiled):
+    global _worker_normalizer
+    _worker_normalizer = _create_normalizer(spec, remove_defaults, compiled)
+
+
+def _normalize_lines(normalizer, chunk):
+    """
+    Normalizes a chunk of (line number, line) pairs with normalizer and
+    returns the list of output lines.
+    """
+    output = []
+    for line_number, line in chunk:
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Line {line_number}: {e}") from None
+        output.append(json.dumps(normalizer(record), ensure_ascii=False))
+    return output
+
+
+def _normalize_chunk(chunk):
+    """
+    Normalizes a chunk of (line number, line) pairs in a worker process.
+    """
+    return _normalize_lines(_worker_normalizer, chunk)
+
+
+def _chunks(lines, chunk_size):
+    chunk = []
+    for line_number, line in enumerate(lines, 1):
+        if line.strip():
+            chunk.append((line_number, line))
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def normalize_jsonl(
+    input,
+    output,
+    spec,
+    remove_defaults=True,
+    processes=None,
+    chunk_size=256,
+    max_pending=None,
+    compiled=True,
+    progress=None,
+):
+    """
+    Normalizes every record of a JSONL input and writes them to a JSONL
+    output, in order. Blank lines are skipped.
+
+    Args:
+        input: A path, or a text stream of JSON records, one per line
+        output: A path, or a text stream for the normalized records
+        spec: A normalizer spec, as returned by create_normalizer_spec()
+        remove_defaults: If True, remove default fields (normalize2);
+            if False, add them (normalize1)
+        processes: Number of worker processes. None uses one per CPU, and 0
+            normalizes in the calling process.
+        chunk_size: Number of records sent to a worker in each task
+        max_pending: Maximum number of chunks in flight. Defaults to twice
+            the number of processes.
+        compiled: If True, workers use the compiled normalizer for the spec
+        progress: Optional callable, called with the statistics dict after
+            each chunk is written
+
+    Returns:
+        dict: The number of records, the elapsed seconds and the number of
+        records per second
+
+    Raises:
+        ValueError: If a line is not valid JSON
+    """
+    input_stream = open(input, "r", encoding="utf-8") if isinstance(input, str) else input
+    output_stream = (
+        open(output, "w", encoding="utf-8") if isinstance(output, str) else output
+    )
+    statistics = {"records": 0, "seconds": 0.0, "records_per_second": 0.0}
+    start = time.perf_counter()
+
+    def update_statistics():
+        statistics["seconds"] = time.perf_counter() - start
+        statistics["records_per_second"] = statistics["records"] / max(
+            statistics["seconds"], 1e-9
+        )
+
+    def write(lines):
+        for line in lines:
+            output_stream.write(line)
+            output_stream.write("\n")
+        statistics["records"] += len(lines)
+        if progress is not None:
+            update_statistics()
+            progress(statistics)
+
+    try:
+        chunks = _chunks(input_stream, chunk_size)
+        if processes == 0:
+            # A local normalizer, so that calls in the same process, e.g.
+            # from several threads, don't replace each other's.
+            normalizer = _create_normalizer(spec, remove_defaults, compiled)
+            for chunk in chunks:
+                write(_normalize_lines(normalizer, chunk))
+        else:
+            if processes is None:
+                processes = multiprocessing.cpu_count()
+            if max_pending is None:
+                max_pending = 2 * processes
+            with multiprocessing.Pool(
+                processes, _init_worker, (spec, remove_defaults, compiled)
+            ) as pool:
+                pending = deque()
+                for chunk in chunks:
+                    if len(pending) >= max_pending:
+                        write(pending.popleft().get())
+                    pending.append(pool.apply_async(_normalize_chunk, (chunk,)))
+                while pending:
+                    write(pending.popleft().get())
+    finally:
+        if isinstance(input, str):
+            input_stream.close()
+        if isinstance(output, str):
+            output_stream.close()
+
+    update_statistics()
+    return statistics
+
+
+def read_spec_file(path):
+    """
+    Returns the normalizer spec saved as JSON at path, or created from the
+    TypeScript schema at path if it ends with ".ts". The JSON may be a bare
+    spec or a spec artifact written by ts_type_filter.spec_store.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    if path.endswith(".ts"):
+        from ts_type_filter import create_normalizer_spec, parse
+
+        return create_normalizer_spec(parse(text))
+    spec = json.loads(text)
+    if "schema_hash" in spec:
+        from ts_type_filter import spec_store
+
+        return spec_store.load_spec(path)
+    return spec
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m ts_type_filter.batch_normalize",
+        description="Normalize the JSON records in a JSONL file.",
+    )
+    parser.add_argument("spec", help="normalizer spec (.json) or schema (.ts)")
+    parser.add_argument("input", help="input JSONL file, or - for stdin")
+    parser.add_argument("output", help="output JSONL file, or - for stdout")
+    parser.add_argument(
+        "--add-defaults",
+        action="store_true",
+        help="add default fields instead of removing them",
+    )
+    parser.add_argument(
+        "--processes", type=int, default=None, help="worker processes (0 for none)"
+    )
+    parser.add_argument("--chunk-size", type=int, default=256)
+    args = parser.parse_args(argv)
+
+    statistics = normalize_jsonl(
+        sys.stdin if args.input == "-" else args.input,
+        sys.stdout if args.output == "-" else args.output,
+        read_spec_file(args.spec),
+        remove_defaults=not args.add_defaults,
+        processes=args.processes,
+        chunk_size=args.chunk_size,
+    )
+    print(
+        f"Normalized {statistics['records']:,} records in "
+        f"{statistics['seconds']:.2f} seconds "
+        f"({statistics['records_per_second']:,.0f} records/second)",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Parser for boolean queries against the inverted index.
+
+The grammar, from lowest to highest precedence, is
+
+  query   := and ("OR" and)*
+  and     := unary (["AND"] unary)*
+  unary   := "NOT" unary | primary
+  primary := "(" query ")" | word
+
+Adjacent operands with no operator between them are ANDed, so
+`chicken sandwich NOT spicy` is the same as
+`chicken AND sandwich AND NOT spicy`. Operators must be upper case, which
+leaves lower case "and", "or" and "not" free to appear as ordinary words.
+
+The parser produces a tree of tuples, which is hashable so that it can be
+used as a cache key:
+
+  ("term", word)
+  ("not", operand)
+  ("and", (operand, ...))
+  ("or", (operand, ...))
+"""
+
+import re
+
+_token_pattern = re.compile(r"[()]|[^\s()]+")
+_operators = ("AND", "OR", "NOT")
+
+
+def parse_boolean_query(text):
+  """
+  Parses `text` into a query tree. Raises ValueError if `text` is empty or
+  is not a well formed query.
+  """
+  parser = _Parser(_token_pattern.findall(text))
+  if not parser.tokens:
+    raise ValueError("Empty boolean query")
+  tree = parser.parse_or()
+  if parser.position < len(parser.tokens):
+    raise ValueError(
+      f"Unexpected '{parser.tokens[parser.position]}' in boolean query '{text}'")
+  return tree
+
+
+class _Parser:
+  def __init__(self, tokens):
+    self.tokens = tokens
+    self.position = 0
+
+  def peek(self):
+    if self.position < len(self.tokens):
+      return self.tokens[self.position]
+    return None
+
+  def next(self):
+    token = self.peek()
+    if token is None:
+      raise ValueError("Unexpected end of boolean query")
+    self.position += 1
+    return token
+
+  def parse_or(self):
+    operands = [self.parse_and()]
+    while self.peek() == "OR":
+      self.next()
+      operands.append(self.parse_and())
+    return operands[0] if len(operands) == 1 else ("or", tuple(operands))
+
+  def parse_and(self):
+    operands = [self.parse_unary()]
+    while self.peek() not in (None, "OR", ")"):
+      if self.peek() == "AND":
+        self.next()
+      operands.append(self.parse_unary())
+    return operands[0] if len(operands) == 1 else ("and", tuple(operands))
+
+  def parse_unary(self):
+    if self.peek() == "NOT":
+      self.next()
+      return ("not", self.parse_unary())
+    return self.parse_primary()
+
+  def parse_primary(self):
+    token = self.next()
+    if token == "(":
+      tree = self.parse_or()
+      if self.next() != ")":
+        raise ValueError("Expected ')' in boolean query")
+      return tree
+    if token == ")" or token in _operators:
+      raise ValueError(f"Unexpected '{token}' in boolean query")
+    return ("term", token)
+
+
+def positive_terms(tree):
+  """
+  Returns the words in `tree` that are not under a NOT, for highlighting
+  the parts of a document that satisfied the query.
+  """
+  operator, operands = tree
+  if operator == "term":
+    return [operands]
+  if operator == "not":
+    return []
+  return [word for operand in operands for word in positive_terms(operand)]
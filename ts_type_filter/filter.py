@@ -4,7 +4,7 @@ from typing import List, Optional
 
 from gotaglio.shared import to_json_string
 
-from .inverted_index import Index
+from .inverted_index import break_and_fold, english_stopwords, Index
 
 
 def extractor(node):
@@ -17,9 +17,12 @@ def extractor(node):
 
 
 class TypeIndex:
-    def __init__(self):
-        self._index = Index(extractor)
-        pass
+    def __init__(self, **index_options):
+        # index_options are passed through to Index, e.g. expand_prefixes,
+        # or a profiler to time the match() behind each call to nodes().
+        # Queries are conversational, so drop function words by default.
+        index_options.setdefault("stopwords", english_stopwords)
+        self._index = Index(extractor, break_and_fold, **index_options)
 
     def add(self, node):
         self._index.add(node)
@@ -29,10 +32,54 @@ class TypeIndex:
         if node.pinned:
             self._index.pin(node)
 
+    def add_many(self, nodes):
+        nodes = list(nodes)
+        self._index.add_many(nodes)
+        for node in nodes:
+            if node.pinned:
+                self._index.pin(node)
+
+    def remove(self, node):
+        self._index.remove(node)
+
+    def update(self, node):
+        # Re-add rather than delegating to Index.update() so that a change
+        # to node.pinned is picked up along with the change to its text.
+        self._index.remove(node)
+        self.add(node)
+
     def nodes(self, terms):
         matches = self._index.match(terms)
         return matches
 
+    def boolean_nodes(self, query):
+        # See Index.match_boolean() for the query syntax.
+        return self._index.match_boolean(query)
+
+    def statistics(self, top=20):
+        """
+        Returns Index.statistics() for the underlying index, along with the
+        number of indexed literals and the number of aliases they carry.
+        """
+        stats = self._index.statistics(top)
+        literals = self._index.documents()
+        stats["literals"] = len(literals)
+        stats["aliases"] = sum(len(node.aliases or ()) for node in literals)
+        return stats
+
+
+class NodeCollector:
+    """
+    Stands in for a TypeIndex during Node.index() to gather the nodes
+    to be indexed, so that they can be passed to TypeIndex.add_many().
+    """
+
+    def __init__(self):
+        self.nodes = []
+
+    def add(self, node):
+        self.nodes.append(node)
+
 
 class SymbolTable:
     def __init__(self):
@@ -522,6 +569,11 @@ def build_symbol_table(nodes):
     for node in nodes:
         if isinstance(node, Define):
             symbols.add(node.name, node)
+    add_builtin_symbols(symbols)
+    return symbols
+
+
+def add_builtin_symbols(symbols):
     # TODO: BUGBUG: is this necessary?
     symbols.add("any", Any)
     symbols.add("false", FalseValue)
@@ -532,31 +584,54 @@ def build_symbol_table(nodes):
     symbols.add("boolean", Boolean)
     # Note: 'never' is already implemented as the Never class
     symbols.add("never", Never())
-    return symbols
 
 
-def build_type_index(type_defs):
+def build_type_index(type_defs, synonyms=None, **index_options):
+    """
+    Builds the symbol table and term index for a list of type definitions.
+
+    Args:
+      type_defs (list): The parsed type definitions.
+      synonyms (dict): Optional shop-wide synonyms, mapping words or phrases
+        in the literals to lists of alternatives that customers might use,
+        e.g. {"soda": ["fountain drink", "pop"]}. Unlike LITERAL<> aliases,
+        these apply to every literal containing the word.
+      index_options: Additional keyword arguments for Index. These include
+        `stopwords`, which defaults to english_stopwords for menus. Pass
+        stopwords=() to index and match every word.
+
+    Returns:
+      tuple: (symbols, indexer)
+    """
     # Build the symbol table for type name references.
     symbols = build_symbol_table(type_defs)
 
-    # Build index of terms mentioned in types.
-    indexer = TypeIndex()
+    # Collect the nodes that mention terms, then index them in bulk
+    # so that words shared by many literals are stemmed once.
+    collector = NodeCollector()
     for x in type_defs:
         # If x is not a comment
         if type(x) is not str:
-            x.index(symbols, indexer)
+            x.index(symbols, collector)
 
-    # TODO: BUGBUG: is this necessary?
-    Any.index(symbols, indexer)
-    
-    # Index built-in types so they're searchable
-    String.index(symbols, indexer)
-    Number.index(symbols, indexer)
-    Boolean.index(symbols, indexer)
+    index_builtins(symbols, collector)
+
+    indexer = TypeIndex(synonyms=synonyms, **index_options)
+    indexer.add_many(collector.nodes)
 
     return symbols, indexer
 
 
+def index_builtins(symbols, collector):
+    # TODO: BUGBUG: is this necessary?
+    Any.index(symbols, collector)
+
+    # Index built-in types so they're searchable
+    String.index(symbols, collector)
+    Number.index(symbols, collector)
+    Boolean.index(symbols, collector)
+
+
 def build_filtered_types(type_defs, symbols, indexer, text):
     # Filter the graph based on search terms
     nodes = indexer.nodes(text)
@@ -0,0 +1,195 @@
+"""
+A shared cache of generic type instantiations.
+
+A menu can instantiate the same generic with the same arguments many times,
+e.g. FrenchFries<SIZE> in every meal. GenericInstances substitutes the
+arguments into a generic's body once for each distinct instantiation, keyed
+by the generic's name and a structural key of the arguments, and returns
+the same (hash-consed) body for every equal instantiation after that.
+Consumers can also cache what they build for an instantiation with
+product(), under the same key, so that, for example, the validator for
+FrenchFries<SIZE> is built once rather than once per reference.
+
+create_normalizer_spec(), create_validator2(), create_validating_normalizer()
+and compile_schema() accept a GenericInstances, so that one cache can serve
+all of them. A cache is for a single schema: instantiations are keyed by
+type name, not by Define.
+"""
+
+import threading
+
+from ts_type_filter.filter import Array, Define, Literal, ParamRef, Struct, Type, Union
+
+
+def type_key(node):
+    """
+    Returns a hashable key for a type node, equal for structurally equal
+    nodes. Literal aliases don't affect the key.
+    """
+    # Nodes are ABCs, on which isinstance() is slow, and keys are computed
+    # for every instantiation, so the node's class is compared directly.
+    kind = type(node)
+    if kind is Literal:
+        return ("literal", type(node.text).__name__, node.text)
+    elif kind is Type:
+        if not node.params:
+            return ("type", node.name, ())
+        return ("type", node.name, tuple(type_key(p) for p in node.params))
+    elif kind is Union:
+        return ("union", tuple(type_key(t) for t in node.types))
+    elif kind is Struct:
+        return ("struct", tuple((k, type_key(v)) for k, v in node.obj.items()))
+    elif kind is Array:
+        return ("array", type_key(node.type))
+    elif kind is ParamRef:
+        return ("param", type_key(node.type))
+    # Nodes without structure, like Any and Never, are equal to any other
+    # node of their class. The key holds the node's class, not the node.
+    return (kind,)
+
+
+def references_names(node, names):
+    """
+    Returns True if any Type reference in node, or in its type arguments,
+    is to one of names, e.g. to the parameters of an enclosing generic.
+    """
+    if not names:
+        return False
+    kind = type(node)
+    if kind is Type:
+        return node.name in names or any(
+            references_names(p, names) for p in node.params or ()
+        )
+    elif kind is Union:
+        return any(references_names(t, names) for t in node.types)
+    elif kind is Struct:
+        return any(references_names(v, names) for v in node.obj.values())
+    elif kind is Array or kind is ParamRef:
+        return references_names(node.type, names)
+    return False
+
+
+def substitute_type_parameters(node, param_mapping):
+    """
+    Substitute type parameters in a type node with actual types.
+
+    Args:
+        node: The type node to process
+        param_mapping: Dictionary mapping parameter names to actual types
+
+    Returns:
+        A new node with type parameters substituted
+    """
+    if isinstance(node, Type):
+        if node.name in param_mapping:
+            return param_mapping[node.name]
+        else:
+            # Recursively substitute in type parameters if any
+            new_params = None
+            if node.params:
+                new_params = [
+                    substitute_type_parameters(p, param_mapping) for p in node.params
+                ]
+            return Type(node.name, new_params)
+
+    elif isinstance(node, Struct):
+        new_obj = {}
+        for field_name, field_type in node.obj.items():
+            new_obj[field_name] = substitute_type_parameters(field_type, param_mapping)
+        return Struct(new_obj)
+
+    elif isinstance(node, Union):
+        new_types = [substitute_type_parameters(t, param_mapping) for t in node.types]
+        return Union(*new_types)
+
+    elif isinstance(node, Array):
+        return Array(substitute_type_parameters(node.type, param_mapping))
+
+    elif isinstance(node, Literal):
+        return node  # Literals don't need substitution
+
+    else:
+        # For other node types, return as-is
+        return node
+
+
+def parameter_mapping(define, args):
+    """
+    Returns a dict mapping the names of the parameters of define to args.
+    """
+    return {
+        param if isinstance(param, str) else param.name: arg
+        for param, arg in zip(define.params, args)
+    }
+
+
+class GenericInstances:
+    """
+    A cache of instantiated generic types for one schema, and of products
+    compiled from them.
+    """
+
+    def __init__(self):
+        self._instances = {}
+        self._products = {}
+        self._lock = threading.RLock()
+        self._hits = 0
+        self._misses = 0
+
+    def key(self, define, args):
+        return (define.name, tuple(type_key(arg) for arg in args))
+
+    def instantiate(self, define: Define, args):
+        """
+        Returns the body of define with args substituted for its parameters.
+        Equal instantiations return the same node, so it must not be
+        modified.
+        """
+        key = self.key(define, args)
+        with self._lock:
+            instance = self._instances.get(key)
+            if instance is not None:
+                self._hits += 1
+                return instance
+            self._misses += 1
+            instance = substitute_type_parameters(
+                define.type, parameter_mapping(define, args)
+            )
+            self._instances[key] = instance
+            return instance
+
+    def product(self, kind, define: Define, args, build):
+        """
+        Returns build() for the instantiation of define with args, calling
+        build once per kind of product and distinct instantiation. build
+        can call instantiate() if it needs the body. Products must be
+        callables. While build runs, a recursive request for the same
+        product gets a callable that forwards to it.
+        """
+        key = (kind, self.key(define, args))
+        with self._lock:
+            product = self._products.get(key)
+            if product is not None:
+                self._hits += 1
+                return product
+            self._misses += 1
+            built = []
+            self._products[key] = lambda *args: built[0](*args)
+        product = build()
+        built.append(product)
+        with self._lock:
+            self._products[key] = product
+        return product
+
+    def statistics(self):
+        """
+        Returns a dict with the number of instantiations and products in the
+        cache, and the number of lookups that hit and missed.
+        """
+        with self._lock:
+            return {
+                "instances": len(self._instances),
+                "products": len(self._products),
+                "hits": self._hits,
+                "misses": self._misses,
+            }
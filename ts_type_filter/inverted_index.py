@@ -1,13 +1,37 @@
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+import html
 import re
+import sys
+import threading
+import time
+import unicodedata
+
+from .boolean_query import parse_boolean_query
+from .postings import (
+  append_posting,
+  decode_postings,
+  encode_postings,
+  intersect_postings,
+  subtract_postings,
+  union_postings,
+)
+from .profiling import histogram_bucket
+from .stemmer import EnglishStemmer
+from .trigrams import TrigramIndex, closest_candidates
 
-# Lazy initialization to avoid import cost
 _default_stemmer = None
 
 def get_default_stemmer():
+    """
+    Returns the shared built-in English Snowball stemmer. It produces the
+    same stems as nltk's SnowballStemmer("english") without the cost of
+    importing nltk.
+    """
     global _default_stemmer
     if _default_stemmer is None:
-        from nltk.stem.snowball import SnowballStemmer
-        _default_stemmer = SnowballStemmer("english")
+        _default_stemmer = EnglishStemmer()
     return _default_stemmer
 
 def nop_extractor(document):
@@ -27,46 +51,464 @@ def break_on_whitespace(text):
   """
   Very simple word-breaker that breaks the text into words based on whitespace.
   A more sophisticated implementation would probably break on punctuation as well.
-
-  Note that the breaker API would need to be modified to support highlighting.
   """
   return text.strip().split()
 
+# Runs of letters and digits, optionally joined by apostrophes so that
+# contractions and possessives like "don't" and "beauty’s" stay whole.
+_word_pattern = re.compile(r"[^\W_]+(?:['’][^\W_]+)*")
+
+def break_and_fold(text):
+  """
+  Word-breaker that splits on whitespace and punctuation, folds accented
+  characters to their base forms, and lowercases, so that "Jalapeños,"
+  and "jalapenos" produce the same word.
+
+  Folding uses NFKD decomposition followed by removal of the combining
+  marks. The decomposition and mark removal are skipped for ASCII text,
+  which is the common case for both queries and menu literals.
+  """
+  if not text.isascii():
+    text = ''.join(
+      c for c in unicodedata.normalize("NFKD", text)
+      if not unicodedata.combining(c))
+  return _word_pattern.findall(text.lower())
+
+def _fold(text):
+  """
+  Lowercases `text` and folds accented characters to their base forms, one
+  character at a time. Returns the folded text, along with the offset in
+  `text` of each folded character, or None when the offsets are the
+  identity, as they are for ASCII text.
+  """
+  if text.isascii():
+    return text.lower(), None
+  folded = []
+  offsets = []
+  for i, c in enumerate(text):
+    for f in unicodedata.normalize("NFKD", c):
+      if not unicodedata.combining(f):
+        f = f.lower()
+        folded.append(f)
+        offsets.extend([i] * len(f))
+  return ''.join(folded), offsets
+
+def token_spans(text, words):
+  """
+  Returns the (start, end) span in `text` of each word that a word breaker
+  produced from `text`, or None for a word that can't be located. Words are
+  located in order, in case and accent folded copies of `text` and the
+  word, so this works for breakers like break_and_fold as well as for
+  breakers that return substrings of `text`.
+  """
+  folded, offsets = _fold(text)
+  spans = []
+  position = 0
+  for word in words:
+    folded_word = _fold(word)[0]
+    start = folded.find(folded_word, position)
+    if start < 0:
+      spans.append(None)
+      continue
+    end = start + len(folded_word)
+    position = end
+    if offsets is None:
+      spans.append((start, end))
+    else:
+      spans.append((offsets[start], offsets[end - 1] + 1))
+  return spans
+
+# Opening and closing tags for each of the highlight() markup styles.
+highlight_markup = {
+  "rich": ("[bold green]", "[/bold green]"),
+  "ansi": ("\x1b[1;32m", "\x1b[0m"),
+  "html": ("<mark>", "</mark>"),
+}
+
+# Function words that are common in conversational queries, like
+# "can I get a large coke with ice please", but carry no meaning for
+# matching. Negations like "no" and "without" are deliberately left out,
+# since they can be meaningful terms (e.g. the "No" amount in a menu).
+english_stopwords = frozenset([
+  "a", "about", "also", "am", "an", "and", "any", "are", "as", "at", "be",
+  "but", "by", "can", "could", "do", "for", "from", "get", "give", "got",
+  "have", "hi", "hello", "how", "i", "i'd", "i'll", "i'm", "if", "in", "is",
+  "it", "just", "like", "me", "my", "need", "of", "oh", "ok", "okay", "on",
+  "or", "our", "please", "so", "some", "thank", "thanks", "that", "the",
+  "then", "there", "this", "to", "uh", "um", "us", "want", "we", "what",
+  "will", "with", "would", "you", "your",
+])
+
+# Shortest out-of-vocabulary word that expand_prefixes will expand. Shorter
+# words, like "a" or "the", would mostly expand to unrelated terms.
+minimum_prefix_length = 4
+
+# Shortest unmatched word that fuzzy matching will try to correct. Short
+# words are within a couple of edits of too many unrelated terms.
+minimum_fuzzy_length = 4
+
+def _deep_sizeof(obj, seen):
+  """
+  Returns the sys.getsizeof() total for `obj` and everything reachable
+  from it through containers and instance attributes. Objects whose ids
+  are in `seen` are skipped, so shared objects are only counted once
+  across calls that share `seen`.
+  """
+  if id(obj) in seen or isinstance(obj, type):
+    return 0
+  seen.add(id(obj))
+  size = sys.getsizeof(obj)
+  if isinstance(obj, dict):
+    for key, value in obj.items():
+      size += _deep_sizeof(key, seen) + _deep_sizeof(value, seen)
+  elif isinstance(obj, (list, tuple, set, frozenset)):
+    for item in obj:
+      size += _deep_sizeof(item, seen)
+  elif hasattr(obj, "__dict__"):
+    size += _deep_sizeof(vars(obj), seen)
+  return size
+
 class Index:
-  def __init__(self, extractor=None, breaker=None, stemmer=None):
+  """
+  Inverted index mapping stemmed words to the documents that contain them.
+
+  Each document is assigned an integer id in the order it was added, and
+  each postings list is a list of ids in ascending order.
+
+  Removing a document leaves a tombstone for its id rather than editing
+  every postings list that mentions it. Tombstoned ids are skipped by
+  match(), and are purged by compact(), which runs automatically once
+  the number of tombstones reaches both `compaction_minimum` and
+  `compaction_ratio` times the number of ids allocated.
+
+  When `compress_postings` is True, each postings list is stored as
+  varint-encoded gaps (see postings.py), which are decoded as they are read
+  by match(). This trades some match time for a smaller memory footprint.
+  Lists that are being appended to are bytearrays, along with their last
+  ids. compact() freezes every list into an exact-size bytes object and
+  drops the last ids, so call it once a compressed index is built.
+
+  match() keeps a bounded LRU cache of results, keyed by the sorted tuple
+  of query stems that appear in the vocabulary, so that "large coke" and
+  "a large coke please" share an entry. Any change to the index clears the
+  cache. The cache is guarded by a lock so that one index can serve
+  matches from several threads. Set `cache_size` to 0 to disable it.
+
+  A query word ending in "*" matches every vocabulary term that starts with
+  the stem of the rest of the word, as long as the word breaker preserves
+  the "*". When `expand_prefixes` is True, query words whose stems are not
+  in the vocabulary are treated the same way, if their stems are at least
+  `minimum_prefix_length` characters long, so that truncated words like
+  "jalap" still match. Either way, a prefix expands to at most
+  `prefix_limit` terms, taken in sorted order, using binary search over a
+  sorted copy of the vocabulary.
+
+  When `fuzzy_distance` is greater than 0, query words whose stems are
+  still unmatched, and are at least `minimum_fuzzy_length` characters long,
+  match the vocabulary terms closest to them within `fuzzy_distance` edits
+  (see trigrams.py). A character trigram index over the vocabulary picks
+  the `fuzzy_candidates` terms most likely to be close, which bounds the
+  cost of each unmatched word. Like the sorted vocabulary, the trigram
+  index is rebuilt lazily when the vocabulary changes.
+
+  `synonyms` is an optional dict that maps a word or phrase in the indexed
+  documents to a list of alternative words or phrases that a query might
+  use instead, e.g. {"soda": ["fountain drink", "pop"]}. Synonyms are
+  broken and stemmed once, when the index is created, into a table that
+  redirects each one-word alternative's stem to the stems it stands for. A
+  query word whose stem is in the table also matches the documents
+  containing those stems, at the cost of one dict lookup. A phrase
+  alternative only redirects when all of its words are in the query, so
+  that "drink" alone doesn't match every soda. In match_boolean(), each
+  term is resolved on its own, so only one-word alternatives apply there.
+
+  `stopwords` is an optional collection of words that are dropped from both
+  documents and queries. They are stemmed once, when the index is created.
+  Dropping them keeps function words from matching unrelated documents,
+  and from being expanded by prefix or fuzzy matching.
+
+  When `store_spans` is True, the index keeps the span and stem id of every
+  word of every document, as a compact array per text stream. highlight()
+  then only has to look up the ids of the query stems and assemble the
+  highlighted string, rather than breaking and stemming the document again.
+
+  `profiler` is an optional callable that match() calls with a profile of
+  each query: the time spent in each phase, and the numbers of words,
+  stems, postings and matches (see profiling.py). It can be set or cleared
+  at any time through the `profiler` attribute. When it is None, match()
+  pays for one attribute check.
+  """
+  def __init__(
+      self,
+      extractor=None,
+      breaker=None,
+      stemmer=None,
+      compaction_ratio=0.25,
+      compaction_minimum=16,
+      compress_postings=False,
+      cache_size=1024,
+      expand_prefixes=False,
+      prefix_limit=16,
+      fuzzy_distance=0,
+      fuzzy_candidates=16,
+      synonyms=None,
+      stopwords=None,
+      store_spans=False,
+      profiler=None):
     self._extractor = extractor or nop_extractor
     self._breaker = breaker or break_on_whitespace
     self._stemmer = stemmer or get_default_stemmer()
+    self._compaction_ratio = compaction_ratio
+    self._compaction_minimum = compaction_minimum
+    self._compress_postings = compress_postings
+    self._expand_prefixes = expand_prefixes
+    self._prefix_limit = prefix_limit
+    self._fuzzy_distance = fuzzy_distance
+    self._fuzzy_candidates = fuzzy_candidates
+    self._stopwords = frozenset(
+      self._stemmer.stem(word)
+      for text in stopwords or ()
+      for word in self._breaker(text))
+    self._synonyms, self._phrase_synonyms = self._compile_synonyms(synonyms or {})
 
     # Initialize the index data structures
     self._documents_in_order = []
-    self._documents = set()
+    self._ids = {}
     self._postings = {}
     self._pinned = set()
-    
+    self._tombstones = set()
+    self._last_ids = {}
+    self._vocabulary = None
+    self._trigrams = None
+
+    # Per-document word spans for highlight(), indexed by id, and the ids
+    # of the stems that they refer to.
+    self._store_spans = store_spans
+    self._spans = []
+    self._stem_ids = {}
+
+    # Called with the profile of each match(), when not None.
+    self.profiler = profiler
+
+    # Initialize the match() result cache
+    self._cache_size = cache_size
+    self._cache = OrderedDict()
+    self._cache_lock = threading.Lock()
+    self._cache_generation = 0
+    self._cache_hits = 0
+    self._cache_misses = 0
 
   def add(self, document):
-    if document in self._documents:
+    if document in self._ids:
       raise ValueError("Attempting to add duplicate document.")
+    self._invalidate_cache()
 
     # Add the document to the index
+    id = len(self._documents_in_order)
     self._documents_in_order.append(document)
-    self._documents.add(document)
+    self._ids[document] = id
 
     # Update the postings list
-    streams = self._extractor(document)
-    words = []
-    for text in streams:
-      words.extend(self._breaker(text))
-    stemmed = {self._stemmer.stem(word) for word in words}
-    for word in stemmed:
-      if word not in self._postings:
-        self._postings[word] = []
-      self._postings[word].append(document)
+    broken = [(text, self._breaker(text)) for text in self._extractor(document)]
+    stems = {word: self._stemmer.stem(word) for _, words in broken for word in words}
+    self._add_postings(id, set(stems.values()))
+    if self._store_spans:
+      self._spans.append(self._stored_spans(broken, stems))
+
+  def add_many(self, documents):
+    """
+    Adds a sequence of documents, in order, as if by calling add() on each.
+
+    All of the documents are broken into words first, so that each unique
+    word is stemmed once, rather than once per occurrence. This is much
+    faster than add() for collections like menus, where a small vocabulary
+    is repeated across many documents.
+    """
+    documents = list(documents)
+    seen = set()
+    for document in documents:
+      if document in self._ids or document in seen:
+        raise ValueError("Attempting to add duplicate document.")
+      seen.add(document)
+    self._invalidate_cache()
+
+    # Break every document, then stem the vocabulary.
+    words_by_document = []
+    broken_by_document = []
+    vocabulary = set()
+    for document in documents:
+      words = set()
+      broken = [(text, self._breaker(text)) for text in self._extractor(document)]
+      for _, text_words in broken:
+        words.update(text_words)
+      words_by_document.append(words)
+      if self._store_spans:
+        broken_by_document.append(broken)
+      vocabulary.update(words)
+    stems = {word: self._stemmer.stem(word) for word in vocabulary}
+
+    for i, (document, words) in enumerate(zip(documents, words_by_document)):
+      id = len(self._documents_in_order)
+      self._documents_in_order.append(document)
+      self._ids[document] = id
+      self._add_postings(id, {stems[word] for word in words})
+      if self._store_spans:
+        self._spans.append(self._stored_spans(broken_by_document[i], stems))
+
+  def _stored_spans(self, broken, stems):
+    """
+    Returns a list with an array of (start, end, stem id) triples for each
+    (text, words) pair in `broken`. `stems` maps each word to its stem.
+    """
+    stem_ids = self._stem_ids
+    result = []
+    for text, words in broken:
+      spans = array("I")
+      for word, span in zip(words, token_spans(text, words)):
+        if span is not None:
+          stem = stems[word]
+          stem_id = stem_ids.get(stem)
+          if stem_id is None:
+            stem_id = len(stem_ids)
+            stem_ids[stem] = stem_id
+          spans.extend((span[0], span[1], stem_id))
+      result.append(spans)
+    return result
+
+  def _add_postings(self, id, stemmed):
+    if self._stopwords:
+      stemmed = stemmed - self._stopwords
+    if self._compress_postings:
+      for word in stemmed:
+        self._append_compressed(word, id)
+    else:
+      postings = self._postings
+      for word in stemmed:
+        if word not in postings:
+          postings[word] = []
+          self._vocabulary_changed()
+        postings[word].append(id)
+
+  def remove(self, document):
+    """
+    Removes a document from the index. The document's postings remain in
+    place, marked by a tombstone, until the next compaction.
+    """
+    id = self._ids.pop(document, None)
+    if id is None:
+      raise ValueError("Attempting to remove unknown document.")
+    self._invalidate_cache()
+    self._tombstones.add(id)
+    self._pinned.discard(id)
+    if self._store_spans:
+      self._spans[id] = None
+
+    if (len(self._tombstones) >= self._compaction_minimum and
+        len(self._tombstones) >=
+          self._compaction_ratio * len(self._documents_in_order)):
+      self.compact()
+
+  def update(self, document):
+    """
+    Reindexes a document whose text has changed. The document keeps its
+    pinned status, but moves to the end of the match order, as if it had
+    been removed and added again.
+    """
+    if document not in self._ids:
+      raise ValueError("Attempting to update unknown document.")
+    pinned = self._ids[document] in self._pinned
+    self.remove(document)
+    self.add(document)
+    if pinned:
+      self.pin(document)
+
+  def compact(self):
+    """
+    Purges tombstoned ids from the postings lists and renumbers the
+    remaining documents so that ids are dense again. Also freezes
+    compressed postings lists.
+    """
+    if not self._tombstones and not self._last_ids:
+      return
+
+    remap = {}
+    documents_in_order = []
+    for id, document in enumerate(self._documents_in_order):
+      if id not in self._tombstones:
+        remap[id] = len(documents_in_order)
+        documents_in_order.append(document)
+
+    postings = {}
+    for word in self._postings:
+      live = [remap[id] for id in self._ids_for(word) if id in remap]
+      if live:
+        if self._compress_postings:
+          postings[word] = bytes(encode_postings(live))
+        else:
+          postings[word] = live
+
+    if self._store_spans:
+      self._spans = [spans for id, spans in enumerate(self._spans) if id in remap]
+    self._documents_in_order = documents_in_order
+    self._ids = {document: id for id, document in enumerate(documents_in_order)}
+    self._postings = postings
+    self._last_ids = {}
+    self._vocabulary_changed()
+    self._pinned = {remap[id] for id in self._pinned}
+    self._tombstones = set()
 
   def pin(self, document):
-    self._pinned.add(document)
+    id = self._ids.get(document)
+    if id is None:
+      raise ValueError("Attempting to pin unknown document.")
+    self._invalidate_cache()
+    self._pinned.add(id)
+
+  def cache_statistics(self):
+    """
+    Returns a dict with the hit and miss counts, current size, and capacity
+    of the match() result cache.
+    """
+    with self._cache_lock:
+      return {
+        "hits": self._cache_hits,
+        "misses": self._cache_misses,
+        "size": len(self._cache),
+        "capacity": self._cache_size,
+      }
+
+  def _invalidate_cache(self):
+    # Bumping the generation keeps a match() that started before this
+    # mutation from storing its now stale result.
+    with self._cache_lock:
+      self._cache_generation += 1
+      self._cache.clear()
+
+  def _append_compressed(self, word, id):
+    data = self._postings.get(word)
+    if data is None:
+      data = bytearray()
+      last = 0
+      self._vocabulary_changed()
+    elif word in self._last_ids:
+      last = self._last_ids[word]
+    else:
+      # Reopen a list that was frozen by compact().
+      last = decode_postings(data)[-1]
+      data = bytearray(data)
+    append_posting(data, id - last)
+    self._postings[word] = data
+    self._last_ids[word] = id
 
+  def _ids_for(self, word):
+    """
+    Returns the list of ids in the postings list for `word`, decoding it
+    if postings are compressed, or an empty list if `word` is not indexed.
+    """
+    ids = self._postings.get(word)
+    if ids is None:
+      return []
+    return decode_postings(ids) if self._compress_postings else ids
 
   def match(self, query):
     """
@@ -79,76 +521,570 @@ class Index:
       list of strings, each of which onsists of a sequence of words that
       can be isolated by the word breaker. A document is considered a
       match if it contains a stemmed version of at least one of the words
-      in the query.
+      in the query, or of one of the terms a prefix query expands to.
 
     Returns:
       list: A list of documents that match the query.
     """
+    if self.profiler is not None:
+      return self._match_profiled(query)
+    key = tuple(sorted(self._query_terms(query)))
+    return self._cached(key, self._match_stems)
+
+  def match_boolean(self, query):
+    """
+    Matches a boolean query against the indexed documents and returns a
+    list of matching documents, in the order they were added to the index.
+
+    Args:
+      query (str): A query in the syntax described in boolean_query.py,
+      e.g. "chicken AND sandwich NOT spicy" or "(fries OR chips) AND large".
+      Each word is stemmed and expanded just as it would be by match().
+      Stopwords match every document, so they don't narrow an AND.
+
+    Returns:
+      list: The pinned documents, plus the documents that satisfy the query.
+
+    Raises:
+      ValueError: If the query is not well formed.
+    """
+    # Tree nodes are tuples, while match() keys hold only strings, so the
+    # two kinds of key can share the cache.
+    key = ("boolean", parse_boolean_query(query))
+    return self._cached(key, lambda key: self._match_tree(key[1]))
+
+  def _cached(self, key, compute):
+    """
+    Returns the documents for `key` from the match cache, calling
+    compute(key) to produce and cache them on a miss.
+    """
+    if self._cache_size <= 0:
+      return compute(key)
+
+    with self._cache_lock:
+      cached = self._cache.get(key)
+      if cached is not None:
+        self._cache.move_to_end(key)
+        self._cache_hits += 1
+        return list(cached)
+      self._cache_misses += 1
+      generation = self._cache_generation
+
+    results = compute(key)
+
+    with self._cache_lock:
+      if generation == self._cache_generation:
+        self._cache[key] = tuple(results)
+        if len(self._cache) > self._cache_size:
+          self._cache.popitem(last=False)
+    return results
+
+  def _match_tree(self, tree, resolved=None):
+    ids = self._evaluate(tree, resolved)
+    if ids is None:
+      matches = set(range(len(self._documents_in_order)))
+    else:
+      matches = self._pinned.union(ids)
+    if self._tombstones:
+      matches -= self._tombstones
+    documents = self._documents_in_order
+    return [documents[id] for id in sorted(matches)]
+
+  def _evaluate(self, tree, resolved=None):
+    """
+    Returns the ascending list of ids that satisfy the boolean query
+    `tree`, or None if every document does. Tombstoned ids may be included.
+    `resolved` optionally maps each query word to the terms it matches,
+    instead of resolving the words against this index's vocabulary.
+    """
+    operator, operands = tree
+    if operator == "term":
+      return self._term_ids(operands, resolved)
+    if operator == "not":
+      excluded = self._evaluate(operands, resolved)
+      if excluded is None:
+        return []
+      return subtract_postings(range(len(self._documents_in_order)), excluded)
+    if operator == "or":
+      lists = []
+      for operand in operands:
+        ids = self._evaluate(operand, resolved)
+        if ids is None:
+          return None
+        lists.append(ids)
+      return union_postings(lists)
+
+    # AND: intersect the positive operands, then remove the negated ones,
+    # rather than materializing the complement of each negated operand.
+    included = []
+    excluded = []
+    for operand in operands:
+      if operand[0] == "not":
+        ids = self._evaluate(operand[1], resolved)
+        if ids is None:
+          return []
+        excluded.append(ids)
+      else:
+        ids = self._evaluate(operand, resolved)
+        if ids is not None:
+          included.append(ids)
+    if included:
+      result = intersect_postings(included)
+    elif excluded:
+      result = range(len(self._documents_in_order))
+    else:
+      return None
+    for ids in excluded:
+      result = subtract_postings(result, ids)
+    return list(result)
+
+  def _term_ids(self, text, resolved=None):
+    """
+    Returns the ascending list of ids of documents containing every word
+    in `text`, or None if all of its words are stopwords. Each word matches
+    the union of the terms it stems or expands to.
+    """
+    lists = []
+    for word in self._breaker(text):
+      if self._stemmer.stem(word) in self._stopwords:
+        continue
+      terms = self._query_terms(word) if resolved is None else resolved[word]
+      lists.append(union_postings([self._ids_for(term) for term in terms]) if terms else [])
+    if not lists:
+      return None
+    return intersect_postings(lists)
+
+  def _compile_synonyms(self, synonyms):
+    """
+    Returns a dict mapping the stem of each one-word alternative to the
+    tuple of stems of the word or phrase it stands for, and a dict mapping
+    the stem of each word of each phrase alternative to a list of
+    (frozenset of the phrase's stems, tuple of target stems) pairs.
+    """
+    redirects = {}
+    phrases = {}
+    for text, alternatives in synonyms.items():
+      targets = [self._stemmer.stem(word) for word in self._breaker(text)]
+      for alternative in alternatives:
+        stems = [self._stemmer.stem(word) for word in self._breaker(alternative)]
+        # A query's stopwords are dropped, so a phrase doesn't need them.
+        stems = [stem for stem in stems if stem not in self._stopwords]
+        if len(set(stems)) == 1:
+          stem = stems[0]
+          if stem not in redirects:
+            redirects[stem] = []
+          redirects[stem].extend(t for t in targets if t not in redirects[stem])
+        elif stems:
+          phrase = (frozenset(stems), tuple(targets))
+          for stem in phrase[0]:
+            phrases.setdefault(stem, []).append(phrase)
+    redirects = {stem: tuple(targets) for stem, targets in redirects.items()}
+    return redirects, phrases
+
+  def _query_synonyms(self, words):
+    """
+    Returns a mapping from the stems of `words` to the stems they stand
+    for: the targets of their one-word alternatives, and of the phrase
+    alternatives whose words are all among `words`.
+    """
+    if not self._phrase_synonyms:
+      return self._synonyms
+    stems = {self._stemmer.stem(word) for word in words}
+    found = {}
+    for stem in stems:
+      targets = self._synonyms.get(stem, ())
+      for phrase, phrase_targets in self._phrase_synonyms.get(stem, ()):
+        if phrase <= stems:
+          targets += tuple(t for t in phrase_targets if t not in targets)
+      if targets:
+        found[stem] = targets
+    return found
+
+  def _vocabulary_changed(self):
+    self._vocabulary = None
+    self._trigrams = None
+
+  def expand_prefix(self, prefix):
+    """
+    Returns up to `prefix_limit` vocabulary terms, in sorted order, that
+    start with `prefix`.
+    """
+    vocabulary = self._vocabulary
+    if vocabulary is None:
+      vocabulary = sorted(self._postings)
+      self._vocabulary = vocabulary
+    start = bisect_left(vocabulary, prefix)
+    end = min(start + self._prefix_limit, len(vocabulary))
+    terms = []
+    for i in range(start, end):
+      if not vocabulary[i].startswith(prefix):
+        break
+      terms.append(vocabulary[i])
+    return terms
+
+  def _query_terms(self, query):
+    """
+    Returns the set of vocabulary terms that the words in `query` stem or
+    expand to. Stems that are not in the vocabulary cannot change the
+    result of a match, so they are dropped.
+    """
+    return self._terms_for_words(self._query_words(query))
+
+  def _query_words(self, query):
     if isinstance(query, str):
       query = [query]
     words = []
     for part in query:
       words.extend(self._breaker(part))
-    stemmed = {self._stemmer.stem(word) for word in words}
+    return words
 
+  def _terms_for_words(self, words, vocabulary=None):
+    """
+    Returns the set of terms that `words` stem or expand to. `vocabulary`
+    optionally supplies has_term(), expand_prefix() and closest_terms() to
+    resolve the words against, in place of this index's vocabulary, as
+    ShardedIndex does with the merged vocabularies of its shards.
+    """
+    if vocabulary is None:
+      has_term = self._postings.__contains__
+      expand_prefix = self.expand_prefix
+      closest_terms = self.closest_terms
+    else:
+      has_term = vocabulary.has_term
+      expand_prefix = vocabulary.expand_prefix
+      closest_terms = vocabulary.closest_terms
+
+    query_synonyms = self._query_synonyms(words)
+    terms = set()
+    for word in words:
+      if len(word) > 1 and word.endswith("*"):
+        terms.update(expand_prefix(self._stemmer.stem(word[:-1])))
+        continue
+      stem = self._stemmer.stem(word)
+      if stem in self._stopwords:
+        continue
+      synonyms = query_synonyms.get(stem)
+      if synonyms:
+        terms.update(t for t in synonyms if has_term(t))
+      if has_term(stem):
+        terms.add(stem)
+        continue
+      if synonyms:
+        continue
+      if self._expand_prefixes and len(stem) >= minimum_prefix_length:
+        expanded = expand_prefix(stem)
+        if expanded:
+          terms.update(expanded)
+          continue
+      if self._fuzzy_distance > 0 and len(stem) >= minimum_fuzzy_length:
+        terms.update(closest_terms(stem))
+    return terms
+
+  def _lookups(self, words):
+    """
+    Returns what this index's vocabulary holds for `words`, as far as
+    _terms_for_words() needs to know, so that a ShardedIndex can resolve
+    the words against the vocabularies of all of its shards at once:
+
+      terms: the stems of the words, and their synonyms, that are terms
+      prefixes: expand_prefix() of each prefix the words might expand to
+      candidates: _trigram_candidates() of each stem that might need
+        fuzzy matching
+
+    A stem that is a term here is a term in the merged vocabulary, so its
+    prefix and fuzzy lookups are skipped.
+    """
+    query_synonyms = self._query_synonyms(words)
+    terms = set()
+    prefixes = {}
+    candidates = {}
+    for word in words:
+      if len(word) > 1 and word.endswith("*"):
+        prefix = self._stemmer.stem(word[:-1])
+        prefixes[prefix] = self.expand_prefix(prefix)
+        continue
+      stem = self._stemmer.stem(word)
+      if stem in self._stopwords:
+        continue
+      synonyms = query_synonyms.get(stem)
+      if synonyms:
+        terms.update(t for t in synonyms if t in self._postings)
+      if stem in self._postings:
+        terms.add(stem)
+        continue
+      if synonyms:
+        continue
+      if self._expand_prefixes and len(stem) >= minimum_prefix_length:
+        prefixes[stem] = self.expand_prefix(stem)
+        if prefixes[stem]:
+          continue
+      if self._fuzzy_distance > 0 and len(stem) >= minimum_fuzzy_length:
+        candidates[stem] = self._trigram_candidates(stem)
+    return terms, prefixes, candidates
+
+  def closest_terms(self, word):
+    """
+    Returns the vocabulary terms closest to `word`, within `fuzzy_distance`
+    edits.
+    """
+    candidates = self._trigram_candidates(word)
+    return closest_candidates(
+      word, [term for _, term in candidates], self._fuzzy_distance)
+
+  def _trigram_candidates(self, word):
+    """
+    Returns the (count, term) pairs of the `fuzzy_candidates` terms that
+    share the most trigrams with `word`. See TrigramIndex.candidates().
+    """
+    trigrams = self._trigrams
+    if trigrams is None:
+      trigrams = TrigramIndex(self._postings)
+      self._trigrams = trigrams
+    return trigrams.candidates(word, self._fuzzy_distance, self._fuzzy_candidates)
+
+  def _match_terms(self, terms):
+    """
+    Same as match(), for a query that has already been resolved to the
+    sorted list of `terms`, e.g. by a ShardedIndex.
+    """
+    return self._cached(tuple(terms), self._match_stems)
+
+  def _match_boolean_terms(self, tree, resolved):
+    """
+    Same as match_boolean(), for a parsed query `tree` whose words have
+    already been resolved, e.g. by a ShardedIndex. `resolved` maps each
+    word to the sorted tuple of terms it matches.
+    """
+    key = ("boolean", tree, tuple(sorted(resolved.items())))
+    return self._cached(key, lambda key: self._match_tree(tree, resolved))
+
+  def _match_stems(self, stems):
     matches = set(self._pinned)
-    for word in stemmed:
-      if word in self._postings:
-        matches.update(self._postings[word])
+    for word in stems:
+      matches.update(self._ids_for(word))
+    if self._tombstones:
+      matches -= self._tombstones
+    return self._in_order(matches)
+
+  def _in_order(self, ids):
+    # Ids are assigned in insertion order, so sorting restores it.
+    documents = self._documents_in_order
+    return [documents[id] for id in sorted(ids)]
+
+  def _match_profiled(self, query):
+    """
+    Same as match(), but times each phase and passes the profile described
+    in profiling.py to the profiler.
+    """
+    clock = time.perf_counter
+    start = clock()
+    words = self._query_words(query)
+    broken = clock()
+    key = tuple(sorted(self._terms_for_words(words)))
+    stemmed = clock()
 
-    # Filter ordered document list to only include matches
-    results = [doc for doc in self._documents_in_order if doc in matches]
+    postings = 0
+    looked_up = None
+    def compute(key):
+      nonlocal postings, looked_up
+      ids = set(self._pinned)
+      for word in key:
+        word_ids = self._ids_for(word)
+        postings += len(word_ids)
+        ids.update(word_ids)
+      if self._tombstones:
+        ids -= self._tombstones
+      looked_up = clock()
+      return self._in_order(ids)
+
+    results = self._cached(key, compute)
+    end = clock()
+    cached = looked_up is None
+
+    self.profiler({
+      "phases": {
+        "break": broken - start,
+        "stem": stemmed - broken,
+        "lookup": 0.0 if cached else looked_up - stemmed,
+        "order": 0.0 if cached else end - looked_up,
+      },
+      "total": end - start,
+      "words": len(words),
+      "stems": len(key),
+      "postings": postings,
+      "matches": len(results),
+      "cached": cached,
+    })
     return results
   
-  def highlight(self, query, document):
+  def highlight(self, query, document, markup="rich"):
     """
-    Highlights the words in the document text that match the stemmed words
-    from the query.
+    Highlights the words in the document text whose stems match the stemmed
+    words from the query, or the terms they expand to.
 
     Args:
       query (str): The search query containing words to be highlighted.
-      document (str): The document in which to highlight the matching words.
+      document: The document in which to highlight the matching words.
+      markup: "rich" for bold green rich tags, "ansi" for bold green ANSI
+      escapes, "html" for <mark> elements, or an (open, close) pair of tags.
+      With "html", the document text is escaped.
 
     Returns:
-      str: The document with matching words highlighted in bold green.
+      str: The text streams of the document, concatenated, with the
+      matching words highlighted.
+
+    If the index stores spans and contains the document, the stored spans
+    are used. Otherwise the document is broken and stemmed again.
+    """
+    return self._highlight(query, document, markup, self._query_terms(query))
 
-    NOTE that this niave implementation assumes a whitespace-based word-breaker.
+  def _highlight(self, query, document, markup, terms):
     """
-    words = self._breaker(query)
-    stemmed = {self._stemmer.stem(word) for word in words}
+    Same as highlight(), given the set of `terms` that the query resolves
+    to, e.g. by a ShardedIndex.
+    """
+    # Stopwords don't match, so they aren't highlighted either.
+    stems = {self._stemmer.stem(word) for word in self._breaker(query)}
+    stems -= self._stopwords
+    stems.update(terms)
+    open_tag, close_tag = (
+      highlight_markup[markup] if isinstance(markup, str) else markup)
+    escape = html.escape if markup == "html" else str
+
+    texts = self._extractor(document)
+    id = self._ids.get(document)
+    if self._store_spans and id is not None:
+      matched = {self._stem_ids[stem] for stem in stems if stem in self._stem_ids}
+      spans_by_text = self._spans[id]
+    else:
+      matched = stems
+      spans_by_text = []
+      for text in texts:
+        words = self._breaker(text)
+        spans = []
+        for word, span in zip(words, token_spans(text, words)):
+          if span is not None:
+            spans.extend((span[0], span[1], self._stemmer.stem(word)))
+        spans_by_text.append(spans)
 
     parts = []
-    for text in self._extractor(document):
-      parts.extend(re.split(r'(\s+)', text))
-    highlighted = []
-    for part in parts:
-      if not part.isspace() and self._stemmer.stem(part) in stemmed:
-        highlighted.append(f"[bold green]{part}[/bold green]")
-      else:
-        highlighted.append(part)
-    return ''.join(highlighted)
-  
-  def statistics(self):
+    for text, spans in zip(texts, spans_by_text):
+      position = 0
+      triples = iter(spans)
+      for start, end, key in zip(triples, triples, triples):
+        if key in matched:
+          parts.append(escape(text[position:start]))
+          parts.append(open_tag + escape(text[start:end]) + close_tag)
+          position = end
+      parts.append(escape(text[position:]))
+    return ''.join(parts)
+
+  def documents(self):
     """
-    Prints statistics about the index, including the number of documents,
-    the number of unique words, and the number of postings.
+    Returns the documents in the index, in the order they were added.
+    """
+    return [
+      document
+      for id, document in enumerate(self._documents_in_order)
+      if id not in self._tombstones
+    ]
+
+  def statistics(self, top=20):
+    """
+    Returns statistics about the index as a dictionary of plain values
+    that can be serialized with json.dumps(). Postings for tombstoned
+    documents are counted until the next compaction.
+
+    The "bytes" entry estimates the memory used by the postings, by the
+    vocabulary (the postings dictionary and its keys), and by the documents
+    (the id tables and everything reachable from the documents). Estimates
+    come from sys.getsizeof(), so they don't include allocator overhead.
+    "postings_list" and "postings_compressed" estimate the postings bytes
+    for each representation, whichever one the index is using. The list
+    figure counts the list objects, which hold references to id objects
+    shared with the rest of the index. The compressed figure counts the
+    bytes objects that compact() would produce.
+
+    Args:
+      top: the number of most frequent terms to include in "top_terms".
 
     Returns:
-      None
+      A dictionary with the document, tombstone, pinned, vocabulary and
+      postings counts, a histogram of postings list lengths, the `top`
+      most frequent terms, memory estimates, and match() cache statistics.
     """
-    num_documents = len(self._documents)
-    num_unique_words = len(self._postings)
-    num_postings = sum(len(postings) for postings in self._postings.values())
+    word_frequencies = {}
+    postings_bytes = 0
+    list_bytes = 0
+    compressed_bytes = 0
+    histogram = {}
+    for word, postings in self._postings.items():
+      ids = self._ids_for(word)
+      word_frequencies[word] = len(ids)
+      postings_bytes += sys.getsizeof(postings)
+      list_bytes += sys.getsizeof(list(ids))
+      compressed_bytes += sys.getsizeof(bytes(encode_postings(ids)))
+      bucket = histogram_bucket(len(ids))
+      histogram[bucket] = histogram.get(bucket, 0) + 1
+
+    vocabulary_bytes = sys.getsizeof(self._postings) + sum(
+      sys.getsizeof(word) for word in self._postings)
+
+    seen = set()
+    documents_bytes = (
+      _deep_sizeof(self._documents_in_order, seen) + _deep_sizeof(self._ids, seen))
+
+    top_terms = sorted(word_frequencies.items(), key=lambda item: (-item[1], item[0]))
+
+    return {
+      "documents": len(self._ids),
+      "tombstones": len(self._tombstones),
+      "pinned": len(self._pinned),
+      "vocabulary": len(self._postings),
+      "postings": sum(word_frequencies.values()),
+      "postings_histogram": {
+        bucket: histogram[bucket]
+        for bucket in sorted(histogram, key=lambda b: int(b.split("-")[0]))
+      },
+      "top_terms": [[word, frequency] for word, frequency in top_terms[:top]],
+      "bytes": {
+        "postings": postings_bytes,
+        "postings_list": list_bytes,
+        "postings_compressed": compressed_bytes,
+        "vocabulary": vocabulary_bytes,
+        "documents": documents_bytes,
+      },
+      "cache": self.cache_statistics(),
+    }
 
-    print(f"Number of documents: {num_documents}")
-    print(f"Number of unique words: {num_unique_words}")
-    print(f"Number of postings: {num_postings}")
+  def print_statistics(self):
+    """
+    Prints a summary of statistics(), followed by a frequency table of
+    every term in the index.
+    """
+    stats = self.statistics(top=len(self._postings))
+    per_posting = max(stats["postings"], 1)
+    sizes = stats["bytes"]
+    cache = stats["cache"]
+
+    print(f"Number of documents: {stats['documents']}")
+    print(f"Number of unique words: {stats['vocabulary']}")
+    print(f"Number of postings: {stats['postings']}")
+    print(f"Number of tombstones: {stats['tombstones']}")
+    print(f"Number of pinned documents: {stats['pinned']}")
+    print(f"Postings bytes (list): {sizes['postings_list']} ({sizes['postings_list'] / per_posting:.2f} bytes/posting)")
+    print(f"Postings bytes (compressed): {sizes['postings_compressed']} ({sizes['postings_compressed'] / per_posting:.2f} bytes/posting)")
+    print(f"Vocabulary bytes: {sizes['vocabulary']}")
+    print(f"Documents bytes: {sizes['documents']}")
+    print(f"Match cache: {cache['hits']} hits, {cache['misses']} misses, {cache['size']}/{cache['capacity']} entries")
     print()
 
-    word_frequencies = {word: len(postings) for word, postings in self._postings.items()}
-    sorted_word_frequencies = sorted(word_frequencies.items(), key=lambda item: item[1], reverse=True)
+    print("Postings Length Histogram:")
+    for bucket, count in stats["postings_histogram"].items():
+      print(f"{bucket}: {count}")
+    print()
 
     print("Word Frequency Table:")
-    for word, frequency in sorted_word_frequencies:
+    for word, frequency in stats["top_terms"]:
       print(f"{word}: {frequency}")
   
\ No newline at end of file
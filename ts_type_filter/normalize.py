@@ -2,22 +2,40 @@
 Implementation of generic type expansion for create_normalizer_spec.
 """
 
+from collections import OrderedDict
 import copy
+import marshal
 import os
 import sys
+import threading
 
 # Add the parent directory to sys.path to import ts_type_filter
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
 
 from ts_type_filter.filter import Define, Struct, Union, Literal, Type
+from ts_type_filter.generics import (
+    GenericInstances,
+    parameter_mapping,
+    substitute_type_parameters,
+)
+from ts_type_filter.normalizer_compiler import compile_normalizer
 
 
-def create_normalizer_spec(type_defs):
+def create_normalizer_spec(type_defs, symbols=None, generics=None):
     """
     Enhanced version of create_normalizer_spec that handles generic type expansion.
 
+    Type references are resolved through a single name to Define map, and the
+    string literals of each referenced type are computed once, so the cost of
+    creating a spec grows linearly with the size of the schema.
+
     Args:
         type_defs (list): List of type definitions (Define objects)
+        symbols (SymbolTable): Optional symbol table for type_defs, e.g. the
+            one returned by build_type_index(), to reuse instead of building
+            a name to Define map.
+        generics (GenericInstances): Optional cache of generic instantiations
+            for type_defs, to share with other consumers of the schema.
 
     Returns:
         tuple: (name_to_type_dict, type_to_defaults_dict)
@@ -33,6 +51,11 @@ def create_normalizer_spec(type_defs):
     # Track duplicates for error reporting
     name_to_types_list = {}
 
+    definitions = symbols.nodes if symbols is not None else _definitions_by_name(type_defs)
+    literals_by_type = {}
+    if generics is None:
+        generics = GenericInstances()
+
     for type_def in type_defs:
         if not isinstance(type_def, Define):
             continue
@@ -45,7 +68,9 @@ def create_normalizer_spec(type_defs):
             struct = type_def.type
         else:
             # Try to expand if it's a generic type reference
-            expanded = expand_generic_type(type_def.type, type_defs)
+            expanded = expand_generic_type(
+                type_def.type, definitions, generics=generics
+            )
             if expanded and isinstance(expanded, Struct):
                 struct = expanded
 
@@ -66,7 +91,9 @@ def create_normalizer_spec(type_defs):
 
         # Extract string literals from name field
         if name_field:
-            name_literals = _extract_string_literals_from_type(name_field, type_defs)
+            name_literals = _extract_string_literals_from_type(
+                name_field, definitions, memo=literals_by_type
+            )
 
             # Only store defaults for types that actually have string literals (concrete types)
             if name_literals and optional_fields:
@@ -92,65 +119,111 @@ def create_normalizer_spec(type_defs):
     }
 
 
-def _extract_string_literals_from_type(type_node, type_defs, visited=None):
+def _definitions_by_name(type_defs):
+    """
+    Returns a dict mapping the name of each Define in type_defs to the Define.
+    Like a scan of the list, the first definition of a name wins. A dict, such
+    as the one returned by a previous call, is returned as is.
+
+    Args:
+        type_defs: List of type definitions, or a dict of them by name
+
+    Returns:
+        dict: Mapping from type names to Define objects
+    """
+    if isinstance(type_defs, dict):
+        return type_defs
+    definitions = {}
+    for type_def in type_defs:
+        if isinstance(type_def, Define):
+            definitions.setdefault(type_def.name, type_def)
+    return definitions
+
+
+def _extract_string_literals_from_type(type_node, type_defs, visited=None, memo=None):
     """
     Extract all string literals from a type, handling unions and type references.
 
     Args:
         type_node: The type node to extract literals from
-        type_defs: List of all type definitions for resolving type references
+        type_defs: List of all type definitions, or a dict of them by name,
+            for resolving type references
         visited: Set of visited type names to prevent infinite recursion
+        memo: Optional dict to cache the literals of each referenced type
+            name across calls
 
     Returns:
         set: Set of string literals found in the type
     """
+    definitions = _definitions_by_name(type_defs)
     if visited is None:
         visited = set()
+    if memo is None:
+        memo = {}
+    literals, _ = _string_literals(type_node, definitions, visited, memo)
+    return set(literals)
 
-    literals = set()
 
+def _string_literals(type_node, definitions, visited, memo):
+    """
+    Returns (literals, complete), where complete is False if a reference
+    cycle was cut short while collecting the literals. Only complete
+    results are memoized, since a cut short result depends on the path
+    that led to it.
+    """
     if isinstance(type_node, Literal):
-        literals.add(type_node.text)
+        return {type_node.text}, True
 
-    elif isinstance(type_node, Union):
+    if isinstance(type_node, Union):
+        literals = set()
+        complete = True
         for union_type in type_node.types:
-            literals.update(
-                _extract_string_literals_from_type(union_type, type_defs, visited)
+            union_literals, union_complete = _string_literals(
+                union_type, definitions, visited, memo
             )
+            literals.update(union_literals)
+            complete = complete and union_complete
+        return literals, complete
 
-    elif isinstance(type_node, Type):
+    if isinstance(type_node, Type):
         # Handle type references - look up the actual type definition
         type_name = type_node.name
 
+        if type_name in memo:
+            return memo[type_name], True
+
         if type_name in visited:
             # Prevent infinite recursion
-            return literals
-
-        visited.add(type_name)
+            return set(), False
 
-        # Find the type definition
-        for type_def in type_defs:
-            if isinstance(type_def, Define) and type_def.name == type_name:
-                literals.update(
-                    _extract_string_literals_from_type(
-                        type_def.type, type_defs, visited
-                    )
-                )
-                break
+        type_def = definitions.get(type_name)
+        if not isinstance(type_def, Define):
+            memo[type_name] = frozenset()
+            return memo[type_name], True
 
+        visited.add(type_name)
+        literals, complete = _string_literals(type_def.type, definitions, visited, memo)
         visited.remove(type_name)
 
-    return literals
+        if complete:
+            literals = frozenset(literals)
+            memo[type_name] = literals
+        return literals, complete
+
+    return set(), True
 
 
-def expand_generic_type(type_node, type_defs, visited=None):
+def expand_generic_type(type_node, type_defs, visited=None, generics=None):
     """
     Expand a generic type reference into its concrete form.
 
     Args:
         type_node: A Type node that might reference a generic type
-        type_defs: List of all type definitions
+        type_defs: List of all type definitions, or a dict of them by name
         visited: Set of visited type names to prevent infinite recursion
+        generics (GenericInstances): Optional cache of instantiations. If
+            given, equal instantiations return the same Struct, which must
+            not be modified.
 
     Returns:
         The expanded type, or None if it cannot be expanded into a struct
@@ -170,13 +243,9 @@ def expand_generic_type(type_node, type_defs, visited=None):
     visited.add(type_name)
 
     # Find the generic type definition
-    generic_def = None
-    for type_def in type_defs:
-        if isinstance(type_def, Define) and type_def.name == type_name:
-            generic_def = type_def
-            break
+    generic_def = _definitions_by_name(type_defs).get(type_name)
 
-    if not generic_def:
+    if not isinstance(generic_def, Define):
         visited.remove(type_name)
         return None
 
@@ -190,61 +259,21 @@ def expand_generic_type(type_node, type_defs, visited=None):
         visited.remove(type_name)
         return None
 
-    # Create a mapping from type parameter names to actual types
-    param_mapping = {}
-    for i, param_def in enumerate(generic_def.params):
-        param_name = param_def if isinstance(param_def, str) else param_def.name
-        param_mapping[param_name] = type_params[i]
-
     # Substitute type parameters in the struct
-    expanded_struct = substitute_type_parameters(generic_def.type, param_mapping)
+    if generics is not None:
+        expanded_struct = generics.instantiate(generic_def, type_params)
+    else:
+        expanded_struct = substitute_type_parameters(
+            generic_def.type, parameter_mapping(generic_def, type_params)
+        )
 
     visited.remove(type_name)
     return expanded_struct
 
 
-def substitute_type_parameters(node, param_mapping):
-    """
-    Substitute type parameters in a type node with actual types.
-
-    Args:
-        node: The type node to process
-        param_mapping: Dictionary mapping parameter names to actual types
-
-    Returns:
-        A new node with type parameters substituted
-    """
-    if isinstance(node, Type):
-        if node.name in param_mapping:
-            return param_mapping[node.name]
-        else:
-            # Recursively substitute in type parameters if any
-            new_params = None
-            if node.params:
-                new_params = [
-                    substitute_type_parameters(p, param_mapping) for p in node.params
-                ]
-            return Type(node.name, new_params)
-
-    elif isinstance(node, Struct):
-        new_obj = {}
-        for field_name, field_type in node.obj.items():
-            new_obj[field_name] = substitute_type_parameters(field_type, param_mapping)
-        return Struct(new_obj)
-
-    elif isinstance(node, Union):
-        new_types = [substitute_type_parameters(t, param_mapping) for t in node.types]
-        return Union(*new_types)
-
-    elif isinstance(node, Literal):
-        return node  # Literals don't need substitution
-
-    else:
-        # For other node types, return as-is
-        return node
-
-
-def create_normalizer(spec, remove_defaults=True):
+def create_normalizer(
+    spec, remove_defaults=True, in_place=False, compiled=False, cache_size=0
+):
     """
     Create a normalizer function curried with the given spec.
 
@@ -257,123 +286,324 @@ def create_normalizer(spec, remove_defaults=True):
         remove_defaults: If True, use normalize2 to remove default fields;
                          if False, use normalize1 to add default fields.
 
+        in_place: If True, the normalizer modifies the trees it is given.
+                  Otherwise it shares their unchanged subtrees.
+
+        compiled: If True, return a normalizer generated from the spec, with
+                  a specialized function for each type with defaults. See
+                  normalizer_compiler.py. It gives the same results, faster,
+                  but takes longer to create the first time for each spec.
+
+        cache_size: If greater than 0, return an IncrementalNormalizer that
+                    reuses the normalized forms of up to cache_size named
+                    subtrees that it has seen before. Can't be combined with
+                    in_place or compiled.
+
     Returns:
         A function that takes only a tree parameter and applies normalization
         using the defaults from the spec
     """
-    # Extract the defaults mapping from the spec
-    # We need to transform the type-based defaults into name-based defaults
-    # that the normalize function expects
-    name_to_type = spec.get("types", {})
-    type_to_defaults = spec.get("defaults", {})
+    if cache_size > 0:
+        if in_place or compiled:
+            raise ValueError("cache_size can't be combined with in_place or compiled")
+        return IncrementalNormalizer(spec, remove_defaults, cache_size)
+    if compiled:
+        return compile_normalizer(spec, remove_defaults, in_place)
 
-    # Build name-based defaults for the normalize function
-    name_based_defaults = {}
-    for name, type_name in name_to_type.items():
-        if type_name in type_to_defaults:
-            name_based_defaults[name] = type_to_defaults[type_name]
+    name_based_defaults = _name_based_defaults(spec)
 
     # Return the curried function
     def normalizer(tree):
         return (
-            normalize2(tree, name_based_defaults)
+            normalize2(tree, name_based_defaults, in_place)
             if remove_defaults
-            else normalize1(tree, name_based_defaults)
+            else normalize1(tree, name_based_defaults, in_place)
         )
 
     return normalizer
 
 
-def normalize1(tree, defaults):
+def _name_based_defaults(spec):
     """
-    Makes a deep copy of tree, replacing any dictionary that has a 'name'
-    property with the merge of the default template with that name and the keys
-    in the tree. The keys from the tree take precedence.
+    Returns the defaults of a spec keyed by name literal rather than by type
+    name, as normalize1() and normalize2() expect.
+    """
+    name_to_type = spec.get("types", {})
+    type_to_defaults = spec.get("defaults", {})
+    return {
+        name: type_to_defaults[type_name]
+        for name, type_name in name_to_type.items()
+        if type_name in type_to_defaults
+    }
+
+
+# Cached by IncrementalNormalizer for subtrees that normalize to themselves.
+_unchanged = object()
+
+# Version 2 is the latest marshal format without back references, so equal
+# subtrees always have the same encoding.
+_marshal_version = 2
+
+
+class IncrementalNormalizer:
+    """
+    A normalizer for trees that change a little at a time, such as the cart
+    in a conversation, which gains or changes an item or two per turn.
+
+    It keeps a bounded LRU cache of normalized subtrees, keyed by a
+    structural hash of each dictionary with a 'name' property: its marshal
+    encoding, which is computed in C, keeps key order, and tells True from 1.
+    Items and options that are unchanged since an earlier call are looked up
+    rather than normalized. The cache holds a private copy of each subtree
+    that normalization changes, and a marker for the others, so modifying
+    the trees passed in doesn't affect later calls.
+
+    Normalized subtrees that come from the cache are shared between the
+    results of different calls, so copy a result before modifying it.
+    Subtrees holding values that marshal can't encode aren't cached. The
+    results are otherwise the same as those of create_normalizer() with the
+    same spec and remove_defaults. The cache is guarded by a lock, so one
+    normalizer can be shared between threads.
+    """
+
+    def __init__(self, spec, remove_defaults=True, cache_size=1024):
+        self._defaults = _name_based_defaults(spec)
+        self._normalize_node = _remove_defaults if remove_defaults else _add_defaults
+        self._cache_size = cache_size
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._cache_hits = 0
+        self._cache_misses = 0
+
+    def __call__(self, tree):
+        return self._normalize(tree)
+
+    def cache_statistics(self):
+        """
+        Returns a dict with the number of hits and misses, and the current
+        and maximum number of entries, of the subtree cache.
+        """
+        with self._cache_lock:
+            return {
+                "hits": self._cache_hits,
+                "misses": self._cache_misses,
+                "size": len(self._cache),
+                "capacity": self._cache_size,
+            }
+
+    def clear_cache(self):
+        with self._cache_lock:
+            self._cache.clear()
+            self._cache_hits = 0
+            self._cache_misses = 0
+
+    def _normalize(self, node):
+        if isinstance(node, dict):
+            if "name" not in node or self._cache_size <= 0:
+                return self._normalize_dict(node)
+            try:
+                key = marshal.dumps(node, _marshal_version)
+            except ValueError:
+                return self._normalize_dict(node)
+            with self._cache_lock:
+                cached = self._cache.get(key)
+                if cached is None:
+                    self._cache_misses += 1
+                else:
+                    self._cache.move_to_end(key)
+                    self._cache_hits += 1
+            if cached is not None:
+                return node if cached is _unchanged else cached
+            result = self._normalize_dict(node)
+            # Cache a copy that shares nothing with the tree.
+            cached = (
+                _unchanged
+                if result is node
+                else marshal.loads(marshal.dumps(result, _marshal_version))
+            )
+            with self._cache_lock:
+                self._cache[key] = cached
+                if len(self._cache) > self._cache_size:
+                    self._cache.popitem(last=False)
+            return result
+        elif isinstance(node, list):
+            return _normalize_list(node, self._normalize, False)
+        return node
+
+    def _normalize_dict(self, node):
+        result = node
+        if "name" in node and node["name"] in self._defaults:
+            result = self._normalize_node(node, self._defaults[node["name"]], False)
+        for key, value in result.items():
+            normalized = self._normalize(value)
+            if normalized is not value:
+                if result is node:
+                    result = dict(node)
+                result[key] = normalized
+        return result
+
+
+def _copy_default(value):
+    """
+    Returns a copy of a default template value that is safe to hand out,
+    without the cost of copy.deepcopy() for immutable values like None.
+    """
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return copy.deepcopy(value)
+
+
+def normalize1(tree, defaults, in_place=False):
+    """
+    Returns tree with any dictionary that has a 'name' property replaced by
+    the merge of the default template with that name and the keys in the
+    tree. The keys from the tree take precedence.
+
+    The tree is not modified. New dictionaries and lists are only allocated
+    along the paths to the dictionaries that change, and unchanged subtrees
+    are shared with the tree, so copy the result before modifying it.
 
     Args:
         tree: A dictionary whose keys map to primitive types or other trees
         defaults: A dictionary mapping string keys to object templates
+        in_place: If True, modify and return the tree itself, for callers
+            that own it
 
     Returns:
-        A normalized deep copy of the tree
+        The normalized tree
     """
-    # Make a deep copy to avoid modifying the original
-    result = copy.deepcopy(tree)
 
     def _normalize_recursive(node):
         if isinstance(node, dict):
+            result = node
             # Check if this dictionary has a 'name' property
-            if "name" in node:
-                name = node["name"]
-                # If there's a default template for this name, merge it
-                if name in defaults:
-                    # Start with the default template
-                    merged = copy.deepcopy(defaults[name])
-                    # Override with values from the current node (tree takes precedence)
-                    merged.update(node)
-                    node = merged
+            if "name" in node and node["name"] in defaults:
+                result = _add_defaults(node, defaults[node["name"]], in_place)
 
             # Recursively normalize all values in the dictionary
-            for key, value in node.items():
-                node[key] = _normalize_recursive(value)
+            for key, value in result.items():
+                normalized = _normalize_recursive(value)
+                if normalized is not value:
+                    if result is node and not in_place:
+                        result = dict(node)
+                    result[key] = normalized
+            return result
 
         elif isinstance(node, list):
             # Handle lists by normalizing each element
-            for i, item in enumerate(node):
-                node[i] = _normalize_recursive(item)
+            return _normalize_list(node, _normalize_recursive, in_place)
 
         # For primitive types, return as-is
         return node
 
-    return _normalize_recursive(result)
+    return _normalize_recursive(tree)
 
 
-def normalize2(tree, defaults):
+def normalize2(tree, defaults, in_place=False):
     """
-    Makes a deep copy of tree, editing any dictionary that has a 'name'
-    property to remove all keys that have default values equal to those in
-    the default template with that name.
+    Returns tree with any dictionary that has a 'name' property edited to
+    remove all keys that have default values equal to those in the default
+    template with that name.
+
+    The tree is not modified. New dictionaries and lists are only allocated
+    along the paths to the dictionaries that change, and unchanged subtrees
+    are shared with the tree, so copy the result before modifying it.
 
     Args:
         tree: A dictionary whose keys map to primitive types or other trees
         defaults: A dictionary mapping string keys to object templates
+        in_place: If True, modify and return the tree itself, for callers
+            that own it
 
     Returns:
-        A normalized deep copy of the tree
+        The normalized tree
     """
-    # Make a deep copy to avoid modifying the original
-    result = copy.deepcopy(tree)
 
     def _normalize_recursive(node):
         if isinstance(node, dict):
+            result = node
             # Check if this dictionary has a 'name' property
-            if "name" in node:
-                name = node["name"]
-                default_spec = defaults.get(name, {})
-                for key, default_value in default_spec.items():
-                    # If the current node has the same key with the same value, remove it
-                    if key in node and node[key] == default_value:
-                        del node[key]
+            if "name" in node and node["name"] in defaults:
+                result = _remove_defaults(node, defaults[node["name"]], in_place)
 
             # Recursively normalize all values in the dictionary
-            for key, value in node.items():
-                node[key] = _normalize_recursive(value)
+            for key, value in result.items():
+                normalized = _normalize_recursive(value)
+                if normalized is not value:
+                    if result is node and not in_place:
+                        result = dict(node)
+                    result[key] = normalized
+            return result
 
         elif isinstance(node, list):
             # Handle lists by normalizing each element
-            for i, item in enumerate(node):
-                node[i] = _normalize_recursive(item)
+            return _normalize_list(node, _normalize_recursive, in_place)
 
         # For primitive types, return as-is
         return node
 
-    return _normalize_recursive(result)
+    return _normalize_recursive(tree)
+
+
+def _add_defaults(node, template, in_place):
+    """
+    Returns the merge of the default template and node, with the keys from
+    node taking precedence.
+    """
+    # Start with the default template, then override with values from the
+    # current node (tree takes precedence)
+    merged = {key: _copy_default(value) for key, value in template.items()}
+    merged.update(node)
+    if in_place:
+        node.clear()
+        node.update(merged)
+        return node
+    return merged
+
+
+def _remove_defaults(node, template, in_place):
+    """
+    Returns node without the keys whose values equal those in the default
+    template.
+    """
+    # Find the keys whose values are the same as the defaults
+    removed = [
+        key
+        for key, default_value in template.items()
+        if key in node and node[key] == default_value
+    ]
+    if not removed:
+        return node
+    if in_place:
+        for key in removed:
+            del node[key]
+        return node
+    return {key: value for key, value in node.items() if key not in removed}
+
+
+def _normalize_list(node, normalize, in_place):
+    """
+    Applies normalize to each item of the list node. Returns node itself if
+    no item changed or in_place is True, and otherwise a new list.
+    """
+    result = node
+    for i, item in enumerate(node):
+        normalized = normalize(item)
+        if normalized is not item:
+            if result is node and not in_place:
+                result = list(node)
+            result[i] = normalized
+    return result
 
 
 def merge_normalizer_specs(newSpec, originalSpec, renamedTypes):
     """
     Merge two normalizer specs that were produced by create_normalizer_spec().
 
+    The merge does work only for the types with defaults in newSpec. Default
+    entries that the merge doesn't change are shared with the input specs
+    rather than copied, so treat specs as read-only once they are merged.
+
     Args:
         newSpec: The new normalizer spec dictionary containing "types", "defaults", and "duplicates"
         originalSpec: The original normalizer spec dictionary
@@ -404,57 +634,75 @@ def merge_normalizer_specs(newSpec, originalSpec, renamedTypes):
                 f"Type '{old_name}' in renamedTypes not found in original spec defaults"
             )
 
-    # Start with types and duplicates from newSpec
+    # Start with types and duplicates from newSpec. The merged spec gets its
+    # own containers, but their values are shared.
     merged_spec = {
-        "types": copy.deepcopy(newSpec.get("types", {})),
-        "duplicates": copy.deepcopy(newSpec.get("duplicates", {})),
+        "types": dict(newSpec.get("types", {})),
+        "duplicates": {
+            name: list(names) for name, names in newSpec.get("duplicates", {}).items()
+        },
         "defaults": {},
     }
 
-    # Deep copy original defaults and rename keys according to renamedTypes
-    renamed_original_defaults = {}
-    for type_name, defaults in original_defaults.items():
-        new_type_name = renamedTypes.get(type_name, type_name)
-        renamed_original_defaults[new_type_name] = copy.deepcopy(defaults)
+    # Rename the keys of the original defaults according to renamedTypes
+    if renamedTypes:
+        renamed_original_defaults = {
+            renamedTypes.get(type_name, type_name): defaults
+            for type_name, defaults in original_defaults.items()
+        }
+    else:
+        renamed_original_defaults = dict(original_defaults)
 
     # Start with renamed original defaults
-    merged_defaults = renamed_original_defaults
+    merged_defaults = dict(renamed_original_defaults)
 
-    # Merge in defaults from newSpec
+    # Merge in defaults from newSpec, with newSpec taking precedence
     new_defaults = newSpec.get("defaults", {})
     for type_name, defaults in new_defaults.items():
-        if type_name in merged_defaults:
-            # Merge default values, with newSpec taking precedence
-            merged_entry = copy.deepcopy(merged_defaults[type_name])
+        original = merged_defaults.get(type_name)
+        if original is None:
+            merged_defaults[type_name] = defaults
+        elif not _adds_defaults(original, defaults):
+            # The merged entry would equal the original, key order included.
+            pass
+        elif not original:
+            merged_defaults[type_name] = defaults
+        else:
+            merged_entry = dict(original)
             merged_entry.update(defaults)
             merged_defaults[type_name] = merged_entry
-        else:
-            # New entry - add it
-            merged_defaults[type_name] = copy.deepcopy(defaults)
 
     # Check for stale entries from originalSpec that don't appear in newSpec
-    stale_types_to_remove = []
-    for type_name in renamed_original_defaults.keys():
+    for type_name, defaults_value in renamed_original_defaults.items():
         if type_name not in new_defaults:
-            defaults_value = renamed_original_defaults[type_name]
             # Generate warning
             warnings.append(
                 f"Type '{type_name}' from original spec not found in new spec"
             )
-            # Mark for deletion if default value is None or {}
+            # Remove the entry if its default value is None or {}
             if defaults_value is None or defaults_value == {}:
-                stale_types_to_remove.append(type_name)
-
-    # Remove stale types that were marked for deletion
-    for type_name in stale_types_to_remove:
-        if type_name in merged_defaults:
-            del merged_defaults[type_name]
+                merged_defaults.pop(type_name, None)
 
     merged_spec["defaults"] = merged_defaults
 
     return merged_spec, warnings
 
 
+def _adds_defaults(original, defaults):
+    """
+    Returns True if merging defaults into original would change original.
+    """
+    for key, value in defaults.items():
+        if key not in original:
+            return True
+        existing = original[key]
+        if existing is not value and (
+            type(existing) is not type(value) or existing != value
+        ):
+            return True
+    return False
+
+
 # def test_enhanced_function():
 #     """Test the enhanced function with the generic type example."""
 
@@ -0,0 +1,211 @@
+"""
+Code generation for specialized normalizers.
+
+compile_normalizer() turns a normalizer spec into Python source with one
+function per type that has defaults, in which the default fields are
+unrolled into direct key comparisons, plus a driver that walks the tree and
+dispatches on the "name" property through a dict. The source is compiled
+once per spec and set of options, and the most recently used normalizers
+are cached by a hash of the spec that depends on the order of its keys,
+since that order is part of the output. Specs with defaults that can't be
+hashed exactly are compiled each time.
+
+The compiled normalizers produce the same results as normalize1() and
+normalize2(), including key order, and share unchanged subtrees in the
+same way.
+"""
+
+from collections import OrderedDict
+import copy
+import hashlib
+import marshal
+import math
+import threading
+
+# The number of compiled normalizers kept.
+_cache_size = 64
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+# Default values of these types are written into the source with repr().
+# Others are passed to the generated code as constants.
+_literal_types = (type(None), bool, int, float, str)
+
+
+def spec_hash(spec):
+    """
+    Returns a hex digest of the "types" and "defaults" of a normalizer spec.
+    Specs whose defaults have the same fields in a different order, or
+    values that are equal but of different types, have different digests.
+
+    Args:
+        spec: A normalizer spec, as returned by create_normalizer_spec()
+
+    Returns:
+        str: The SHA-256 digest of an encoding of the spec
+
+    Raises:
+        ValueError: If the spec has defaults that marshal can't encode,
+          e.g. instances of classes
+    """
+    parts = (spec.get("types", {}), spec.get("defaults", {}))
+    # Version 2 has no back references, so equal specs encode the same.
+    return hashlib.sha256(marshal.dumps(parts, 2)).hexdigest()
+
+
+def compile_normalizer(spec, remove_defaults=True, in_place=False):
+    """
+    Returns a compiled normalizer for the spec. See create_normalizer() for
+    the meaning of the arguments. Normalizers are cached, so calling this
+    again with an equal spec and the same options returns the same function.
+
+    Only the 64 most recently used normalizers are kept. Specs with
+    defaults that marshal can't encode are compiled on every call, since
+    the only other way to identify such values, by their repr(), can
+    include their address, which may be reused by a different object.
+
+    The generated source is available as the normalizer's `source` attribute.
+    """
+    try:
+        digest = spec_hash(spec)
+    except ValueError:
+        return _compile(spec, remove_defaults, in_place, "uncached")
+    key = (digest, remove_defaults, in_place)
+    with _cache_lock:
+        normalizer = _cache.get(key)
+        if normalizer is not None:
+            _cache.move_to_end(key)
+            return normalizer
+    normalizer = _compile(spec, remove_defaults, in_place, digest[:12])
+    with _cache_lock:
+        normalizer = _cache.setdefault(key, normalizer)
+        _cache.move_to_end(key)
+        if len(_cache) > _cache_size:
+            _cache.popitem(last=False)
+    return normalizer
+
+
+def _compile(spec, remove_defaults, in_place, label):
+    name_to_type = spec.get("types", {})
+    type_to_defaults = spec.get("defaults", {})
+
+    constants = {}
+    lines = []
+
+    def value_source(value):
+        # repr() of an infinite or NaN float isn't valid source.
+        if isinstance(value, _literal_types) and not (
+            isinstance(value, float) and not math.isfinite(value)
+        ):
+            return repr(value)
+        name = f"_constant{len(constants)}"
+        constants[name] = value
+        return name
+
+    # One function per type with defaults.
+    function_names = {}
+    for type_name, defaults in type_to_defaults.items():
+        function_name = f"_type{len(function_names)}"
+        function_names[type_name] = function_name
+        lines.append(f"def {function_name}(node):")
+        lines.append(f"    # {type_name!r}")
+        if remove_defaults:
+            _remove_defaults_source(lines, defaults, value_source, in_place)
+        else:
+            _add_defaults_source(lines, defaults, value_source, in_place)
+        lines.append("")
+
+    dispatch = ", ".join(
+        f"{name!r}: {function_names[type_name]}"
+        for name, type_name in name_to_type.items()
+        if type_name in function_names
+    )
+    lines.append(f"_by_name = {{{dispatch}}}")
+    lines.append("")
+    _driver_source(lines, in_place)
+
+    source = "\n".join(lines) + "\n"
+    namespace = {"_copy_default": _copy_default, **constants}
+    exec(compile(source, f"<normalizer {label}>", "exec"), namespace)
+    normalizer = namespace["normalize"]
+    normalizer.source = source
+    return normalizer
+
+
+def _copy_default(value):
+    return copy.deepcopy(value)
+
+
+def _add_defaults_source(lines, defaults, value_source, in_place):
+    fields = []
+    for key, value in defaults.items():
+        if isinstance(value, _literal_types):
+            fields.append(f"{key!r}: {value_source(value)}")
+        else:
+            # Hand out a copy of a mutable default, as normalize1() does.
+            fields.append(f"{key!r}: _copy_default({value_source(value)})")
+    lines.append(f"    merged = {{{', '.join(fields)}}}")
+    lines.append("    merged.update(node)")
+    if in_place:
+        lines.append("    node.clear()")
+        lines.append("    node.update(merged)")
+        lines.append("    return node")
+    else:
+        lines.append("    return merged")
+
+
+def _remove_defaults_source(lines, defaults, value_source, in_place):
+    if not defaults:
+        lines.append("    return node")
+        return
+    tests = [
+        (key, f"{key!r} in node and node[{key!r}] == {value_source(value)}")
+        for key, value in defaults.items()
+    ]
+    if in_place:
+        for key, test in tests:
+            lines.append(f"    if {test}:")
+            lines.append(f"        del node[{key!r}]")
+        lines.append("    return node")
+    else:
+        lines.append("    removed = []")
+        for key, test in tests:
+            lines.append(f"    if {test}:")
+            lines.append(f"        removed.append({key!r})")
+        lines.append("    if removed:")
+        lines.append(
+            "        return {key: value for key, value in node.items() if key not in removed}"
+        )
+        lines.append("    return node")
+
+
+def _driver_source(lines, in_place):
+    # Values that aren't dicts or lists can't change, so they are skipped
+    # without a call.
+    copy_dict = "" if in_place else "\n                    if result is node:\n                        result = dict(node)"
+    copy_list = "" if in_place else "\n                    if result is node:\n                        result = list(node)"
+    lines.append(
+        f"""def normalize(node):
+    if isinstance(node, dict):
+        result = node
+        if "name" in node:
+            specialized = _by_name.get(node["name"])
+            if specialized is not None:
+                result = specialized(node)
+        for key, value in result.items():
+            if isinstance(value, (dict, list)):
+                normalized = normalize(value)
+                if normalized is not value:{copy_dict}
+                    result[key] = normalized
+        return result
+    elif isinstance(node, list):
+        result = node
+        for i, item in enumerate(node):
+            if isinstance(item, (dict, list)):
+                normalized = normalize(item)
+                if normalized is not item:{copy_list}
+                    result[i] = normalized
+        return result
+    return node"""
+    )
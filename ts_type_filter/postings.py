@@ -0,0 +1,134 @@
+"""
+Compressed postings lists for the inverted index.
+
+A postings list is an ascending list of integer document ids. The
+compressed form stores the gap between consecutive ids (the first id is
+stored as its gap from zero) as an unsigned LEB128 varint: seven bits per
+byte, least significant group first, with the high bit set on every byte
+except the last byte of each gap.
+
+Dense postings lists, where every gap is under 128, encode to one byte per
+posting and decode with a single call to itertools.accumulate().
+
+The set operations at the end of the module work on the decoded, ascending
+lists. Intersection and difference walk the shorter list and gallop through
+the longer one, so their cost grows with the length of the shorter list and
+only logarithmically with the length of the longer one.
+"""
+
+from bisect import bisect_left
+from itertools import accumulate
+
+
+def append_posting(data, gap):
+  """
+  Appends one varint-encoded gap to the bytearray `data`.
+  """
+  while gap >= 0x80:
+    data.append((gap & 0x7F) | 0x80)
+    gap >>= 7
+  data.append(gap)
+
+
+def encode_postings(ids):
+  """
+  Encodes an ascending list of ids as a bytearray of varint gaps.
+  """
+  data = bytearray()
+  previous = 0
+  for id in ids:
+    append_posting(data, id - previous)
+    previous = id
+  return data
+
+
+def decode_postings(data):
+  """
+  Decodes a bytearray produced by encode_postings() back into a list of ids.
+  """
+  if not data:
+    return []
+  if max(data) < 0x80:
+    # Every gap fits in a single byte.
+    return list(accumulate(data))
+
+  ids = []
+  id = 0
+  gap = 0
+  shift = 0
+  for byte in data:
+    if byte & 0x80:
+      gap |= (byte & 0x7F) << shift
+      shift += 7
+    else:
+      id += gap | (byte << shift)
+      ids.append(id)
+      gap = 0
+      shift = 0
+  return ids
+
+
+
+def gallop(ids, target, start):
+  """
+  Returns the position of the first id in the ascending list `ids` at or
+  after position `start` that is not less than `target`. Probes positions
+  start, start + 1, start + 3, start + 7, ... to bracket the target, then
+  binary searches within the bracket.
+  """
+  step = 1
+  low = start
+  high = start
+  while high < len(ids) and ids[high] < target:
+    low = high + 1
+    high = start + 2 * step - 1
+    step *= 2
+  return bisect_left(ids, target, low, min(high, len(ids)))
+
+
+def intersect_postings(lists):
+  """
+  Returns the ascending list of ids common to every list in `lists`.
+  Lists are intersected from shortest to longest.
+  """
+  lists = sorted(lists, key=len)
+  if not lists:
+    return []
+  result = lists[0]
+  for other in lists[1:]:
+    if not result:
+      break
+    common = []
+    position = 0
+    for id in result:
+      position = gallop(other, id, position)
+      if position == len(other):
+        break
+      if other[position] == id:
+        common.append(id)
+    result = common
+  return list(result)
+
+
+def subtract_postings(ids, excluded):
+  """
+  Returns the ascending list of ids in `ids` that are not in `excluded`.
+  """
+  if not excluded:
+    return list(ids)
+  result = []
+  position = 0
+  for id in ids:
+    position = gallop(excluded, id, position)
+    if position == len(excluded) or excluded[position] != id:
+      result.append(id)
+  return result
+
+
+def union_postings(lists):
+  """
+  Returns the ascending list of ids in any list in `lists`.
+  """
+  if len(lists) == 1:
+    return list(lists[0])
+  return sorted(set().union(*lists))
@@ -0,0 +1,99 @@
+"""
+Query-time profiling for Index.match() and TypeIndex.nodes().
+
+Pass a profiler to Index or TypeIndex (or build_type_index), or assign
+one to Index.profiler. match() calls it with a dict describing each query:
+
+  {
+    "phases": {
+      "break": seconds spent breaking the query into words,
+      "stem": seconds spent stemming and expanding the words,
+      "lookup": seconds spent reading postings lists,
+      "order": seconds spent restoring insertion order,
+    },
+    "total": seconds spent in match(),
+    "words": number of words in the query,
+    "stems": number of unique vocabulary terms the words matched,
+    "postings": number of postings read,
+    "matches": number of documents returned,
+    "cached": True if the result came from the match() cache,
+  }
+
+The lookup and order phases are 0 for cached results, and the postings
+count is 0. Any callable works as a profiler. ProfileHistograms
+aggregates profiles for later reporting.
+"""
+
+import threading
+
+
+def histogram_bucket(value):
+  """
+  Returns the power of two histogram bucket for a non-negative integer,
+  e.g. "0", "1", "2-3", "4-7".
+  """
+  if value <= 0:
+    return "0"
+  lower = 1 << (value.bit_length() - 1)
+  upper = 2 * lower - 1
+  return str(lower) if lower == upper else f"{lower}-{upper}"
+
+
+class ProfileHistograms:
+  """
+  Profiler that aggregates match() profiles into power of two histograms:
+  one per phase, and one for the total, in microseconds, and one for each
+  count. It is safe to share between threads.
+  """
+  timings = ("break", "stem", "lookup", "order", "total")
+  counts = ("words", "stems", "postings", "matches")
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self.clear()
+
+  def clear(self):
+    with self._lock:
+      self._queries = 0
+      self._cached = 0
+      self._seconds = {name: 0.0 for name in self.timings}
+      self._histograms = {name: {} for name in self.timings + self.counts}
+
+  def __call__(self, profile):
+    values = {
+      name: profile["phases"].get(name, 0.0) for name in self.timings[:-1]
+    }
+    values["total"] = profile["total"]
+    with self._lock:
+      self._queries += 1
+      self._cached += profile["cached"]
+      for name, seconds in values.items():
+        self._seconds[name] += seconds
+        self._add(name, int(seconds * 1e6))
+      for name in self.counts:
+        self._add(name, profile[name])
+
+  def _add(self, name, value):
+    histogram = self._histograms[name]
+    bucket = histogram_bucket(value)
+    histogram[bucket] = histogram.get(bucket, 0) + 1
+
+  def summary(self):
+    """
+    Returns a dict with the number of queries and cache hits, the total
+    seconds spent in each phase, and the histograms, with buckets in
+    ascending order. The dict can be passed to json.dumps().
+    """
+    with self._lock:
+      return {
+        "queries": self._queries,
+        "cached": self._cached,
+        "seconds": dict(self._seconds),
+        "histograms": {
+          name: {
+            bucket: histogram[bucket]
+            for bucket in sorted(histogram, key=lambda b: int(b.split("-")[0]))
+          }
+          for name, histogram in self._histograms.items()
+        },
+      }
@@ -0,0 +1,414 @@
+"""
+An Index split across worker processes, for corpora too large to index
+and query quickly in a single process.
+
+Each document is assigned to one of N shards by its hash, and each shard
+is an ordinary Index running in its own process. The parent process keeps
+the documents themselves and gives each one a global id in insertion
+order. It runs the extractor and sends each shard only the global ids and
+text streams of its documents, so documents and extractors need not be
+picklable. The breaker, stemmer and other Index options are sent to the
+shards, so they must be.
+
+Shards break and stem their documents in parallel, and match() sends the
+query to every shard before waiting for any of them. Every shard returns
+its matching global ids in ascending order, and merging the sorted lists
+restores the insertion order that Index.match() returns.
+
+Prefix and fuzzy expansion depend on the whole vocabulary: a prefix
+expands to the first `prefix_limit` terms of all the shards, not of each
+one, and a misspelled word matches the closest terms of all the shards.
+So when a query can expand, the parent first gathers what each shard's
+vocabulary holds for the query words, resolves the words to terms against
+the merged vocabulary, and then sends every shard the same terms. Queries
+that can't expand are sent to the shards as they are, since a term that
+is missing from a shard matches nothing there anyway.
+"""
+
+import heapq
+import multiprocessing
+
+from .boolean_query import parse_boolean_query
+from .inverted_index import Index, nop_extractor
+from .trigrams import closest_candidates
+
+
+class _ShardDocument:
+  """
+  A document as the shard sees it: its global id and, until it has been
+  indexed, its text streams. Documents compare by global id alone, so the
+  parent can refer to a document without resending its text.
+  """
+  __slots__ = ("id", "texts")
+
+  def __init__(self, id, texts=None):
+    self.id = id
+    self.texts = texts
+
+  def __eq__(self, other):
+    return isinstance(other, _ShardDocument) and self.id == other.id
+
+  def __hash__(self):
+    return hash(self.id)
+
+
+def _shard_extractor(document):
+  texts = document.texts
+  # The text is only needed while the document is being indexed.
+  document.texts = None
+  return texts
+
+
+def _serve_shard(connection, index_options):
+  """
+  Runs in each shard process. Receives (method, args) requests, calls the
+  method on the shard's Index, and replies with ("ok", result) or
+  ("error", exception) until it receives None.
+  """
+  index = Index(extractor=_shard_extractor, **index_options)
+  while True:
+    request = connection.recv()
+    if request is None:
+      break
+    method, args = request
+    try:
+      if method == "add_many":
+        result = index.add_many(_ShardDocument(id, texts) for id, texts in args[0])
+      elif method in ("match", "match_boolean", "_match_terms", "_match_boolean_terms"):
+        result = [document.id for document in getattr(index, method)(*args)]
+      elif method in ("remove", "pin"):
+        result = getattr(index, method)(_ShardDocument(args[0]))
+      elif method == "remove_many":
+        for id in args[0]:
+          index.remove(_ShardDocument(id))
+        result = None
+      else:
+        result = getattr(index, method)(*args)
+      connection.send(("ok", result))
+    except Exception as e:
+      connection.send(("error", e))
+  connection.close()
+
+
+class _MergedVocabulary:
+  """
+  The vocabularies of all the shards, as far as they concern the words of
+  one query, for Index._terms_for_words(). Built from each shard's
+  Index._lookups() for the words.
+  """
+  def __init__(self, lookups, prefix_limit, fuzzy_distance, fuzzy_candidates):
+    self._terms = set().union(*(terms for terms, _, _ in lookups))
+    self._prefixes = [prefixes for _, prefixes, _ in lookups]
+    self._candidates = [candidates for _, _, candidates in lookups]
+    self._prefix_limit = prefix_limit
+    self._fuzzy_distance = fuzzy_distance
+    self._fuzzy_candidates = fuzzy_candidates
+
+  def has_term(self, term):
+    return term in self._terms
+
+  def expand_prefix(self, prefix):
+    # Each shard returns its first prefix_limit terms, so the first
+    # prefix_limit terms overall are among them.
+    terms = set().union(*(prefixes.get(prefix, ()) for prefixes in self._prefixes))
+    return sorted(terms)[:self._prefix_limit]
+
+  def closest_terms(self, word):
+    # A term shares the same trigrams with the word in every shard, so the
+    # best candidates overall are among the best of each shard.
+    pairs = set().union(*(candidates.get(word, ()) for candidates in self._candidates))
+    best = heapq.nlargest(self._fuzzy_candidates, pairs)
+    return closest_candidates(word, [term for _, term in best], self._fuzzy_distance)
+
+
+def _term_texts(tree):
+  """
+  Yields the text of every term in a boolean query tree.
+  """
+  operator, operands = tree
+  if operator == "term":
+    yield operands
+  elif operator == "not":
+    yield from _term_texts(operands)
+  else:
+    for operand in operands:
+      yield from _term_texts(operand)
+
+
+class ShardedIndex:
+  """
+  Drop-in replacement for Index that spreads the documents over `shards`
+  worker processes. The remaining arguments are the same as for Index.
+
+  The shards hold their own match() caches. Call close(), or use the index
+  as a context manager, to stop the worker processes.
+  """
+  def __init__(self, extractor=None, breaker=None, stemmer=None, shards=None, **index_options):
+    if shards is None:
+      shards = multiprocessing.cpu_count()
+    if shards < 1:
+      raise ValueError("A ShardedIndex needs at least one shard.")
+    self._extractor = extractor or nop_extractor
+    index_options = dict(index_options, breaker=breaker, stemmer=stemmer)
+
+    # Used for highlight(), which needs the breaker and stemmer, but none
+    # of the documents. Spans are stored with the documents, so there is no
+    # point storing them in the shards.
+    index_options.pop("store_spans", None)
+    self._local = Index(extractor, **index_options)
+
+    self._documents = {}
+    self._ids = {}
+    self._next_id = 0
+    self._pinned = set()
+    self._connections = []
+    self._processes = []
+    for _ in range(shards):
+      parent, child = multiprocessing.Pipe()
+      process = multiprocessing.Process(
+        target=_serve_shard, args=(child, index_options), daemon=True)
+      process.start()
+      child.close()
+      self._connections.append(parent)
+      self._processes.append(process)
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc_info):
+    self.close()
+
+  def close(self):
+    """
+    Stops the shard processes.
+    """
+    for connection, process in zip(self._connections, self._processes):
+      try:
+        connection.send(None)
+      except (BrokenPipeError, OSError):
+        pass
+      process.join()
+      connection.close()
+    self._connections = []
+    self._processes = []
+
+  def _shard_for(self, document):
+    return hash(document) % len(self._connections)
+
+  def _send(self, shard, method, *args):
+    """
+    Sends a request to a shard without waiting for its reply.
+    """
+    self._connections[shard].send((method, args))
+
+  def _receive(self, shard):
+    """
+    Waits for a shard's reply to its oldest outstanding request, and
+    returns the result or raises the exception it carries.
+    """
+    status, result = self._connections[shard].recv()
+    if status == "error":
+      raise result
+    return result
+
+  def _gather(self, method, *args):
+    """
+    Sends a request to every shard, then returns the list of their replies.
+    """
+    for shard in range(len(self._connections)):
+      self._send(shard, method, *args)
+    results = []
+    error = None
+    for shard in range(len(self._connections)):
+      # Drain every shard even after an error, so that no stale replies
+      # are left for the next request.
+      try:
+        results.append(self._receive(shard))
+      except Exception as e:
+        error = error or e
+    if error is not None:
+      raise error
+    return results
+
+  def add(self, document):
+    self.add_many([document])
+
+  def add_many(self, documents):
+    """
+    Adds a sequence of documents, in order. Each shard indexes its part of
+    the sequence in parallel with the others. If any shard fails, none of
+    the documents are added.
+    """
+    documents = list(documents)
+    seen = set()
+    for document in documents:
+      if document in self._ids or document in seen:
+        raise ValueError("Attempting to add duplicate document.")
+      seen.add(document)
+
+    # The parent's maps are only updated once every shard has added its
+    # part, so that a failure leaves the index as it was, as with Index.
+    batches = [[] for _ in self._connections]
+    ids = []
+    for document in documents:
+      id = self._next_id + len(ids)
+      ids.append(id)
+      batches[self._shard_for(document)].append((id, list(self._extractor(document))))
+    self._next_id += len(ids)
+
+    shards = [shard for shard, batch in enumerate(batches) if batch]
+    for shard in shards:
+      self._send(shard, "add_many", batches[shard])
+    added = []
+    error = None
+    for shard in shards:
+      # Drain every shard even after an error, so that no stale replies
+      # are left for the next request.
+      try:
+        self._receive(shard)
+        added.append(shard)
+      except Exception as e:
+        error = error or e
+    if error is not None:
+      # A shard that fails to add its part adds none of it, so only the
+      # shards that succeeded need to drop theirs.
+      for shard in added:
+        self._send(shard, "remove_many", [id for id, _ in batches[shard]])
+      for shard in added:
+        self._receive(shard)
+      raise error
+
+    for id, document in zip(ids, documents):
+      self._documents[id] = document
+      self._ids[document] = id
+
+  def remove(self, document):
+    id = self._ids.pop(document, None)
+    if id is None:
+      raise ValueError("Attempting to remove unknown document.")
+    del self._documents[id]
+    self._pinned.discard(id)
+    shard = self._shard_for(document)
+    self._send(shard, "remove", id)
+    self._receive(shard)
+
+  def update(self, document):
+    """
+    Reindexes a document whose text has changed. Like Index.update(), the
+    document keeps its pin and moves to the end of the insertion order.
+    """
+    pinned = self._ids.get(document) in self._pinned
+    self.remove(document)
+    self.add(document)
+    if pinned:
+      self.pin(document)
+
+  def pin(self, document):
+    id = self._ids.get(document)
+    if id is None:
+      raise ValueError("Attempting to pin unknown document.")
+    self._pinned.add(id)
+    shard = self._shard_for(document)
+    self._send(shard, "pin", id)
+    self._receive(shard)
+
+  def compact(self):
+    self._gather("compact")
+
+  def documents(self):
+    return list(self._documents.values())
+
+  def match(self, query):
+    """
+    Same as Index.match(). Every shard matches the query concurrently.
+    """
+    words = self._local._query_words(query)
+    if not self._can_expand(words):
+      return self._merge(self._gather("match", query))
+    terms = self._local._terms_for_words(words, self._vocabulary(words))
+    return self._merge(self._gather("_match_terms", sorted(terms)))
+
+  def match_boolean(self, query):
+    """
+    Same as Index.match_boolean(). Every shard matches the query
+    concurrently.
+    """
+    # Parse here too, so that syntax errors are raised before any shard
+    # does any work.
+    tree = parse_boolean_query(query)
+    words = [
+      word for text in _term_texts(tree) for word in self._local._breaker(text)]
+    if not self._can_expand(words):
+      return self._merge(self._gather("match_boolean", query))
+    vocabulary = self._vocabulary(words)
+    resolved = {
+      word: tuple(sorted(self._local._terms_for_words([word], vocabulary)))
+      for word in words
+    }
+    return self._merge(self._gather("_match_boolean_terms", tree, resolved))
+
+  def _can_expand(self, words):
+    """
+    Returns True if any of `words` could match by prefix or fuzzy
+    expansion, which depends on the vocabularies of all the shards.
+    """
+    local = self._local
+    return (
+      local._expand_prefixes
+      or local._fuzzy_distance > 0
+      or any(len(word) > 1 and word.endswith("*") for word in words))
+
+  def _vocabulary(self, words):
+    """
+    Returns the _MergedVocabulary of the shards for `words`.
+    """
+    local = self._local
+    return _MergedVocabulary(
+      self._gather("_lookups", words),
+      local._prefix_limit,
+      local._fuzzy_distance,
+      local._fuzzy_candidates)
+
+  def _merge(self, lists):
+    documents = self._documents
+    return [documents[id] for id in heapq.merge(*lists)]
+
+  def expand_prefix(self, prefix):
+    terms = set().union(*self._gather("expand_prefix", prefix))
+    return sorted(terms)[:self._local._prefix_limit]
+
+  def closest_terms(self, word):
+    local = self._local
+    candidates = set().union(*self._gather("_trigram_candidates", word))
+    best = heapq.nlargest(local._fuzzy_candidates, candidates)
+    return closest_candidates(word, [term for _, term in best], local._fuzzy_distance)
+
+  def highlight(self, query, document, markup="rich"):
+    words = self._local._query_words(query)
+    terms = self._local._terms_for_words(words, self._vocabulary(words))
+    return self._local._highlight(query, document, markup, terms)
+
+  def cache_statistics(self):
+    """
+    Returns the match() cache statistics summed over the shards.
+    """
+    totals = {"hits": 0, "misses": 0, "size": 0, "capacity": 0}
+    for stats in self._gather("cache_statistics"):
+      for key in totals:
+        totals[key] += stats[key]
+    return totals
+
+  def statistics(self, top=20):
+    """
+    Returns the totals of the per-shard document, tombstone, pinned and
+    postings counts, along with the Index.statistics() of each shard.
+    Terms can appear in more than one shard, so the vocabulary size is
+    only reported per shard.
+    """
+    shards = self._gather("statistics", top)
+    totals = {
+      key: sum(stats[key] for stats in shards)
+      for key in ("documents", "tombstones", "pinned", "postings")
+    }
+    totals["shards"] = shards
+    return totals
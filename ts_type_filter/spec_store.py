@@ -0,0 +1,193 @@
+"""
+Versioned JSON artifacts for normalizer specs, keyed by a hash of the schema.
+
+A spec artifact is a JSON file holding
+
+    {
+        "version": SPEC_ARTIFACT_VERSION,
+        "schema_hash": schema_hash(type_defs),
+        "spec": create_normalizer_spec(type_defs),
+    }
+
+SpecStore keeps one artifact per schema in a directory, named by the schema
+hash. Services can build the artifact ahead of time (for example, at deploy
+time) and then take spec creation off their startup path with
+SpecStore.normalizer(), which returns a normalizer that loads its artifact
+and compiles it the first time it is called. Specs and normalizers are
+cached per process, so each is loaded and compiled once.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+from ts_type_filter.filter import Define
+from ts_type_filter.normalize import create_normalizer, create_normalizer_spec
+
+# Bump when the layout of the artifact or of the spec inside it changes.
+SPEC_ARTIFACT_VERSION = 1
+
+
+def schema_hash(type_defs):
+    """
+    Returns the SHA-256 hex digest of the formatted type definitions, so
+    that schemas that parse to the same definitions have the same hash, no
+    matter how their source is laid out. Comments are ignored.
+
+    Args:
+        type_defs (list): List of type definitions (Define objects)
+
+    Returns:
+        str: The hex digest
+    """
+    digest = hashlib.sha256()
+    for type_def in type_defs:
+        if isinstance(type_def, Define):
+            digest.update(type_def.format().encode("utf-8"))
+            digest.update(b"\n")
+    return digest.hexdigest()
+
+
+def save_spec(path, spec, schema_hash):
+    """
+    Writes a spec artifact to path. The file is written under a unique
+    temporary name and then renamed, so readers never see a partial
+    artifact, and concurrent writers don't interfere.
+    """
+    artifact = {
+        "version": SPEC_ARTIFACT_VERSION,
+        "schema_hash": schema_hash,
+        "spec": spec,
+    }
+    # A unique temporary file, so that threads and processes saving the
+    # same artifact at once don't write to the same file.
+    descriptor, temporary = tempfile.mkstemp(
+        dir=os.path.dirname(path) or ".", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(descriptor, "w", encoding="utf-8") as f:
+            json.dump(artifact, f, ensure_ascii=False)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def load_spec(path, schema_hash=None):
+    """
+    Reads the spec from the artifact at path.
+
+    Args:
+        path (str): The artifact's path
+        schema_hash (str): If not None, the hash the artifact must be for
+
+    Returns:
+        dict: The spec
+
+    Raises:
+        ValueError: If the artifact has a different version or schema hash
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        artifact = json.load(f)
+    if artifact.get("version") != SPEC_ARTIFACT_VERSION:
+        raise ValueError(
+            f"Spec artifact {path} has version {artifact.get('version')}, "
+            f"expected {SPEC_ARTIFACT_VERSION}"
+        )
+    if schema_hash is not None and artifact.get("schema_hash") != schema_hash:
+        raise ValueError(f"Spec artifact {path} is for a different schema")
+    return artifact["spec"]
+
+
+class SpecStore:
+    """
+    A directory of spec artifacts, one per schema hash, with a per-process
+    cache of the specs and normalizers that have been loaded from it.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._specs = {}
+        self._normalizers = {}
+        self._lock = threading.Lock()
+
+    def path(self, schema_hash):
+        return os.path.join(self.directory, f"{schema_hash}.json")
+
+    def spec(self, type_defs, symbols=None):
+        """
+        Returns the spec for type_defs, loading it from its artifact, or
+        creating the spec and saving the artifact if there isn't one.
+
+        Args:
+            type_defs (list): List of type definitions (Define objects)
+            symbols (SymbolTable): Optional symbol table for type_defs,
+                passed to create_normalizer_spec()
+        """
+        key = schema_hash(type_defs)
+        spec = self.load(key)
+        if spec is None:
+            spec = create_normalizer_spec(type_defs, symbols)
+            os.makedirs(self.directory, exist_ok=True)
+            save_spec(self.path(key), spec, key)
+            with self._lock:
+                spec = self._specs.setdefault(key, spec)
+        return spec
+
+    def load(self, schema_hash):
+        """
+        Returns the spec for schema_hash, or None if there is no artifact
+        for it. The artifact is read at most once per process.
+        """
+        with self._lock:
+            spec = self._specs.get(schema_hash)
+        if spec is None:
+            path = self.path(schema_hash)
+            if not os.path.exists(path):
+                return None
+            spec = load_spec(path, schema_hash)
+            with self._lock:
+                spec = self._specs.setdefault(schema_hash, spec)
+        return spec
+
+    def normalizer(self, schema_hash, remove_defaults=True, in_place=False):
+        """
+        Returns a normalizer for the schema with the given hash. Its artifact
+        is loaded, and compiled with create_normalizer(..., compiled=True),
+        the first time the normalizer is called. Later calls for the same
+        hash and options return the same normalizer.
+
+        Raises:
+            ValueError: When the normalizer is first called, if there is no
+                artifact for schema_hash
+        """
+        key = (schema_hash, remove_defaults, in_place)
+        with self._lock:
+            normalizer = self._normalizers.get(key)
+            if normalizer is None:
+                normalizer = _LazyNormalizer(self, *key)
+                self._normalizers[key] = normalizer
+        return normalizer
+
+
+class _LazyNormalizer:
+    def __init__(self, store, schema_hash, remove_defaults, in_place):
+        self._store = store
+        self._schema_hash = schema_hash
+        self._remove_defaults = remove_defaults
+        self._in_place = in_place
+        self._normalizer = None
+
+    def __call__(self, tree):
+        normalizer = self._normalizer
+        if normalizer is None:
+            spec = self._store.load(self._schema_hash)
+            if spec is None:
+                raise ValueError(f"No spec artifact for schema {self._schema_hash}")
+            normalizer = create_normalizer(
+                spec, self._remove_defaults, self._in_place, compiled=True
+            )
+            self._normalizer = normalizer
+        return normalizer(tree)
@@ -0,0 +1,339 @@
+"""
+Self-contained stemmers for the inverted index.
+
+EnglishStemmer implements the English (Porter2) Snowball algorithm and
+produces the same stems as nltk.stem.snowball.SnowballStemmer("english"),
+without importing nltk. Like the nltk version, it tracks the R1 and R2
+regions as suffixes of the word, which is what keeps the two in agreement
+on words where a replaced suffix straddles a region boundary.
+Agreement is checked in tests/test_stemmer.py against the menu sample
+vocabulary and the sonnets corpus.
+
+PluralStemmer is a much cheaper alternative that only lowercases words
+and strips English plural and possessive endings. It is suited to
+vocabularies like menus where inflection is mostly pluralization.
+"""
+
+_vowels = "aeiouy"
+_double_consonants = ("bb", "dd", "ff", "gg", "mm", "nn", "pp", "rr", "tt")
+_li_ending = "cdeghkmnrt"
+
+_special_words = {
+  "skis": "ski",
+  "skies": "sky",
+  "dying": "die",
+  "lying": "lie",
+  "tying": "tie",
+  "idly": "idl",
+  "gently": "gentl",
+  "ugly": "ugli",
+  "early": "earli",
+  "only": "onli",
+  "singly": "singl",
+  "sky": "sky",
+  "news": "news",
+  "howe": "howe",
+  "atlas": "atlas",
+  "cosmos": "cosmos",
+  "bias": "bias",
+  "andes": "andes",
+  "inning": "inning",
+  "innings": "inning",
+  "outing": "outing",
+  "outings": "outing",
+  "canning": "canning",
+  "cannings": "canning",
+  "herring": "herring",
+  "herrings": "herring",
+  "earring": "earring",
+  "earrings": "earring",
+  "proceed": "proceed",
+  "proceeds": "proceed",
+  "proceeded": "proceed",
+  "proceeding": "proceed",
+  "exceed": "exceed",
+  "exceeds": "exceed",
+  "exceeded": "exceed",
+  "exceeding": "exceed",
+  "succeed": "succeed",
+  "succeeds": "succeed",
+  "succeeded": "succeed",
+  "succeeding": "succeed",
+}
+
+# Steps 2 and 3 rules, in matching order. Each rule is
+#   (suffix, number of characters to remove, replacement, R2 fallback)
+# A rule with an empty replacement just shortens the word and its regions.
+# A rule with a replacement rewrites the regions that contain the whole
+# suffix and resets the others, R2 to its fallback and R1 to "".
+_step2_rules = (
+  ("ization", 7, "ize", ""),
+  ("ational", 7, "ate", "e"),
+  ("fulness", 4, "", ""),
+  ("ousness", 7, "ous", ""),
+  ("iveness", 7, "ive", "e"),
+  ("tional", 2, "", ""),
+  ("biliti", 6, "ble", ""),
+  ("lessli", 2, "", ""),
+  ("entli", 2, "", ""),
+  ("ation", 5, "ate", "e"),
+  ("alism", 5, "al", ""),
+  ("aliti", 5, "al", ""),
+  ("ousli", 5, "ous", ""),
+  ("iviti", 5, "ive", "e"),
+  ("fulli", 2, "", ""),
+  ("enci", 1, "e", ""),
+  ("anci", 1, "e", ""),
+  ("abli", 1, "e", ""),
+  ("izer", 4, "ize", ""),
+  ("ator", 4, "ate", "e"),
+  ("alli", 4, "al", ""),
+  ("bli", 3, "ble", ""),
+  ("ogi", 1, "", ""),
+  ("li", 2, "", ""),
+)
+
+_step3_rules = (
+  ("ational", 7, "ate", ""),
+  ("tional", 2, "", ""),
+  ("alize", 3, "", ""),
+  ("icate", 5, "ic", ""),
+  ("iciti", 5, "ic", ""),
+  ("ative", 5, "", ""),
+  ("ical", 4, "ic", ""),
+  ("ness", 4, "", ""),
+  ("ful", 3, "", ""),
+)
+
+_step4_suffixes = (
+  "ement",
+  "ance",
+  "ence",
+  "able",
+  "ible",
+  "ment",
+  "ant",
+  "ent",
+  "ism",
+  "ate",
+  "iti",
+  "ous",
+  "ive",
+  "ize",
+  "ion",
+  "al",
+  "er",
+  "ic",
+)
+
+
+def _apply(word, r1, r2, count, replacement, fallback=""):
+  """
+  Removes `count` characters from the end of `word`, appends `replacement`,
+  and adjusts the R1 and R2 regions to match.
+  """
+  if not replacement:
+    return word[:-count], r1[:-count], r2[:-count]
+  word = word[:-count] + replacement
+  r1 = r1[:-count] + replacement if len(r1) >= count else ""
+  r2 = r2[:-count] + replacement if len(r2) >= count else fallback
+  return word, r1, r2
+
+
+def _regions(word):
+  """
+  Returns the R1 and R2 regions of `word` as suffixes of `word`.
+  """
+  if word.startswith(("gener", "arsen")):
+    r1 = word[5:]
+  elif word.startswith("commun"):
+    r1 = word[6:]
+  else:
+    r1 = ""
+    for i in range(1, len(word)):
+      if word[i] not in _vowels and word[i - 1] in _vowels:
+        r1 = word[i + 1:]
+        break
+  r2 = ""
+  for i in range(1, len(r1)):
+    if r1[i] not in _vowels and r1[i - 1] in _vowels:
+      r2 = r1[i + 1:]
+      break
+  return r1, r2
+
+
+def _has_vowel(text):
+  for letter in text:
+    if letter in _vowels:
+      return True
+  return False
+
+
+def stem_english(word):
+  """
+  Returns the English Snowball stem of `word`.
+  """
+  word = word.lower()
+  if len(word) <= 2:
+    return word
+  special = _special_words.get(word)
+  if special is not None:
+    return special
+
+  # Map the different apostrophe characters to a single consistent one.
+  if not word.isascii():
+    word = word.replace("’", "'").replace("‘", "'").replace("‛", "'")
+  if word.startswith("'"):
+    word = word[1:]
+
+  # Mark consonant y's as Y so that they are not treated as vowels.
+  if "y" in word:
+    if word.startswith("y"):
+      word = "Y" + word[1:]
+    for i in range(1, len(word)):
+      if word[i - 1] in _vowels and word[i] == "y":
+        word = word[:i] + "Y" + word[i + 1:]
+
+  r1, r2 = _regions(word)
+
+  # Step 0: possessives
+  for suffix in ("'s'", "'s", "'"):
+    if word.endswith(suffix):
+      word, r1, r2 = _apply(word, r1, r2, len(suffix), "")
+      break
+
+  # Step 1a: plurals
+  if word.endswith("sses"):
+    word, r1, r2 = _apply(word, r1, r2, 2, "")
+  elif word.endswith(("ied", "ies")):
+    word, r1, r2 = _apply(word, r1, r2, 2 if len(word) > 4 else 1, "")
+  elif word.endswith(("us", "ss")):
+    pass
+  elif word.endswith("s"):
+    if _has_vowel(word[:-2]):
+      word, r1, r2 = _apply(word, r1, r2, 1, "")
+
+  # Step 1b: past tenses and participles
+  for suffix in ("eedly", "ingly", "edly", "eed", "ing", "ed"):
+    if word.endswith(suffix):
+      if suffix in ("eed", "eedly"):
+        if r1.endswith(suffix):
+          count = len(suffix)
+          word = word[:-count] + "ee"
+          r1 = r1[:-count] + "ee" if len(r1) >= count else ""
+          r2 = r2[:-count] + "ee" if len(r2) >= count else ""
+      elif _has_vowel(word[:-len(suffix)]):
+        word, r1, r2 = _apply(word, r1, r2, len(suffix), "")
+        if word.endswith(("at", "bl", "iz")):
+          word += "e"
+          r1 += "e"
+          if len(word) > 5 or len(r1) >= 3:
+            r2 += "e"
+        elif word.endswith(_double_consonants):
+          word, r1, r2 = _apply(word, r1, r2, 1, "")
+        elif r1 == "" and (
+          (
+            len(word) >= 3
+            and word[-1] not in _vowels
+            and word[-1] not in "wxY"
+            and word[-2] in _vowels
+            and word[-3] not in _vowels
+          ) or (
+            len(word) == 2
+            and word[0] in _vowels
+            and word[1] not in _vowels
+          )
+        ):
+          word += "e"
+          if r1:
+            r1 += "e"
+          if r2:
+            r2 += "e"
+      break
+
+  # Step 1c: terminal y
+  if len(word) > 2 and word[-1] in "yY" and word[-2] not in _vowels:
+    word, r1, r2 = _apply(word, r1, r2, 1, "i")
+
+  # Step 2
+  for suffix, count, replacement, fallback in _step2_rules:
+    if word.endswith(suffix):
+      if r1.endswith(suffix):
+        if suffix == "ogi":
+          if word[-4] == "l":
+            word, r1, r2 = _apply(word, r1, r2, count, "")
+        elif suffix == "li":
+          if word[-3] in _li_ending:
+            word, r1, r2 = _apply(word, r1, r2, count, "")
+        else:
+          word, r1, r2 = _apply(word, r1, r2, count, replacement, fallback)
+      break
+
+  # Step 3
+  for suffix, count, replacement, fallback in _step3_rules:
+    if word.endswith(suffix):
+      if r1.endswith(suffix):
+        if suffix != "ative" or r2.endswith(suffix):
+          word, r1, r2 = _apply(word, r1, r2, count, replacement, fallback)
+      break
+
+  # Step 4
+  for suffix in _step4_suffixes:
+    if word.endswith(suffix):
+      if r2.endswith(suffix):
+        if suffix == "ion":
+          if word[-4] in "st":
+            word, r1, r2 = _apply(word, r1, r2, 3, "")
+        else:
+          word, r1, r2 = _apply(word, r1, r2, len(suffix), "")
+      break
+
+  # Step 5
+  if r2.endswith("l") and word[-2] == "l":
+    word = word[:-1]
+  elif r2.endswith("e"):
+    word = word[:-1]
+  elif r1.endswith("e"):
+    if len(word) >= 4 and (
+      word[-2] in _vowels
+      or word[-2] in "wxY"
+      or word[-3] not in _vowels
+      or word[-4] in _vowels
+    ):
+      word = word[:-1]
+
+  return word.replace("Y", "y")
+
+
+def stem_plural(word):
+  """
+  Returns `word` lowercased, with any possessive or plural ending removed.
+  """
+  word = word.lower()
+  if word.endswith(("'s", "’s")):
+    word = word[:-2]
+  if len(word) <= 3 or not word.endswith("s"):
+    return word
+  if word.endswith(("ss", "us", "is")):
+    return word
+  if word.endswith("ies") and len(word) > 4:
+    return word[:-3] + "y"
+  if word.endswith(("sses", "xes", "ches", "shes", "zes", "oes")):
+    return word[:-2]
+  return word[:-1]
+
+
+class EnglishStemmer:
+  """
+  Drop-in replacement for nltk's SnowballStemmer("english").
+  """
+  def stem(self, word):
+    return stem_english(word)
+
+
+class PluralStemmer:
+  """
+  Stemmer that only lowercases and removes plural and possessive endings.
+  """
+  def stem(self, word):
+    return stem_plural(word)
@@ -0,0 +1,101 @@
+"""
+Character trigram index for typo-tolerant matching.
+
+The index maps each trigram of a padded term to the terms containing it.
+To find terms close to a misspelled word, the word's trigrams select the
+candidate terms that share the most trigrams with it, and only those
+candidates are compared with the word using edit distance. This bounds
+the number of edit distance computations per word, no matter how large
+the vocabulary is.
+"""
+
+import heapq
+
+
+def trigrams(term):
+  """
+  Returns the set of trigrams of `term`, padded with "$" at both ends so
+  that the first and last characters count as much as the middle ones.
+  """
+  padded = f"${term}$"
+  return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b, limit):
+  """
+  Returns the optimal string alignment distance between `a` and `b`,
+  which counts insertions, deletions, substitutions and transpositions of
+  adjacent characters. Returns `limit` + 1 as soon as the distance is
+  known to exceed `limit`.
+  """
+  if abs(len(a) - len(b)) > limit:
+    return limit + 1
+
+  previous2 = None
+  previous = list(range(len(b) + 1))
+  for i in range(1, len(a) + 1):
+    current = [i] + [0] * len(b)
+    for j in range(1, len(b) + 1):
+      cost = 0 if a[i - 1] == b[j - 1] else 1
+      current[j] = min(
+        previous[j] + 1,
+        current[j - 1] + 1,
+        previous[j - 1] + cost)
+      if (i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+        current[j] = min(current[j], previous2[j - 2] + 1)
+    if min(current) > limit:
+      return limit + 1
+    previous2 = previous
+    previous = current
+  return previous[-1] if previous[-1] <= limit else limit + 1
+
+
+class TrigramIndex:
+  def __init__(self, terms):
+    self._postings = {}
+    for term in terms:
+      for trigram in trigrams(term):
+        if trigram not in self._postings:
+          self._postings[trigram] = []
+        self._postings[trigram].append(term)
+
+  def candidates(self, word, max_distance, max_candidates):
+    """
+    Returns the `max_candidates` terms within `max_distance` characters of
+    the length of `word` that share the most trigrams with it, as (count,
+    term) pairs, most shared trigrams first.
+    """
+    counts = {}
+    for trigram in trigrams(word):
+      for term in self._postings.get(trigram, ()):
+        counts[term] = counts.get(term, 0) + 1
+    return heapq.nlargest(
+      max_candidates,
+      ((count, term) for term, count in counts.items()
+       if abs(len(term) - len(word)) <= max_distance))
+
+  def closest(self, word, max_distance, max_candidates):
+    """
+    Returns the terms within `max_distance` edits of `word` that are at the
+    smallest distance found. Only the `max_candidates` terms that share the
+    most trigrams with `word` are compared with it.
+    """
+    candidates = self.candidates(word, max_distance, max_candidates)
+    return closest_candidates(word, [term for _, term in candidates], max_distance)
+
+
+def closest_candidates(word, candidates, max_distance):
+  """
+  Returns the candidate terms within `max_distance` edits of `word` that
+  are at the smallest distance found, in sorted order.
+  """
+  best = max_distance
+  closest = []
+  for term in candidates:
+    distance = edit_distance(word, term, best)
+    if distance < best:
+      best = distance
+      closest = [term]
+    elif distance == best:
+      closest.append(term)
+  return sorted(closest)
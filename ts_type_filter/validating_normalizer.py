@@ -0,0 +1,369 @@
+"""
+Validation and normalization of a tree in a single traversal.
+
+create_validating_normalizer() compiles the type definitions into a tree of
+checker closures, like create_validator2() does, except that each checker
+returns the normalized form of the value it was given, or _invalid. The
+normalized form is built as the walk returns, so a tree is validated and
+has its defaults added or removed in one pass, instead of one pass for the
+validator and another for the normalizer.
+
+Unions of structs whose name fields are string literals, like the items of
+a menu, are dispatched on the 'name' property through a dict, rather than
+by trying each struct in turn.
+
+The results are the same as those of create_validator2() followed, for
+valid trees, by create_normalizer(): any dictionary with a 'name' property
+gets the defaults of the type with that name literal from the normalizer
+spec, and unchanged subtrees are shared with the tree.
+"""
+
+from typing import Any, Callable, List, Optional, Tuple
+
+from ts_type_filter.filter import (
+    AnyNode as TS_AnyNode,
+    Array as TS_Array,
+    Define as TS_Define,
+    Literal as TS_Literal,
+    Never as TS_Never,
+    Node as TS_Node,
+    Struct as TS_Struct,
+    Type as TS_Type,
+    Union as TS_Union,
+)
+from ts_type_filter.generics import GenericInstances, references_names
+from ts_type_filter.normalize import (
+    _copy_default,
+    _name_based_defaults,
+    create_normalizer,
+    create_normalizer_spec,
+)
+
+# Returns the normalized value, or _invalid if the value doesn't match.
+Checker = Callable[[Any], Any]
+
+# Returned by checkers for values that don't match their type.
+_invalid = object()
+
+
+def create_validating_normalizer(
+    types: List[TS_Define],
+    root_name: str,
+    remove_defaults: bool = True,
+    spec: Optional[dict] = None,
+    generics: Optional[GenericInstances] = None,
+) -> Callable[[Any], Tuple[bool, Any]]:
+    """
+    Returns a function that validates a tree against the type root_name and
+    normalizes it in the same traversal.
+
+    Args:
+        types: List of type definitions (Define objects)
+        root_name: Name of the type that trees must match. It must not have
+            type parameters.
+        remove_defaults: If True, remove default fields, as normalize2()
+            does; if False, add them, as normalize1() does
+        spec: The normalizer spec for types, if one has already been
+            created. Defaults to create_normalizer_spec(types).
+        generics: Optional cache of generic instantiations for types, to
+            share with other consumers of the schema
+
+    Returns:
+        A function that takes a tree and returns (True, normalized tree) if
+        the tree matches the type, or (False, None) if it doesn't. The tree
+        is not modified.
+    """
+    if generics is None:
+        generics = GenericInstances()
+    if spec is None:
+        spec = create_normalizer_spec(types, generics=generics)
+
+    symbols = {t.name: t for t in types if isinstance(t, TS_Define)}
+    root_type = symbols.get(root_name, None)
+    if not root_type:
+        raise ValueError(f"Root type '{root_name}' not found in type definitions")
+    if len(root_type.params) != 0:
+        raise ValueError("Root type must not have type parameters")
+
+    compiler = _Compiler(symbols, spec, remove_defaults, generics)
+    root = compiler.instantiate(root_type, [])
+
+    def validate_and_normalize(tree):
+        normalized = root(tree)
+        if normalized is _invalid:
+            return False, None
+        return True, normalized
+
+    return validate_and_normalize
+
+
+class _Compiler:
+    def __init__(self, symbols, spec, remove_defaults, generics):
+        self.symbols = symbols
+        self.generics = generics
+        self.defaults = _name_based_defaults(spec)
+        self.remove_defaults = remove_defaults
+        # Subtrees typed `any` aren't validated, but are still normalized.
+        self.normalize_any = create_normalizer(spec, remove_defaults)
+        # (checker, keep_alive) for each instantiation of a Define. A Define
+        # that refers to itself gets a forwarding checker while it compiles.
+        self.instances = {}
+
+    def instantiate(self, define: TS_Define, args: List[Checker]) -> Checker:
+        """
+        Returns the checker for define with the checkers args bound to its
+        parameters.
+        """
+        _check_arity(define, args)
+        key = (define.name, tuple(id(arg) for arg in args))
+        locals = {str(param.name): arg for param, arg in zip(define.params, args)}
+        return self._checker(key, define.type, locals, args)
+
+    def instantiate_closed(self, define: TS_Define, params: List[TS_Node]) -> Checker:
+        """
+        Returns the checker for define with type arguments that don't refer
+        to type parameters. Equal instantiations, by the generics cache's
+        key, share a checker.
+        """
+        _check_arity(define, params)
+        key = self.generics.key(define, params)
+        instance = self.instances.get(key)
+        if instance is not None:
+            return instance[0]
+        args = [self.compile(param, {}) for param in params]
+        locals = {str(param.name): arg for param, arg in zip(define.params, args)}
+        return self._checker(key, define.type, locals, args)
+
+    def _checker(self, key, ts_type, locals, keep_alive):
+        instance = self.instances.get(key)
+        if instance is not None:
+            return instance[0]
+
+        # keep_alive holds the objects whose ids are in the key, so that
+        # their ids can't be reused while the checker is in the table.
+        compiled = []
+        self.instances[key] = (lambda value: compiled[0](value), keep_alive)
+        compiled.append(self.compile(ts_type, locals))
+        self.instances[key] = (compiled[0], keep_alive)
+        return compiled[0]
+
+    def compile(self, ts_type: TS_Node, locals: dict) -> Checker:
+        if isinstance(ts_type, TS_Array):
+            return self.compile_array(ts_type, locals)
+        elif isinstance(ts_type, TS_Literal):
+            return self.compile_literal(ts_type)
+        elif isinstance(ts_type, TS_Struct):
+            return self.compile_struct(ts_type, locals)
+        elif isinstance(ts_type, TS_Type):
+            return self.compile_type_ref(ts_type, locals)
+        elif isinstance(ts_type, TS_Union):
+            return self.compile_union(ts_type, locals)
+        elif isinstance(ts_type, TS_AnyNode):
+            return self.normalize_any
+        elif isinstance(ts_type, TS_Never):
+            return _never
+        else:
+            raise ValueError(f"Unsupported TS type: {ts_type}")
+
+    def compile_array(self, ts_array: TS_Array, locals: dict) -> Checker:
+        element = self.compile(ts_array.type, locals)
+
+        def checker(value):
+            if not isinstance(value, list):
+                return _invalid
+            result = value
+            for i, item in enumerate(value):
+                normalized = element(item)
+                if normalized is _invalid:
+                    return _invalid
+                if normalized is not item:
+                    if result is value:
+                        result = list(value)
+                    result[i] = normalized
+            return result
+
+        return checker
+
+    def compile_literal(self, ts_literal: TS_Literal) -> Checker:
+        text = ts_literal.text
+        text_type = type(text)
+
+        def checker(value):
+            if value == text and type(value) is text_type:
+                return value
+            return _invalid
+
+        if text_type is str:
+            checker.literals = frozenset([text])
+        return checker
+
+    def compile_struct(self, ts_struct: TS_Struct, locals: dict) -> Checker:
+        fields = {}
+        required = []
+        for field_name, field_type in ts_struct.obj.items():
+            actual_name = field_name.rstrip("?")
+            fields[actual_name] = self.compile(field_type, locals)
+            if not field_name.endswith("?"):
+                required.append(actual_name)
+        # Only dicts with a 'name' property have defaults, and a struct
+        # without a name field doesn't accept one.
+        defaults = self.defaults if "name" in fields else {}
+        if self.remove_defaults:
+            apply_defaults = _remove_defaults
+        else:
+            apply_defaults = _add_defaults_checker(self.normalize_any)
+
+        def checker(value):
+            if not isinstance(value, dict):
+                return _invalid
+            for field_name in required:
+                if field_name not in value:
+                    return _invalid
+            # Validate and normalize the fields before looking at defaults,
+            # so that values of other types in a union fail fast.
+            result = value
+            for key, item in value.items():
+                field = fields.get(key)
+                if field is None:
+                    return _invalid
+                normalized = field(item)
+                if normalized is _invalid:
+                    return _invalid
+                if normalized is not item:
+                    if result is value:
+                        result = dict(value)
+                    result[key] = normalized
+            if "name" in value:
+                template = defaults.get(value["name"])
+                if template:
+                    return apply_defaults(value, result, template)
+            return result
+
+        if "name" in required:
+            checker.names = getattr(fields["name"], "literals", None)
+        return checker
+
+    def compile_type_ref(self, ts_type: TS_Type, locals: dict) -> Checker:
+        type_def = self.symbols.get(ts_type.name)
+        if type_def is not None:
+            params = ts_type.params or []
+            if params and not any(references_names(p, locals) for p in params):
+                return self.instantiate_closed(type_def, params)
+            args = [self.compile(param, locals) for param in params]
+            return self.instantiate(type_def, args)
+
+        checker = locals.get(ts_type.name)
+        if checker is not None:
+            return checker
+        elif ts_type.name == "string":
+            return _primitive_checker(str)
+        elif ts_type.name == "number":
+            # bool is a subclass of int, but isn't a number
+            return _number
+        elif ts_type.name == "boolean":
+            return _primitive_checker(bool)
+        elif ts_type.name == "any":
+            return self.normalize_any
+        elif ts_type.name == "never":
+            return _never
+        else:
+            raise ValueError(f"Unknown type: {ts_type.name}")
+
+    def compile_union(self, ts_union: TS_Union, locals: dict) -> Checker:
+        options = [self.compile(option, locals) for option in ts_union.types]
+
+        # A dict can only match the structs whose name field accepts its
+        # 'name' property, so those structs are found through a dict rather
+        # than tried in turn. Any option gives the same normalized value.
+        by_name = {}
+        others = []
+        for option in options:
+            names = getattr(option, "names", None)
+            if names is None:
+                others.append(option)
+            else:
+                for name in names:
+                    by_name.setdefault(name, []).append(option)
+
+        if not by_name:
+
+            def checker(value):
+                for option in options:
+                    normalized = option(value)
+                    if normalized is not _invalid:
+                        return normalized
+                return _invalid
+
+        else:
+
+            def checker(value):
+                if isinstance(value, dict):
+                    name = value.get("name")
+                    if type(name) is str:
+                        for option in by_name.get(name, ()):
+                            normalized = option(value)
+                            if normalized is not _invalid:
+                                return normalized
+                for option in others:
+                    normalized = option(value)
+                    if normalized is not _invalid:
+                        return normalized
+                return _invalid
+
+        literals = [getattr(option, "literals", None) for option in options]
+        if None not in literals:
+            checker.literals = frozenset().union(*literals)
+        if not others:
+            checker.names = frozenset(by_name)
+        return checker
+
+
+def _check_arity(define, args):
+    if len(args) != len(define.params):
+        raise ValueError(f"Expected {len(define.params)} arguments, got {len(args)}")
+
+
+def _remove_defaults(value, result, template):
+    """
+    Returns result without the keys whose values in value are the same as
+    in the default template, as normalize2() does.
+    """
+    removed = [
+        key
+        for key, default_value in template.items()
+        if key in value and value[key] == default_value
+    ]
+    if not removed:
+        return result
+    return {key: item for key, item in result.items() if key not in removed}
+
+
+def _add_defaults_checker(normalize_any):
+    def add_defaults(value, result, template):
+        # Start with the default template, then override with the normalized
+        # values from the tree, as normalize1() does. Added defaults are
+        # normalized like any other subtree.
+        merged = {}
+        for key, default_value in template.items():
+            if key not in value:
+                default_value = normalize_any(_copy_default(default_value))
+            merged[key] = default_value
+        merged.update(result)
+        return merged
+
+    return add_defaults
+
+
+def _primitive_checker(t) -> Checker:
+    def checker(value):
+        return value if type(value) is t else _invalid
+
+    return checker
+
+
+def _number(value):
+    return value if type(value) in (int, float) else _invalid
+
+
+def _never(value):
+    return _invalid
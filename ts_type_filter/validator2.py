@@ -2,14 +2,17 @@ from typing import Annotated, Any, Callable, List, Literal, Optional, Union
 
 from ts_type_filter import (
     Any as TS_Any,
+    AnyNode as TS_AnyNode,
     Array as TS_Array,
     Define as TS_Define,
     Literal as TS_Literal,
+    Never as TS_Never,
     Node as TS_Node,
     Struct as TS_Struct,
     Union as TS_Union,
     Type as TS_Type,
 )
+from ts_type_filter.generics import GenericInstances, references_names
 
 Validator = Callable[[Any], bool]
 Template = Callable[[List[Validator]], Validator]
@@ -20,19 +23,24 @@ def compile_node(
     symbols: dict[str, TS_Define],
     templates: dict[str, Template],
     locals: dict[str, int],
+    generics: Optional[GenericInstances] = None,
 ) -> Template:
     if isinstance(ts_type, TS_Array):
-        return compile_array(ts_type, symbols, templates, locals)
+        return compile_array(ts_type, symbols, templates, locals, generics)
     elif isinstance(ts_type, TS_Define):
-        return compile_define(ts_type, symbols, templates, locals)
+        return compile_define(ts_type, symbols, templates, locals, generics)
     elif isinstance(ts_type, TS_Literal):
         return compile_literal(ts_type, symbols, templates, locals)
     elif isinstance(ts_type, TS_Struct):
-        return compile_struct(ts_type, symbols, templates, locals)
+        return compile_struct(ts_type, symbols, templates, locals, generics)
     elif isinstance(ts_type, TS_Type):
-        return compile_type_ref(ts_type, symbols, templates, locals)
+        return compile_type_ref(ts_type, symbols, templates, locals, generics)
     elif isinstance(ts_type, TS_Union):
-        return compile_union(ts_type, symbols, templates, locals)
+        return compile_union(ts_type, symbols, templates, locals, generics)
+    elif isinstance(ts_type, TS_AnyNode):
+        return any_template
+    elif isinstance(ts_type, TS_Never):
+        return never_template
     else:
         raise ValueError(f"Unsupported TS type: {ts_type}")
 
@@ -42,8 +50,9 @@ def compile_array(
     symbols: dict[str, TS_Define],
     templates: dict[str, Template],
     locals: dict[str, int],
+    generics: Optional[GenericInstances] = None,
 ) -> Template:
-    element_template = compile_node(ts_array.type, symbols, templates, locals)
+    element_template = compile_node(ts_array.type, symbols, templates, locals, generics)
 
     def template(args: List[Validator]) -> Validator:
         element_validator = element_template(args)
@@ -66,18 +75,37 @@ def compile_define(
     symbols: dict[str, TS_Define],
     templates: dict[str, Template],
     locals: dict[str, int],
+    generics: Optional[GenericInstances] = None,
 ) -> Template:
     if ts_define.name in templates:
         return templates[ts_define.name]
 
+    # The body is compiled the first time the template is instantiated, and
+    # reused for every instantiation after that. A Define without parameters
+    # has only one instantiation, so its validator is reused as well.
+    compiled = {}
+
     def template(args: List[Validator]) -> Validator:
         if len(args) != len(ts_define.params):
             raise ValueError(
                 f"Expected {len(ts_define.params)} arguments, got {len(args)}"
             )
-        new_locals = {str(param.name): i for i, param in enumerate(ts_define.params)}
-        inner_template = compile_node(ts_define.type, symbols, templates, new_locals)
-        return inner_template(args)
+        validator = compiled.get("validator")
+        if validator is not None:
+            return validator
+        inner_template = compiled.get("template")
+        if inner_template is None:
+            new_locals = {
+                str(param.name): i for i, param in enumerate(ts_define.params)
+            }
+            inner_template = compile_node(
+                ts_define.type, symbols, templates, new_locals, generics
+            )
+            compiled["template"] = inner_template
+        validator = inner_template(args)
+        if not ts_define.params:
+            compiled["validator"] = validator
+        return validator
 
     templates[ts_define.name] = template
     return template
@@ -103,6 +131,7 @@ def compile_struct(
     symbols: dict[str, TS_Define],
     templates: dict[str, Template],
     locals: dict[str, int],
+    generics: Optional[GenericInstances] = None,
 ) -> Template:
     field_templates: dict[str, Template] = {}
     for field_name, field_type in ts_struct.obj.items():
@@ -111,7 +140,7 @@ def compile_struct(
 
         field_templates[actual_name] = (
             is_optional,
-            compile_node(field_type, symbols, templates, locals),
+            compile_node(field_type, symbols, templates, locals, generics),
         )
 
     def template(args: List[Validator]) -> Validator:
@@ -146,6 +175,7 @@ def compile_type_ref(
     symbols: dict[str, TS_Define],
     templates: dict[str, Template],
     locals: dict[str, int],
+    generics: Optional[GenericInstances] = None,
 ) -> Template:
     type_def = symbols.get(ts_type.name)
     if type_def is not None:
@@ -154,16 +184,26 @@ def compile_type_ref(
                 f"Expected {len(type_def.params)} arguments, got {len(ts_type.params)}"
             )
 
-        inner_template = compile_define(type_def, symbols, templates, locals)
+        inner_template = compile_define(type_def, symbols, templates, locals, generics)
         params = ts_type.params or []
         arg_templates = [
-            compile_node(param, symbols, templates, locals) for param in params
+            compile_node(param, symbols, templates, locals, generics) for param in params
         ]
 
         def template(args: List[Validator]) -> Validator:
             validators = [arg_template(args) for arg_template in arg_templates]
             return inner_template(validators)
 
+        if (
+            params
+            and generics is not None
+            and not any(references_names(param, locals) for param in params)
+        ):
+            # An instantiation whose arguments don't refer to type parameters
+            # is the same wherever it appears, so its validator is built once.
+            return generics.product(
+                "validator2", type_def, params, lambda: closed_template(template)
+            )
         return template
 
     index = locals.get(ts_type.name)
@@ -190,23 +230,9 @@ def compile_type_ref(
     elif ts_type.name == "boolean":
         return primitive_type_template(bool)
     elif ts_type.name == "any":
-
-        def template(args: List[Validator]) -> Validator:
-            def validator(value: Any) -> bool:
-                return True
-
-            return validator
-
-        return template
+        return any_template
     elif ts_type.name == "never":
-
-        def template(args: List[Validator]) -> Validator:
-            def validator(value: Any) -> bool:
-                return False
-
-            return validator
-
-        return template
+        return never_template
     else:
         raise ValueError(f"Unknown type: {ts_type.name}")
 
@@ -216,9 +242,10 @@ def compile_union(
     symbols: dict[str, TS_Define],
     templates: dict[str, Template],
     locals: dict[str, int],
+    generics: Optional[GenericInstances] = None,
 ) -> Template:
     templates = [
-        compile_node(option, symbols, templates, locals) for option in ts_union.types]
+        compile_node(option, symbols, templates, locals, generics) for option in ts_union.types]
 
     def template(args: List[Validator]) -> Validator:
         validators = [tmpl(args) for tmpl in templates]
@@ -231,6 +258,20 @@ def compile_union(
     return template
 
 
+def any_template(args: List[Validator]) -> Validator:
+    def validator(value: Any) -> bool:
+        return True
+
+    return validator
+
+
+def never_template(args: List[Validator]) -> Validator:
+    def validator(value: Any) -> bool:
+        return False
+
+    return validator
+
+
 def primitive_type_template(t) -> Template:
     def template(args: List[TS_Node]) -> Validator:
         def validator(value: Any) -> bool:
@@ -242,11 +283,34 @@ def primitive_type_template(t) -> Template:
     return template
 
 
+def closed_template(template: Template) -> Template:
+    # The template of a closed instantiation doesn't use its arguments, so
+    # its validator is built once.
+    validators = []
+
+    def closed(args: List[Validator]) -> Validator:
+        if not validators:
+            validators.append(template([]))
+        return validators[0]
+
+    return closed
+
+
 def strict_equals(a, b):
     return a == b and type(a) is type(b)
 
 
-def create_validator2(types: List[TS_Define], root_name: str) -> Validator:
+def create_validator2(
+    types: List[TS_Define],
+    root_name: str,
+    generics: Optional[GenericInstances] = None,
+) -> Validator:
+    """
+    Returns a function that returns True if a value matches the type
+    root_name. Pass a GenericInstances to compile each distinct
+    instantiation of a generic once, and to share the instantiations with
+    other consumers of the schema.
+    """
     # Build symbol table for all type definitions
     bindings = {}
     for t in types:
@@ -262,5 +326,5 @@ def create_validator2(types: List[TS_Define], root_name: str) -> Validator:
 
     templates = {}
     locals = {}
-    root_template = compile_node(root_type, bindings, templates, locals)
+    root_template = compile_node(root_type, bindings, templates, locals, generics)
     return root_template([])